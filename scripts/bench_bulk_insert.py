@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Ludwig Bulk Insert Benchmark
+
+Compares the loop-of-`Model.create()` pattern (one commit per row) with
+`Model.insert_many()` (executemany, one commit per chunk) and
+`Model.create_many()` on a file-backed SQLite database.
+
+Usage:
+    python scripts/bench_bulk_insert.py [--rows 5000] [--chunk-size 1000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'frameworks'))
+
+from database import Database, Post
+
+
+def fresh_database(directory, name):
+    """Create an empty posts table in its own database file and bind Post to it."""
+    path = os.path.join(directory, f"{name}.db")
+    db = Database({'driver': 'sqlite', 'database': path})
+    db.execute("""
+        CREATE TABLE posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title VARCHAR(255) NOT NULL,
+            content TEXT,
+            user_id INTEGER,
+            published BOOLEAN DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    db.commit()
+    Post._database = db
+    return db
+
+
+def make_rows(count):
+    return [{'title': f"Post number {i}", 'content': "Lorem ipsum dolor sit amet. " * 4,
+             'user_id': i % 50, 'published': i % 2} for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+    
+    rows = make_rows(args.rows)
+    strategies = [
+        (
+            'loop of Post.create() (original)',
+            lambda: [Post.create(row) for row in rows],
+        ),
+        ('Post.insert_many()', lambda: Post.insert_many(rows, args.chunk_size)),
+        (
+            'Post.insert_many(return_ids=True)',
+            lambda: Post.insert_many(rows, args.chunk_size, return_ids=True),
+        ),
+        ('Post.create_many()', lambda: Post.create_many(rows, args.chunk_size)),
+    ]
+    
+    print(f"📊 Bulk insert benchmark: {args.rows} rows, chunk size {args.chunk_size}")
+    print("-" * 60)
+    baseline = None
+    with tempfile.TemporaryDirectory() as directory:
+        for index, (label, insert) in enumerate(strategies):
+            db = fresh_database(directory, f"bench{index}")
+            start = time.perf_counter()
+            insert()
+            elapsed = time.perf_counter() - start
+            assert Post.query().count() == args.rows
+            db.close()
+            baseline = baseline or elapsed
+            print(
+                f"{label:<36} {elapsed * 1000:9.1f} ms  "
+                f"{args.rows / elapsed:9.0f} rows/s  ({baseline / elapsed:5.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
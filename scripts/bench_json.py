@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Ludwig JSON Serialization Benchmark
+
+Compares the original `json.dumps(...).encode()` response path against the
+pluggable JSON backends on a realistic `Model.all()` payload loaded from
+SQLite.
+
+Usage:
+    python scripts/bench_json.py [--rows 5000] [--repeat 20]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'src', 'frameworks'))
+
+import web_framework
+from database import Database, Post
+
+
+def load_posts(rows):
+    """Fill an in-memory posts table and return Post.all()."""
+    db = Database({'driver': 'sqlite', 'database': ':memory:'})
+    db.execute("""
+        CREATE TABLE posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title VARCHAR(255) NOT NULL,
+            content TEXT,
+            user_id INTEGER,
+            published BOOLEAN DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    content = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4
+    for i in range(rows):
+        db.execute(
+            "INSERT INTO posts (title, content, user_id, published) "
+            "VALUES (?, ?, ?, ?)",
+            [f"Post number {i}", content, i % 50, i % 2],
+        )
+    db.commit()
+    Post._database = db
+    return Post.all()
+
+
+def best_time(func, repeat):
+    """Best wall time of `repeat` runs, in milliseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    
+    posts = load_posts(args.rows)
+    print(f"📊 JSON benchmark: Post.all() with {len(posts)} rows, best of {args.repeat}")
+    print("-" * 60)
+    
+    baseline = best_time(
+        lambda: json.dumps([p.attributes for p in posts]).encode('utf-8'), args.repeat
+    )
+    print(f"{'json.dumps + encode (original)':<36} {baseline:8.2f} ms")
+    
+    for name in web_framework.JSONBackend.PREFERENCE:
+        try:
+            backend = web_framework.JSONBackend(name)
+        except ImportError:
+            print(f"{name:<36} {'not installed':>11}")
+            continue
+        elapsed = best_time(lambda: backend.dumps(posts), args.repeat)
+        size = len(backend.dumps(posts))
+        print(
+            f"{name + ' backend':<36} {elapsed:8.2f} ms  "
+            f"({baseline / elapsed:4.1f}x, {size / 1024:.0f} KiB)"
+        )
+
+
+if __name__ == "__main__":
+    main()
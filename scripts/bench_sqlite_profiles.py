@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Ludwig SQLite Profile Benchmark
+
+Runs a mixed read/write workload against a file-backed database once per
+connection profile: one writer thread saves posts through the ORM (one
+commit per row, the `Model.create()` pattern) while reader threads run
+`Post.where(...).get()` queries. Reports committed writes and completed
+reads per second.
+
+With the default profile (rollback journal, synchronous=FULL) every
+commit fsyncs and readers wait for the writer's lock; the throughput
+profile's WAL journal lets readers proceed during writes and
+synchronous=NORMAL drops the per-commit fsync.
+
+Usage:
+    python scripts/bench_sqlite_profiles.py [--seconds 3] [--readers 4]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src', 'frameworks'))
+
+from database import SQLITE_PROFILES, Database, Post
+
+
+def prepare(path, profile, readers):
+    """Create and seed the posts table, and bind Post to the database."""
+    db = Database({'driver': 'sqlite', 'database': path, 'profile': profile,
+                   'pool_size': readers + 2, 'pragmas': {'busy_timeout': 30000}})
+    db.execute("""
+        CREATE TABLE posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title VARCHAR(255) NOT NULL,
+            content TEXT,
+            user_id INTEGER,
+            published BOOLEAN DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    db.execute("CREATE INDEX posts_user_id ON posts (user_id)")
+    db.commit()
+    Post._database = db
+    Post.insert_many({'title': f"Seed {i}", 'content': "Lorem ipsum " * 20,
+                      'user_id': i % 100, 'published': 1} for i in range(5000))
+    return db
+
+
+def run(profile, seconds, readers):
+    """Run the workload for one profile and return (writes/s, reads/s, errors)."""
+    with tempfile.TemporaryDirectory() as directory:
+        db = prepare(os.path.join(directory, 'bench.db'), profile, readers)
+        stop = threading.Event()
+        counts = {'writes': 0, 'reads': 0, 'errors': 0}
+        lock = threading.Lock()
+        
+        def count(kind):
+            with lock:
+                counts[kind] += 1
+        
+        def writer():
+            i = 0
+            while not stop.is_set():
+                try:
+                    Post.create({'title': f"Post {i}", 'content': "Lorem ipsum " * 20,
+                                 'user_id': i % 100})
+                    count('writes')
+                except Exception:
+                    count('errors')
+                i += 1
+        
+        def reader(offset):
+            i = offset
+            while not stop.is_set():
+                try:
+                    Post.where('user_id', '=', i % 100).limit(20).get()
+                    count('reads')
+                except Exception:
+                    count('errors')
+                i += 1
+        
+        threads = [threading.Thread(target=writer)]
+        threads += [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        db.close()
+        return counts['writes'] / elapsed, counts['reads'] / elapsed, counts['errors']
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--readers', type=int, default=4)
+    args = parser.parse_args()
+    
+    print(f"📊 SQLite profile benchmark: 1 writer + {args.readers} readers, "
+          f"{args.seconds:g}s per profile")
+    print("-" * 60)
+    baseline = None
+    for profile in SQLITE_PROFILES:
+        writes, reads, errors = run(profile, args.seconds, args.readers)
+        baseline = baseline or (writes, reads)
+        print(f"{profile:<12} {writes:8.0f} writes/s ({writes / baseline[0]:5.1f}x)  "
+              f"{reads:8.0f} reads/s ({reads / baseline[1]:5.1f}x)  errors: {errors}")
+
+
+if __name__ == "__main__":
+    main()
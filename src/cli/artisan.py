@@ -29,8 +29,11 @@ Available Commands:
     make:robotics <name>     Generate Robotics system
     new <name> [template]    Create a new Ludwig project
     serve                    Start the Ludwig REPL
-    dev                      Start development server (web projects)
+    dev [app] [--port N]     Start hot-reloading development server (web projects)
     build                    Build project for production
+    bench:web [app]          Load-test a web app (-c, -n/-d, --mix, --no-keep-alive)
+    route:cache [routes]     Compile route definitions into bootstrap/cache/routes.json
+    route:clear              Remove the compiled route cache
     run <file>               Execute a Ludwig file
     templates                List available project templates
     components               List available UI components
@@ -41,6 +44,9 @@ Available Commands:
 import sys
 import os
 import json
+import math
+import threading
+import time
 from datetime import datetime
 
 
@@ -679,9 +685,9 @@ let {page_name}Page = create page do
 # HTML Template (save as views/{page_name.lower()}.html)
 let html_template = """
 <div class="min-h-screen bg-gradient-to-br from-blue-50 to-indigo-100">
-    {{{{ navigation }}}}
+    {{{{ navigation|safe }}}}
     
-    {{{{ hero }}}}
+    {{{{ hero|safe }}}}
     
     <section class="py-20">
         <div class="mx-auto max-w-7xl px-4 sm:px-6 lg:px-8">
@@ -695,7 +701,7 @@ let html_template = """
             </div>
             
             <div class="grid grid-cols-1 gap-8 sm:grid-cols-2 lg:grid-cols-3">
-                {{{{ content }}}}
+                {{{{ content|safe }}}}
             </div>
         </div>
     </section>
@@ -725,37 +731,85 @@ let html_template = """
 class DevCommand(ArtisanCommand):
     """Start development server for web projects."""
     
+    def build_parser(self):
+        import argparse
+        parser = argparse.ArgumentParser(
+            prog="artisan dev", description="Run a web app with hot reloading.")
+        parser.add_argument(
+            "app",
+            nargs="?",
+            help="App file[:attribute] (default: ludwig.json main or main.ludwig)",
+        )
+        parser.add_argument(
+            "--host", default="localhost", help="Interface to bind (default: localhost)"
+        )
+        parser.add_argument(
+            "--port", type=int, default=3000, help="Port to listen on (default: 3000)"
+        )
+        parser.add_argument(
+            "--poll", action="store_true", help="Use mtime polling instead of inotify"
+        )
+        return parser
+    
     def execute(self, args):
         print("🚀 Starting Ludwig development server...")
         print("📁 Checking for web project...")
         
+        try:
+            options = self.build_parser().parse_args(args)
+        except SystemExit:
+            return
+        
+        if not os.path.exists("ludwig.json") and not options.app:
+            print("❌ No ludwig.json found. Are you in a Ludwig project directory?")
+            return
         if os.path.exists("ludwig.json"):
             try:
                 with open("ludwig.json", "r") as f:
                     config = json.load(f)
-                
-                if config.get("type") == "web":
-                    print("✅ Web project detected")
-                    print("🎨 TailwindCSS and shadcn/ui components available")
-                    print("🔥 Hot reload enabled (future feature)")
-                    print("📡 Server starting at http://localhost:3000")
-                    print("💡 Use Ctrl+C to stop the server")
-                    print()
-                    print("🛠️  Development features:")
-                    print("   - Component hot reload")
-                    print("   - Live CSS updates")  
-                    print("   - Error overlay")
-                    print("   - Debug information")
-                    
-                    # Development server implementation
-                    print("\n🚀 Starting Ludwig development server...")
-                    os.system("python main.ludwig")
-                else:
-                    print("❌ Not a web project. Use 'python artisan.py serve' instead")
             except Exception as e:
                 print(f"❌ Error reading project config: {e}")
-        else:
-            print("❌ No ludwig.json found. Are you in a Ludwig project directory?")
+                return
+            if config.get("type", "web") != "web":
+                print("❌ Not a web project. Use 'python artisan.py serve' instead")
+                return
+        
+        try:
+            web_framework = _import_web_framework()
+            app_path, attribute = resolve_app_path(options.app)
+            server = web_framework.DevServer(
+                app_path,
+                options.host,
+                options.port,
+                attribute=attribute,
+                use_inotify=False if options.poll else None,
+            )
+            host, port = server.start()[:2]
+        except Exception as e:
+            print(f"❌ Could not start the app: {e}")
+            return
+        
+        watcher = (
+            "inotify"
+            if isinstance(server.watcher, web_framework.InotifyWatcher)
+            else "polling"
+        )
+        print("✅ Web project detected")
+        print(
+            f"🔥 Hot reload enabled ({watcher}): watching "
+            + ", ".join(
+                os.path.relpath(path, server.root) for path in server.watch_paths
+            )
+        )
+        print(f"📡 Server running at http://{host}:{port}")
+        print("💡 Use Ctrl+C to stop the server")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print("\n🛑 Server stopped")
+        finally:
+            server.stop()
 
 
 class BuildCommand(ArtisanCommand):
@@ -798,6 +852,381 @@ class BuildCommand(ArtisanCommand):
             print("❌ No ludwig.json found. Are you in a Ludwig project directory?")
 
 
+def _import_web_framework():
+    """Import the root web_framework module regardless of how artisan was launched."""
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    import web_framework
+    return web_framework
+
+
+def resolve_app_path(app_path=None):
+    """Split ``file[:attribute]``, defaulting to ludwig.json's "main" or main.ludwig."""
+    attribute = None
+    if app_path and ':' in os.path.basename(app_path):
+        app_path, attribute = app_path.rsplit(':', 1)
+    if not app_path:
+        app_path = "main.ludwig"
+        if os.path.exists("ludwig.json"):
+            with open("ludwig.json", "r") as f:
+                main_file = json.load(f).get("main")
+            if main_file and os.path.exists(main_file):
+                app_path = main_file
+    if not os.path.exists(app_path):
+        raise FileNotFoundError(f"App file '{app_path}' not found")
+    return app_path, attribute
+
+
+def load_web_app(app_path=None):
+    """Load a Python web app file and return its LudwigWebFramework instance.
+
+    ``app_path`` may be ``file.ludwig`` or ``file.py`` with an optional
+    ``:attribute`` suffix; it defaults to the "main" entry of ludwig.json and
+    then to main.ludwig. The file is imported under a private module name so
+    its ``if __name__ == "__main__"`` block does not start a server.
+    """
+    web_framework = _import_web_framework()
+    app_path, attribute = resolve_app_path(app_path)
+    return web_framework.load_app(app_path, attribute)
+
+
+def load_request_mix(path):
+    """Parse a request mix file into a weighted, round-robin list of requests.
+
+    Each non-blank line is ``METHOD PATH [WEIGHT] [BODY]``; ``#`` starts a
+    comment. A line with weight 3 is sent three times as often as weight 1.
+    """
+    mix = []
+    with open(path, "r") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split(None, 3)
+            if len(parts) < 2:
+                raise ValueError(
+                    f"{path}:{line_number}: expected 'METHOD PATH [WEIGHT] [BODY]'"
+                )
+            method, target = parts[0].upper(), parts[1]
+            weight = int(parts[2]) if len(parts) > 2 else 1
+            body = parts[3].encode("utf-8") if len(parts) > 3 else None
+            mix.extend([(method, target, body)] * max(weight, 0))
+    if not mix:
+        raise ValueError(f"{path}: request mix is empty")
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(
+        len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    )
+    return sorted_values[index]
+
+
+def run_http_benchmark(host, port, mix, concurrency=10, requests=None, duration=None,
+                       keep_alive=True, timeout=10.0):
+    """Drive ``host:port`` with ``concurrency`` client threads and collect results.
+
+    Stops after ``requests`` total requests or ``duration`` seconds, whichever
+    is given (requests wins if both are). Returns a dict with throughput,
+    latency percentiles in milliseconds, status counts and error count.
+    """
+    import http.client
+    import itertools
+
+    if requests is None and duration is None:
+        requests = 1000
+    counter = itertools.count()
+    results = []
+    lock = threading.Lock()
+    deadline = [None]
+
+    def next_request():
+        index = next(counter)
+        if requests is not None:
+            if index >= requests:
+                return None
+        elif time.perf_counter() >= deadline[0]:
+            return None
+        return mix[index % len(mix)]
+
+    def worker():
+        latencies, statuses, errors = [], {}, 0
+        conn = None
+        while True:
+            item = next_request()
+            if item is None:
+                break
+            method, target, body = item
+            headers = {} if keep_alive else {"Connection": "close"}
+            if body is not None:
+                headers["Content-Type"] = (
+                    "application/json"
+                    if body[:1] in (b"{", b"[")
+                    else "application/x-www-form-urlencoded"
+                )
+            started = time.perf_counter()
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+                conn.request(method, target, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                latencies.append(time.perf_counter() - started)
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+                if not keep_alive or response.will_close:
+                    conn.close()
+                    conn = None
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                if conn is not None:
+                    conn.close()
+                    conn = None
+        if conn is not None:
+            conn.close()
+        with lock:
+            results.append((latencies, statuses, errors))
+
+    threads = [
+        threading.Thread(target=worker, daemon=True) for _ in range(max(1, concurrency))
+    ]
+    started = time.perf_counter()
+    deadline[0] = started + (duration or 0)
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies, statuses, errors = [], {}, 0
+    for worker_latencies, worker_statuses, worker_errors in results:
+        latencies.extend(worker_latencies)
+        for status, count in worker_statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+        errors += worker_errors
+    latencies.sort()
+    completed = len(latencies)
+    return {
+        "requests": completed,
+        "errors": errors,
+        "elapsed": elapsed,
+        "throughput": completed / elapsed if elapsed > 0 else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+        "latency_ms": {
+            "mean": (sum(latencies) / completed * 1000) if completed else 0.0,
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p90": percentile(latencies, 0.90) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "max": (latencies[-1] * 1000) if completed else 0.0,
+        },
+        "concurrency": concurrency,
+        "keep_alive": keep_alive,
+    }
+
+
+class WebBenchCommand(ArtisanCommand):
+    """Boot a web app on a local port and load-test it."""
+
+    def build_parser(self):
+        import argparse
+        parser = argparse.ArgumentParser(
+            prog="artisan bench:web",
+            description="Boot a Ludwig web app locally and report throughput "
+            "and latency.",
+        )
+        parser.add_argument(
+            "app",
+            nargs="?",
+            help="App file[:attribute] (default: ludwig.json main or main.ludwig)",
+        )
+        parser.add_argument(
+            "-c",
+            "--concurrency",
+            type=int,
+            default=10,
+            help="Concurrent client connections",
+        )
+        parser.add_argument(
+            "-n", "--requests", type=int, help="Total number of requests (default 1000)"
+        )
+        parser.add_argument(
+            "-d",
+            "--duration",
+            type=float,
+            help="Run for this many seconds instead of -n",
+        )
+        parser.add_argument(
+            "--path", default="/", help="Path to request when no mix file is given"
+        )
+        parser.add_argument(
+            "--mix", help="Request mix file: 'METHOD PATH [WEIGHT] [BODY]' per line"
+        )
+        parser.add_argument("--no-keep-alive", dest="keep_alive", action="store_false",
+                            help="Open a new connection for every request")
+        parser.add_argument(
+            "--warmup", type=int, default=0, help="Unmeasured requests sent first"
+        )
+        parser.add_argument(
+            "--port",
+            type=int,
+            default=0,
+            help="Port to bind the app on (default: random)",
+        )
+        parser.add_argument(
+            "--access-log",
+            action="store_true",
+            help="Keep the app's access log enabled",
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Print the report as JSON"
+        )
+        return parser
+
+    def execute(self, args):
+        try:
+            options = self.build_parser().parse_args(args)
+        except SystemExit:
+            return None
+        try:
+            app = load_web_app(options.app)
+            mix = (
+                load_request_mix(options.mix)
+                if options.mix
+                else [("GET", options.path, None)]
+            )
+        except Exception as e:
+            print(f"❌ {e}")
+            return None
+
+        if not options.access_log:
+            app.configure_access_log(False)
+        server = app.make_server("127.0.0.1", options.port)
+        host, port = server.server_address[:2]
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            if options.warmup:
+                run_http_benchmark(
+                    host,
+                    port,
+                    mix,
+                    concurrency=options.concurrency,
+                    requests=options.warmup,
+                    keep_alive=options.keep_alive,
+                )
+            report = run_http_benchmark(
+                host,
+                port,
+                mix,
+                concurrency=options.concurrency,
+                requests=options.requests,
+                duration=options.duration,
+                keep_alive=options.keep_alive,
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+            if app.access_log is not None:
+                app.access_log.flush()
+
+        if options.json:
+            print(json.dumps(report, indent=2))
+        else:
+            self.print_report(report, host, port)
+        return report
+
+    def print_report(self, report, host, port):
+        latency = report["latency_ms"]
+        keep_alive = "on" if report["keep_alive"] else "off"
+        print(
+            f"⚡ Benchmarked http://{host}:{port} "
+            f"({report['concurrency']} connections, keep-alive {keep_alive})"
+        )
+        print(f"   Requests:    {report['requests']} in {report['elapsed']:.2f}s")
+        print(f"   Throughput:  {report['throughput']:.1f} req/s")
+        print(
+            f"   Latency:     mean {latency['mean']:.2f}ms  "
+            f"p50 {latency['p50']:.2f}ms  p90 {latency['p90']:.2f}ms  "
+            f"p99 {latency['p99']:.2f}ms  max {latency['max']:.2f}ms"
+        )
+        statuses = ", ".join(
+            f"{status}: {count}" for status, count in report["statuses"].items()
+        )
+        print(f"   Statuses:    {statuses or 'none'}")
+        print(f"   Errors:      {report['errors']}")
+
+
+class RouteCacheCommand(ArtisanCommand):
+    """Resolve route definitions once and write the compiled route table."""
+
+    def build_parser(self):
+        import argparse
+        parser = argparse.ArgumentParser(
+            prog="artisan route:cache",
+            description="Compile routes, controller references and middleware groups "
+            "into a route table.",
+        )
+        parser.add_argument(
+            "routes",
+            nargs="?",
+            help="Route file (default: routes.py, "
+            "else ludwig.json main or main.ludwig)",
+        )
+        parser.add_argument(
+            "--output", help="Cache file (default: bootstrap/cache/routes.json)"
+        )
+        parser.add_argument(
+            "--controllers", default="controllers", help="Package holding controllers"
+        )
+        return parser
+
+    def execute(self, args):
+        try:
+            options = self.build_parser().parse_args(args)
+        except SystemExit:
+            return None
+        web_framework = _import_web_framework()
+        if os.getcwd() not in sys.path:
+            sys.path.insert(0, os.getcwd())
+        try:
+            if options.routes:
+                routes_path = options.routes
+            elif os.path.exists("routes.py"):
+                routes_path = "routes.py"
+            else:
+                routes_path, _ = resolve_app_path(None)
+            definitions, groups = web_framework.read_route_definitions(routes_path)
+            table = web_framework.compile_route_table(
+                definitions, groups, options.controllers
+            )
+        except Exception as e:
+            print(f"❌ Route cache failed: {e}")
+            return None
+
+        output = options.output or web_framework.ROUTE_CACHE_PATH
+        web_framework.write_route_cache(table, output)
+        print(f"✅ Cached {len(table['routes'])} routes from {routes_path} to {output}")
+        return output
+
+
+class RouteClearCommand(ArtisanCommand):
+    """Remove the compiled route table so routes are read from source again."""
+
+    def execute(self, args):
+        web_framework = _import_web_framework()
+        output = args[0] if args else web_framework.ROUTE_CACHE_PATH
+        if os.path.exists(output):
+            os.remove(output)
+            print(f"✅ Route cache cleared: {output}")
+            return True
+        print("ℹ️  No route cache to clear")
+        return False
+
+
 class ListComponentsCommand(ArtisanCommand):
     """List available UI components."""
     
@@ -1873,6 +2302,9 @@ class Artisan:
             'serve': ServeCommand(),
             'dev': DevCommand(),
             'build': BuildCommand(),
+            'bench:web': WebBenchCommand(),
+            'route:cache': RouteCacheCommand(),
+            'route:clear': RouteClearCommand(),
             'run': RunCommand(),
             'migrate': MigrateCommand(),
             'version': VersionCommand(),
@@ -8,12 +8,230 @@ Supports SQLite, PostgreSQL, and MySQL with migrations, models, and query builde
 import sqlite3
 import json
 import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
 
+# PRAGMA settings applied to every new SQLite connection, selected with the
+# "profile" config key. Later keys win, and a "pragmas" config dict
+# overrides individual values.
+SQLITE_PROFILES = {
+    # Library defaults: rollback journal, synchronous=FULL, no mmap
+    'default': {},
+    # WAL lets readers run alongside a writer; NORMAL only fsyncs at checkpoints,
+    # so a power loss may drop the last commits but never corrupts the database
+    'throughput': {
+        'busy_timeout': 5000,
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # negative = KiB, i.e. 64 MiB
+        'temp_store': 'MEMORY',
+    },
+    # WAL concurrency while still syncing every commit
+    'durable': {
+        'busy_timeout': 5000,
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+    },
+}
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes free within the pool timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of database connections.
+    
+    Connections are checked out with `acquire()` (or the `connection()`
+    context manager), used by one thread at a time and handed back with
+    `release()`. At most `max_size` connections exist at once; callers
+    wait up to `timeout` seconds for a free one. A connection that sat
+    idle for `health_check_interval` seconds is pinged before reuse and
+    replaced if it no longer works.
+    """
+    
+    def __init__(self, factory, max_size=5, timeout=30.0, health_check_interval=30.0):
+        """Initialize the pool; `factory` opens a new connection."""
+        self.factory = factory
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = []  # (connection, returned_at), most recently used last
+        self._size = 0
+        self._condition = threading.Condition()
+        self._closed = False
+    
+    def acquire(self, timeout=None):
+        """Check out a connection, opening one if the pool is below its max size."""
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                if self._idle:
+                    connection, returned_at = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    connection, returned_at = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"No database connection became free within {timeout}s "
+                        f"(pool size {self.max_size})")
+                self._condition.wait(remaining)
+        
+        # Opening and pinging happen outside the lock so they never block others
+        try:
+            if connection is None:
+                return self.factory()
+            idle_for = time.monotonic() - returned_at
+            if idle_for >= self.health_check_interval \
+                    and not self.is_healthy(connection):
+                self._close_quietly(connection)
+                return self.factory()
+            return connection
+        except BaseException:
+            self._forget()
+            raise
+    
+    def release(self, connection, discard=False):
+        """Return a connection; uncommitted work is rolled back, broken ones dropped."""
+        if not discard:
+            try:
+                if connection.in_transaction:
+                    connection.rollback()
+            except sqlite3.Error:
+                discard = True
+        with self._condition:
+            if not (discard or self._closed):
+                self._idle.append((connection, time.monotonic()))
+                self._condition.notify()
+                return
+        self._close_quietly(connection)
+        self._forget()
+    
+    @contextmanager
+    def connection(self, timeout=None):
+        """Check out a connection for the duration of a `with` block."""
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+    
+    def is_healthy(self, connection):
+        """Ping a connection."""
+        try:
+            connection.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+    
+    def stats(self):
+        """Current pool occupancy."""
+        with self._condition:
+            return {'size': self._size, 'idle': len(self._idle),
+                    'in_use': self._size - len(self._idle), 'max_size': self.max_size}
+    
+    def close(self):
+        """Close idle connections; checked-out ones are closed when released."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for connection, _ in idle:
+            self._close_quietly(connection)
+    
+    def _forget(self):
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+    
+    def _close_quietly(self, connection):
+        try:
+            connection.close()
+        except sqlite3.Error:
+            pass
+
+
+class BufferedCursor:
+    """Cursor whose rows were read up front so its connection could be released."""
+    
+    def __init__(self, cursor):
+        self.description = cursor.description
+        self.lastrowid = cursor.lastrowid
+        self.rowcount = cursor.rowcount
+        self._rows = cursor.fetchall() if cursor.description else []
+        self._position = 0
+        cursor.close()
+    
+    def fetchone(self):
+        if self._position >= len(self._rows):
+            return None
+        self._position += 1
+        return self._rows[self._position - 1]
+    
+    def fetchmany(self, size=1):
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+    
+    def fetchall(self):
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+    
+    def __iter__(self):
+        return iter(self.fetchall())
+    
+    def close(self):
+        self._rows = []
+
+
+class _Lease:
+    """A pooled connection bound to one thread.
+    
+    It goes back to the pool when released or when the thread exits.
+    """
+    
+    __slots__ = ('connection', 'depth', 'release', '__weakref__')
+    
+    def __init__(self, pool):
+        self.connection = pool.acquire()
+        self.depth = 0
+        self.release = weakref.finalize(self, pool.release, self.connection)
+
+
 class Database:
-    """Database connection and query management."""
+    """Database connection and query management.
+    
+    Connections come from a `ConnectionPool`, so one `Database` can be
+    shared by every thread of a threaded server: each thread checks out
+    its own connection on first use and hands it back as soon as no
+    transaction is open: after a commit, or straight after a read (whose
+    rows are buffered, see BufferedCursor). Concurrent requests therefore
+    query in parallel. Use `with db.checkout():` to keep one connection
+    (and live cursors) across a block of statements. Pool behaviour is
+    configured with `pool_size` (default 5; always 1 for ':memory:',
+    whose data lives in one connection), `pool_timeout` (seconds to wait
+    for a free connection, default 30) and `health_check_interval`
+    (default 30).
+    
+    SQLite tuning comes from `profile` (a key of SQLITE_PROFILES, e.g.
+    "throughput" for WAL, synchronous=NORMAL, mmap and a larger page
+    cache) plus an optional `pragmas` dict of overrides, applied to every
+    connection as it is opened.
+    """
     
     def __init__(self, config=None):
         """Initialize database connection."""
@@ -25,45 +243,211 @@ class Database:
             'username': '',
             'password': ''
         }
-        self.connection = None
+        self.pool = None
+        self._local = threading.local()
         self.connect()
     
     def connect(self):
-        """Establish database connection."""
-        if self.config['driver'] == 'sqlite':
-            self.connection = sqlite3.connect(self.config['database'])
-            self.connection.row_factory = sqlite3.Row
-        else:
+        """Create the connection pool and verify that the database opens."""
+        if self.config['driver'] != 'sqlite':
             raise NotImplementedError(f"Database driver '{self.config['driver']}' not yet supported. Currently supports: sqlite")
+        if self.pool is None:
+            # An in-memory database lives inside a single connection, so
+            # threads take turns with it instead of each opening their own
+            in_memory = self.config['database'] == ':memory:'
+            self.pool = ConnectionPool(
+                self.open_connection,
+                max_size=1 if in_memory else self.config.get('pool_size', 5),
+                timeout=self.config.get('pool_timeout', 30.0),
+                health_check_interval=self.config.get('health_check_interval', 30.0),
+            )
+            with self.pool.connection():
+                pass
+        return self.pool
+    
+    def open_connection(self):
+        """Open a new driver connection for the pool."""
+        pragmas = self.pragmas()
+        connection = sqlite3.connect(self.config['database'], check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        for name, value in pragmas.items():
+            connection.execute(f"PRAGMA {name} = {value}")
+        return connection
+    
+    def pragmas(self):
+        """PRAGMA settings for new connections: the profile plus any overrides."""
+        profile = self.config.get('profile', 'default')
+        if profile not in SQLITE_PROFILES:
+            raise ValueError(f"Unknown database profile '{profile}'. "
+                             f"Available: {', '.join(SQLITE_PROFILES)}")
+        pragmas = dict(SQLITE_PROFILES[profile])
+        pragmas.update(self.config.get('pragmas', {}))
+        for name, value in pragmas.items():
+            safe_value = isinstance(value, int) or str(value).isalnum()
+            if not name.isidentifier() or not safe_value:
+                raise ValueError(f"Invalid PRAGMA setting: {name} = {value!r}")
+        return pragmas
+    
+    @property
+    def connection(self):
+        """The current thread's connection, checked out from the pool on first use."""
+        lease = getattr(self._local, 'lease', None)
+        if lease is None:
+            lease = self._local.lease = _Lease(self.pool)
+        return lease.connection
+    
+    @contextmanager
+    def checkout(self):
+        """Keep the current thread's connection for a block of statements."""
+        connection = self.connection
+        lease = self._local.lease
+        lease.depth += 1
+        try:
+            yield connection
+        finally:
+            lease.depth -= 1
+            self._release_if_idle()
+    
+    def release(self):
+        """Return this thread's connection to the pool, rolling back open work."""
+        lease = getattr(self._local, 'lease', None)
+        if lease is not None:
+            del self._local.lease
+            lease.release()
+    
+    def _release_if_idle(self):
+        lease = getattr(self._local, 'lease', None)
+        if lease is not None and lease.depth == 0 \
+                and not lease.connection.in_transaction:
+            self.release()
     
     def execute(self, query, params=None):
-        """Execute a database query."""
+        """Execute a database query.
+        
+        Outside `checkout()` a statement that leaves no transaction open
+        (a read, DDL) returns a BufferedCursor and hands the connection
+        back to the pool right away; writes keep it until `commit()`.
+        """
         cursor = self.connection.cursor()
         if params:
             cursor.execute(query, params)
         else:
             cursor.execute(query)
+        lease = self._local.lease
+        if lease.depth == 0 and not lease.connection.in_transaction:
+            cursor = BufferedCursor(cursor)
+            self.release()
         return cursor
     
     def fetch_all(self, query, params=None):
         """Fetch all results from a query."""
         cursor = self.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+        rows = [dict(row) for row in cursor.fetchall()]
+        self._release_if_idle()
+        return rows
     
     def fetch_one(self, query, params=None):
         """Fetch one result from a query."""
         cursor = self.execute(query, params)
         row = cursor.fetchone()
+        cursor.close()
+        self._release_if_idle()
         return dict(row) if row else None
     
     def commit(self):
-        """Commit transaction."""
-        self.connection.commit()
+        """Commit; inside `transaction()` the commit waits for the outermost block."""
+        lease = getattr(self._local, 'lease', None)
+        if lease is not None and not self.in_transaction:
+            lease.connection.commit()
+            self._release_if_idle()
+    
+    def rollback(self):
+        """Roll back the current transaction."""
+        if self.in_transaction:
+            raise RuntimeError(
+                "Raise an exception inside db.transaction() to roll it back"
+            )
+        lease = getattr(self._local, 'lease', None)
+        if lease is not None:
+            lease.connection.rollback()
+            self._release_if_idle()
+    
+    @property
+    def in_transaction(self):
+        """Whether the current thread is inside a `transaction()` block."""
+        return getattr(self._local, 'transaction_depth', 0) > 0
+    
+    @property
+    def unit_of_work(self):
+        """The current thread's active UnitOfWork, if any."""
+        return getattr(self._local, 'unit_of_work', None)
+    
+    @contextmanager
+    def transaction(self, unit_of_work=False):
+        """Run a block atomically: commit when it finishes, roll back if it raises.
+        
+        Nested blocks become savepoints, so an inner failure only undoes
+        the inner block. `Model.save()`/`delete()` inside the block no
+        longer commit per row. With `unit_of_work=True` model writes are
+        not even executed immediately: dirty models are tracked and
+        flushed together when the block ends, with runs of same-shaped
+        UPDATE and DELETE statements sent as one `executemany`. Call
+        `db.flush()` to write pending changes early (e.g. to get IDs).
+        """
+        with self.checkout() as connection:
+            depth = getattr(self._local, 'transaction_depth', 0)
+            unit = self.unit_of_work
+            owns_unit = unit_of_work and unit is None
+            if owns_unit:
+                unit = self._local.unit_of_work = UnitOfWork()
+            savepoint = f"ludwig_savepoint_{depth}"
+            try:
+                if depth == 0:
+                    if not connection.in_transaction:
+                        connection.execute('BEGIN')
+                else:
+                    if unit is not None:
+                        unit.flush(connection)
+                    connection.execute(f"SAVEPOINT {savepoint}")
+                self._local.transaction_depth = depth + 1
+                try:
+                    yield connection
+                    if unit is not None:
+                        unit.flush(connection)
+                except BaseException:
+                    if unit is not None:
+                        unit.discard()
+                    if depth == 0:
+                        connection.rollback()
+                    else:
+                        connection.execute(f"ROLLBACK TO {savepoint}")
+                        connection.execute(f"RELEASE {savepoint}")
+                    raise
+                if depth == 0:
+                    connection.commit()
+                else:
+                    connection.execute(f"RELEASE {savepoint}")
+            finally:
+                self._local.transaction_depth = depth
+                if owns_unit:
+                    self._local.unit_of_work = None
+    
+    def flush(self):
+        """Write the pending changes of the current unit of work."""
+        if self.unit_of_work is not None:
+            self.unit_of_work.flush(self.connection)
     
     def close(self):
         """Close database connection."""
-        if self.connection:
-            self.connection.close()
+        self.release()
+        if self.pool:
+            self.pool.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
 
 class QueryBuilder:
@@ -251,6 +635,50 @@ class Model:
         instance.save()
         return instance
     
+    @classmethod
+    def insert_many(cls, rows, chunk_size=1000, return_ids=False):
+        """Insert many rows without building model instances.
+        
+        Rows (dicts) are filtered to `fillable` columns and written with
+        one `executemany` per run of same-shaped rows, committing once per
+        `chunk_size` rows instead of once per row (inside `db.transaction()`
+        each chunk is a savepoint and the caller commits); `rows` may be any
+        iterable, so large imports can be streamed. Returns the number of
+        rows inserted, or the generated primary keys in input order when
+        `return_ids` is true.
+        """
+        db = cls.get_database()
+        inserted = 0
+        ids = []
+        for chunk in _chunks(rows, chunk_size):
+            with db.transaction() as connection:
+                for columns, values in _group_by_shape(chunk, cls.fillable):
+                    query = (f"INSERT INTO {cls.table} ({', '.join(columns)}) "
+                             f"VALUES ({', '.join('?' for _ in columns)})")
+                    if return_ids:
+                        # executemany() does not report generated keys; still one
+                        # commit per chunk
+                        for params in values:
+                            ids.append(connection.execute(query, params).lastrowid)
+                    else:
+                        connection.executemany(query, values)
+                    inserted += len(values)
+        return ids if return_ids else inserted
+    
+    @classmethod
+    def create_many(cls, rows, chunk_size=1000):
+        """Create many records in batched transactions and return the saved models."""
+        rows = [dict(row) for row in rows]
+        ids = cls.insert_many(rows, chunk_size, return_ids=True)
+        instances = []
+        for attributes, id in zip(rows, ids):
+            attributes[cls.primary_key] = id
+            instance = cls(attributes)
+            instance.exists = True
+            instance.original = attributes.copy()
+            instances.append(instance)
+        return instances
+    
     def save(self):
         """Save model to database."""
         if self.exists:
@@ -260,24 +688,19 @@ class Model:
     
     def insert(self):
         """Insert new record."""
-        # Filter fillable attributes
-        data = {k: v for k, v in self.attributes.items() if k in self.fillable}
-        
-        if not data:
+        statement = self.write_statement('insert')
+        if statement is None:
             return False
         
-        columns = ', '.join(data.keys())
-        placeholders = ', '.join(['?' for _ in data])
-        values = list(data.values())
-        
-        query = f"INSERT INTO {self.table} ({columns}) VALUES ({placeholders})"
-        
-        cursor = self.get_database().execute(query, values)
-        self.attributes[self.primary_key] = cursor.lastrowid
-        self.get_database().commit()
+        db = self.get_database()
+        if db.unit_of_work is not None:
+            db.unit_of_work.register('insert', self)
+            return True
         
-        self.exists = True
-        self.original = self.attributes.copy()
+        query, values, _ = statement
+        cursor = db.execute(query, values)
+        self.written('insert', None, cursor.lastrowid)
+        db.commit()
         
         return True
     
@@ -286,38 +709,81 @@ class Model:
         if not self.exists:
             return False
         
-        # Get changed attributes
-        changed = {k: v for k, v in self.attributes.items() 
-                  if k in self.fillable and v != self.original.get(k)}
-        
-        if not changed:
+        db = self.get_database()
+        if db.unit_of_work is not None:
+            db.unit_of_work.register('update', self)
             return True
         
-        set_clause = ', '.join([f"{k} = ?" for k in changed.keys()])
-        values = list(changed.values())
-        values.append(self.attributes[self.primary_key])
-        
-        query = f"UPDATE {self.table} SET {set_clause} WHERE {self.primary_key} = ?"
-        
-        self.get_database().execute(query, values)
-        self.get_database().commit()
+        statement = self.write_statement('update')
+        if statement is None:
+            return True
         
-        self.original.update(changed)
+        query, values, changed = statement
+        db.execute(query, values)
+        db.commit()
+        self.written('update', changed)
         
         return True
     
     def delete(self):
         """Delete record."""
+        db = self.get_database()
+        work = db.unit_of_work
+        if work is not None and (self.exists or work.tracks(self)):
+            work.register('delete', self)
+            self.exists = False
+            return True
+        
         if not self.exists:
             return False
         
-        query = f"DELETE FROM {self.table} WHERE {self.primary_key} = ?"
-        self.get_database().execute(query, [self.attributes[self.primary_key]])
-        self.get_database().commit()
+        query, values, _ = self.write_statement('delete')
+        db.execute(query, values)
+        db.commit()
         
-        self.exists = False
+        self.written('delete')
         return True
     
+    def write_statement(self, operation):
+        """SQL, parameters and changed attributes for an insert, update or delete.
+        
+        Returns None when there is nothing to write.
+        """
+        if operation == 'insert':
+            # Filter fillable attributes
+            data = {k: v for k, v in self.attributes.items() if k in self.fillable}
+            if not data:
+                return None
+            columns = ', '.join(data.keys())
+            placeholders = ', '.join(['?' for _ in data])
+            query = f"INSERT INTO {self.table} ({columns}) VALUES ({placeholders})"
+            return query, list(data.values()), data
+        
+        if operation == 'update':
+            # Get changed attributes
+            changed = {k: v for k, v in self.attributes.items()
+                       if k in self.fillable and v != self.original.get(k)}
+            if not changed:
+                return None
+            set_clause = ', '.join([f"{k} = ?" for k in changed.keys()])
+            values = list(changed.values()) + [self.attributes[self.primary_key]]
+            query = f"UPDATE {self.table} SET {set_clause} WHERE {self.primary_key} = ?"
+            return query, values, changed
+        
+        return (f"DELETE FROM {self.table} WHERE {self.primary_key} = ?",
+                [self.attributes[self.primary_key]], None)
+    
+    def written(self, operation, changed=None, lastrowid=None):
+        """Bring the instance state in line with a statement that has been executed."""
+        if operation == 'insert':
+            self.attributes[self.primary_key] = lastrowid
+            self.exists = True
+            self.original = self.attributes.copy()
+        elif operation == 'update':
+            self.original.update(changed)
+        else:
+            self.exists = False
+    
     def __getattr__(self, name):
         """Get attribute value."""
         if name in self.attributes:
@@ -335,6 +801,94 @@ class Model:
                 self.attributes[name] = value
 
 
+class UnitOfWork:
+    """Model writes collected during `db.transaction(unit_of_work=True)`.
+    
+    Each model is tracked once, in the order it was first saved or
+    deleted; its SQL is built from its state at flush time. Consecutive
+    statements with the same SQL are batched into one `executemany`
+    (inserts run row by row so every model receives its primary key).
+    """
+    
+    def __init__(self):
+        """Initialize an empty unit of work."""
+        self.pending = {}
+    
+    def register(self, operation, model):
+        """Track a model for 'insert', 'update' or 'delete'."""
+        key = id(model)
+        current = self.pending.get(key)
+        if current is None:
+            self.pending[key] = (operation, model)
+        elif operation == 'delete':
+            if current[0] == 'insert':
+                del self.pending[key]
+            else:
+                self.pending[key] = (operation, model)
+    
+    def tracks(self, model):
+        """Whether `model` has pending changes."""
+        return id(model) in self.pending
+    
+    def discard(self):
+        """Forget pending changes."""
+        self.pending.clear()
+    
+    def flush(self, connection):
+        """Execute pending changes on `connection`, batching identical statements."""
+        entries, self.pending = list(self.pending.values()), {}
+        batch = []
+        for operation, model in entries:
+            statement = model.write_statement(operation)
+            if statement is None:
+                continue
+            if batch and (batch[0][0] != operation or batch[0][2][0] != statement[0]):
+                self._execute(connection, batch)
+                batch = []
+            batch.append((operation, model, statement))
+        if batch:
+            self._execute(connection, batch)
+    
+    def _execute(self, connection, batch):
+        operation, _, (query, _, _) = batch[0]
+        if operation == 'insert':
+            for _, model, (_, values, _) in batch:
+                cursor = connection.execute(query, values)
+                model.written('insert', None, cursor.lastrowid)
+            return
+        connection.executemany(query, [values for _, _, (_, values, _) in batch])
+        for _, model, (_, _, changed) in batch:
+            model.written(operation, changed)
+
+
+def _chunks(rows, size):
+    """Yield lists of at most `size` rows from any iterable."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _group_by_shape(rows, fillable):
+    """Split rows into consecutive runs with the same fillable columns.
+    
+    Returns [(columns, [params])] in input order.
+    """
+    groups = []
+    for row in rows:
+        columns = tuple(column for column in fillable if column in row)
+        if not columns:
+            raise ValueError(f"Row has no fillable columns: {row!r}")
+        if not groups or groups[-1][0] != columns:
+            groups.append((columns, []))
+        groups[-1][1].append([row[column] for column in columns])
+    return groups
+
+
 class Migration:
     """Database migration system."""
     
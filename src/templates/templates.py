@@ -606,9 +606,9 @@ let main = create function do
     </style>
 </head>
 <body class="min-h-screen bg-background font-sans antialiased">
-    {{ navigation }}
+    {{ navigation|safe }}
     <main class="flex-1">
-        {{ content }}
+        {{ content|safe }}
     </main>
 </body>
 </html>'''
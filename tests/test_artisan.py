@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Ludwig Artisan CLI Tests
+
+Covers the web-facing artisan commands in src/cli/artisan.py.
+"""
+
+import json
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from cli import artisan
+
+
+APP_SOURCE = '''
+from web_framework import Web
+
+app = Web.create_application({})
+
+@app.route("/")
+def home(request):
+    return "home"
+
+@app.route("/api/items")
+def items(request):
+    return Web.json_response({"method": request.method})
+
+if __name__ == "__main__":
+    raise SystemExit("must not run when loaded by artisan")
+'''
+
+
+def test_bench_web_drives_app_with_request_mix(tmp_path, capsys):
+    """bench:web loads the app, replays the weighted mix and reports percentiles."""
+    app_file = tmp_path / 'main.ludwig'
+    app_file.write_text(APP_SOURCE)
+    mix_file = tmp_path / 'mix.txt'
+    mix_file.write_text(
+        '# weighted mix\nGET / 3\nPOST /api/items 1 {"name": "x"}\nGET /missing\n'
+    )
+    
+    report = artisan.WebBenchCommand().execute(
+        [str(app_file), '-c', '4', '-n', '50', '--mix', str(mix_file)])
+    
+    assert report['requests'] == 50 and report['errors'] == 0
+    assert report['statuses'] == {200: 40, 404: 10}
+    latency = report['latency_ms']
+    assert 0 < latency['p50'] <= latency['p99'] <= latency['max']
+    assert 'Throughput' in capsys.readouterr().out
+    
+    closed = artisan.WebBenchCommand().execute(
+        [str(app_file), '-n', '10', '--no-keep-alive', '--json']
+    )
+    assert closed['requests'] == 10 and closed['keep_alive'] is False
+
+
+def test_route_cache_round_trip(tmp_path, monkeypatch, capsys):
+    """route:cache resolves handlers; load_routes uses it until route:clear."""
+    package = tmp_path / 'shop_controllers'
+    package.mkdir()
+    (package / '__init__.py').write_text('')
+    (package / 'home_controller.py').write_text(
+        'class HomeController:\n'
+        '    def index(self, request):\n'
+        '        return "home"\n'
+        '    def store(self, request):\n'
+        '        return "stored"\n')
+    (tmp_path / 'routes.py').write_text(
+        'middleware_groups = {"web": ["cors"]}\n'
+        'routes = [\n'
+        '    ("GET", "/", "HomeController.index", ["web"]),\n'
+        '    ("POST", "/", "HomeController.store"),\n'
+        ']\n')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    
+    output = artisan.RouteCacheCommand().execute(['--controllers', 'shop_controllers'])
+    with open(output) as f:
+        table = json.load(f)
+    assert [
+        (r['method'], r['module'], r['object'], r['action'], r['middleware'])
+        for r in table['routes']
+    ] == [
+        (
+            'GET',
+            'shop_controllers.home_controller',
+            'HomeController',
+            'index',
+            ['cors'],
+        ),
+        ('POST', 'shop_controllers.home_controller', 'HomeController', 'store', []),
+    ]
+    
+    (tmp_path / 'routes.py').write_text('routes = []\n')
+    import web_framework
+    app = web_framework.Web.create_application({})
+    def cors(request, next_handler):
+        response = next_handler(request)
+        response.headers['X-Cors'] = '1'
+        return response
+    app.register_middleware('cors', cors)
+    assert app.load_routes() == 2
+    assert (
+        app.dispatch(web_framework.LudwigRequest('GET', '/')).headers['X-Cors'] == '1'
+    )
+    assert app.dispatch(web_framework.LudwigRequest('POST', '/')).content == 'stored'
+    assert app.dispatch(web_framework.LudwigRequest('DELETE', '/')).status_code == 405
+    
+    assert artisan.RouteClearCommand().execute([]) is True
+    assert not os.path.exists(output)
+    assert web_framework.Web.create_application({}).load_routes() == 0
+    assert 'Cached 2 routes' in capsys.readouterr().out
+
+
+def test_percentile_uses_nearest_rank():
+    """percentile() picks the ceil(p * n)-th smallest value."""
+    assert artisan.percentile([], 0.5) == 0.0
+    values = list(range(1, 11))
+    percentiles = [artisan.percentile(values, p) for p in (0.0, 0.5, 0.9, 1.0)]
+    assert percentiles == [1, 5, 9, 10]
+    assert artisan.percentile(list(range(1, 101)), 0.99) == 99
+    assert artisan.percentile([7], 0.99) == 7
+
+
+def test_route_cache_rejects_handlers_that_cannot_be_imported(
+    tmp_path, monkeypatch, capsys
+):
+    """Handlers defined in routes.py can't be imported at startup, so caching fails."""
+    (tmp_path / 'routes.py').write_text(
+        'def home(request):\n'
+        '    return "home"\n'
+        'routes = [("GET", "/", home)]\n')
+    monkeypatch.chdir(tmp_path)
+    
+    assert artisan.RouteCacheCommand().execute([]) is None
+    out = capsys.readouterr().out
+    assert (
+        'Route cache failed' in out and "'ludwig_routes:home' cannot be imported" in out
+    )
+    assert not os.path.exists(os.path.join('bootstrap', 'cache', 'routes.json'))
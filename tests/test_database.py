@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Ludwig Database Tests
+
+Covers the ORM and connection handling in src/frameworks/database.py.
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from frameworks import database
+
+CREATE_ITEMS = ('CREATE TABLE items '
+                '(id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, qty INTEGER)')
+
+
+class Item(database.Model):
+    table = 'items'
+    fillable = ['name', 'qty']
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A file database with an items table, shared by the Item model."""
+    db = database.Database({'driver': 'sqlite', 'database': str(tmp_path / 'app.db'),
+                            'pool_size': 3, 'pool_timeout': 0.5})
+    db.execute(CREATE_ITEMS)
+    db.commit()
+    Item._database = db
+    yield db
+    del Item._database
+    db.close()
+
+
+def test_pool_gives_each_thread_its_own_connection(db):
+    """Threads query in parallel on separate connections that return to the pool."""
+    Item.create({'name': 'seed', 'qty': 1})
+    barrier = threading.Barrier(3)
+    seen, errors = [], []
+
+    def worker():
+        try:
+            with db.checkout() as connection:
+                barrier.wait(timeout=5)
+                seen.append(connection)
+                assert Item.where('id', '=', 1).first()['name'] == 'seed'
+            Item.create({'name': threading.current_thread().name, 'qty': 2})
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len({id(connection) for connection in seen}) == 3
+    assert Item.query().count() == 4
+    assert db.pool.stats() == {'size': 3, 'idle': 3, 'in_use': 0, 'max_size': 3}
+
+
+def test_memory_database_is_shared_safely_between_threads():
+    """Threads take turns with the single connection holding a ':memory:' database."""
+    db = database.Database({'driver': 'sqlite', 'database': ':memory:', 'pool_size': 8})
+    db.execute(CREATE_ITEMS)
+    db.commit()
+    Item._database = db
+    errors = []
+
+    def worker(n):
+        try:
+            for i in range(20):
+                Item.create({'name': f'{n}-{i}', 'qty': i})
+                Item.all()
+        except Exception as e:
+            errors.append(e)
+
+    try:
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert not errors
+        assert Item.query().count() == 160
+        assert db.pool.stats()['max_size'] == 1
+    finally:
+        del Item._database
+        db.close()
+
+
+def test_raw_reads_hand_connections_back_to_the_pool():
+    """db.execute() reads release the connection at once, even on a ':memory:' pool."""
+    db = database.Database({'driver': 'sqlite', 'database': ':memory:',
+                            'pool_timeout': 1})
+    db.execute(CREATE_ITEMS)
+    db.execute("INSERT INTO items (name, qty) VALUES ('a', 1), ('b', 2)")
+    db.commit()
+    done = threading.Event()
+    results = []
+    
+    def long_lived_reader():
+        cursor = db.execute('SELECT name FROM items ORDER BY id')
+        results.append((cursor.fetchone()['name'], [row['name'] for row in cursor]))
+        done.wait(5)  # thread stays alive without holding the connection
+    
+    try:
+        threads = [threading.Thread(target=long_lived_reader) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for _ in range(500):
+            if len(results) == 3:
+                break
+            time.sleep(0.01)
+        assert results == [('a', ['b'])] * 3
+        assert db.pool.stats()['in_use'] == 0
+        assert db.execute('SELECT COUNT(*) AS n FROM items').fetchone()['n'] == 2
+    finally:
+        done.set()
+        for thread in threads:
+            thread.join()
+        db.close()
+
+
+def test_pool_limits_size_and_replaces_broken_connections(db):
+    """Checkouts past max_size time out; dead-thread and broken connections recover."""
+    held = [db.pool.acquire() for _ in range(2)]
+
+    def hold_until_exit():
+        db.fetch_all('SELECT * FROM items')  # released once fetched
+        # An open transaction keeps the connection checked out
+        db.execute("INSERT INTO items (name) VALUES ('uncommitted')")
+    thread = threading.Thread(target=hold_until_exit)
+    thread.start()
+    thread.join()
+    assert db.pool.stats()['in_use'] == 2
+
+    extra = db.pool.acquire()
+    with pytest.raises(database.PoolTimeoutError):
+        db.pool.acquire(timeout=0.05)
+
+    extra.close()
+    db.pool.health_check_interval = 0
+    for connection in held:
+        db.pool.release(connection)
+    db.pool.release(extra)
+    with db.pool.connection() as connection:
+        assert connection is not extra and db.pool.is_healthy(connection)
+
+
+def test_insert_many_batches_rows_and_returns_ids(db):
+    """insert_many runs chunks through executemany; create_many returns saved models."""
+    rows = ({'name': f'item{i}', 'qty': i, 'ignored': 'x'} for i in range(25))
+    assert Item.insert_many(rows, chunk_size=10) == 25
+    
+    rows = [{'name': 'a', 'qty': 1}, {'name': 'b'}, {'name': 'c', 'qty': 3}]
+    ids = Item.insert_many(rows, return_ids=True)
+    assert ids == [26, 27, 28]
+    assert db.fetch_one('SELECT qty FROM items WHERE id = 27') == {'qty': None}
+    
+    created = Item.create_many([{'name': 'd', 'qty': 4}, {'name': 'e', 'qty': 5}])
+    assert [(item.id, item.name, item.exists) for item in created] == [
+        (29, 'd', True), (30, 'e', True)]
+    
+    with pytest.raises(ValueError):
+        rows = [{'name': 'kept', 'qty': 1}, {'nothing': 'fillable'}]
+        Item.insert_many(rows, chunk_size=1)
+    assert Item.query().count() == 31
+    assert db.pool.stats()['in_use'] == 0
+
+
+def test_transaction_commits_once_and_nests_with_savepoints(db):
+    """transaction() commits writes together; a failing nested block undoes itself."""
+    with db.transaction():
+        Item.create({'name': 'a', 'qty': 1})
+        with pytest.raises(ZeroDivisionError):
+            with db.transaction():
+                Item.create({'name': 'b', 'qty': 2})
+                1 / 0
+        Item.create({'name': 'c', 'qty': 3})
+        assert db.in_transaction
+    assert [row['name'] for row in Item.query().get()] == ['a', 'c']
+    
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            Item.create({'name': 'd', 'qty': 4})
+            raise RuntimeError('abort')
+    assert Item.query().count() == 2 and not db.in_transaction
+    assert db.pool.stats()['in_use'] == 0
+
+
+def test_unit_of_work_defers_and_batches_model_writes(db):
+    """Dirty models are flushed together when the block ends, in order, with IDs."""
+    Item.insert_many([{'name': f'item{i}', 'qty': 0} for i in range(5)])
+    items = [Item(row) for row in Item.query().get()]
+    for item in items:
+        item.exists, item.original = True, dict(item.attributes)
+    
+    with db.transaction(unit_of_work=True) as connection:
+        for item in items[:3]:
+            item.qty = 10
+            item.save()
+        items[3].delete()
+        new = Item({'name': 'new', 'qty': 1})
+        new.save()
+        new.qty = 2
+        new.save()
+        throwaway = Item({'name': 'never', 'qty': 1})
+        throwaway.save()
+        throwaway.delete()
+        
+        assert len(db.unit_of_work.pending) == 5
+        assert connection.execute('SELECT SUM(qty) FROM items').fetchone()[0] == 0
+    
+    assert db.unit_of_work is None
+    assert new.id == 6 and new.exists and items[0].original['qty'] == 10
+    assert [(row['name'], row['qty']) for row in Item.query().get()] == [
+        ('item0', 10), ('item1', 10), ('item2', 10), ('item4', 0), ('new', 2)]
+
+
+def test_profile_applies_pragmas_to_pooled_connections(tmp_path):
+    """The throughput profile puts every pooled connection in WAL, syncing less."""
+    config = {'driver': 'sqlite', 'database': str(tmp_path / 'fast.db'),
+              'profile': 'throughput', 'pragmas': {'cache_size': -2000}}
+    with database.Database(config) as db:
+        with db.pool.connection() as first, db.pool.connection() as second:
+            for connection in (first, second):
+                def pragma(name):
+                    return connection.execute(f'PRAGMA {name}').fetchone()[0]
+                assert pragma('journal_mode') == 'wal'
+                assert pragma('synchronous') == 1  # NORMAL
+                assert pragma('temp_store') == 2  # MEMORY
+                assert pragma('busy_timeout') == 5000
+                assert pragma('cache_size') == -2000
+    
+    with pytest.raises(ValueError):
+        database.Database({'driver': 'sqlite', 'database': ':memory:',
+                           'profile': 'turbo'})
+    with pytest.raises(ValueError):
+        database.Database({'driver': 'sqlite', 'database': ':memory:',
+                           'pragmas': {'journal_mode': 'WAL; DROP'}})
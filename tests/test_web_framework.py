@@ -0,0 +1,1320 @@
+#!/usr/bin/env python3
+"""
+Ludwig Web Framework Tests
+
+Covers the native web framework in web_framework.py: templates, routing
+and the HTTP server.
+"""
+
+import contextlib
+import gzip
+import http.client
+import io
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import web_framework as wf
+
+
+def write(directory, name, content):
+    """Write a file below `directory` and return its path."""
+    path = os.path.join(str(directory), name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return path
+
+
+@contextlib.contextmanager
+def serve(app):
+    """Run `app` on a free local port for the duration of the block."""
+    server = app.make_server('127.0.0.1', 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server.server_address[1]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def fetch(port, path, method='GET', headers=None, body=None):
+    """Make one HTTP request and return (status, headers, body)."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, response, response.read()
+    finally:
+        conn.close()
+
+
+def test_template_escapes_and_marks_safe(tmp_path):
+    """Placeholders are HTML-escaped unless marked safe."""
+    write(tmp_path, 'page.html', '<h1>{{ title }}</h1>{{ body|safe }}{{missing}}')
+    engine = wf.TemplateEngine(str(tmp_path))
+    
+    html = engine.render('page.html', {'title': '<b>Hi</b>', 'body': '<p>ok</p>'})
+    assert html == '<h1>&lt;b&gt;Hi&lt;/b&gt;</h1><p>ok</p>'
+    assert engine.render('page.html', {'title': wf.Markup('<i>x</i>')}).startswith(
+        '<h1><i>x</i>'
+    )
+
+
+def test_template_loops_conditions_and_attributes(tmp_path):
+    """For loops, if/else and dotted lookups render as expected."""
+    write(tmp_path, 'list.html',
+          '{% for post in posts %}{{ loop.index }}:{{ post.title|upper }}'
+          '{% if loop.last %}.{% else %},{% endif %}{% else %}empty{% endfor %}')
+    engine = wf.TemplateEngine(str(tmp_path))
+    
+    assert (
+        engine.render('list.html', {'posts': [{'title': 'a'}, {'title': 'b'}]})
+        == '1:A,2:B.'
+    )
+    assert engine.render('list.html', {'posts': []}) == 'empty'
+
+
+def test_template_layouts_and_includes(tmp_path):
+    """Child templates fill layout blocks and includes see loop variables."""
+    write(
+        tmp_path,
+        'layout.html',
+        '<title>{% block title %}Ludwig{% endblock %}</title>'
+        '{% block content %}{% endblock %}',
+    )
+    write(tmp_path, 'partials/item.html', '<li>{{ item }}</li>')
+    write(
+        tmp_path,
+        'child.html',
+        '{% extends "layout.html" %}{% block content %}'
+        '{% for item in items %}{% include "partials/item.html" %}{% endfor %}'
+        '{% endblock %}',
+    )
+    engine = wf.TemplateEngine(str(tmp_path))
+    
+    assert (
+        engine.render('child.html', {'items': [1, 2]})
+        == '<title>Ludwig</title><li>1</li><li>2</li>'
+    )
+
+
+def test_template_cache_invalidates_on_mtime(tmp_path):
+    """Templates compile once and recompile when the file changes."""
+    path = write(tmp_path, 'page.html', 'v1')
+    engine = wf.TemplateEngine(str(tmp_path))
+    
+    first = engine.get_template('page.html')
+    assert engine.get_template('page.html') is first
+    
+    write(tmp_path, 'page.html', 'v2')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert engine.render('page.html') == 'v2'
+
+
+def test_render_reports_missing_and_broken_templates(tmp_path, monkeypatch):
+    """Web.render gives 404 for missing templates and a located 500 for broken ones."""
+    monkeypatch.setattr(wf.LudwigWeb, 'templates', wf.TemplateEngine(str(tmp_path)))
+    
+    response = wf.Web.render('nope.html')
+    assert response.status_code == 404
+    
+    write(
+        tmp_path,
+        'broken.html',
+        '<p>{{ user.name }}</p>\n<script>\nvar x = {{ a b }};\n</script>',
+    )
+    response = wf.Web.render('broken.html')
+    assert response.status_code == 500
+    assert 'broken.html, line 3: invalid expression: a b' in response.content
+    
+    write(
+        tmp_path, 'loop.html', '{% if x %}\n{% for item items %}{% endfor %}{% endif %}'
+    )
+    with pytest.raises(wf.TemplateError) as info:
+        wf.LudwigWeb.templates.render('loop.html')
+    assert (info.value.template, info.value.line) == ('loop.html', 2)
+
+
+def test_shipped_layouts_pass_page_html_through():
+    """The bundled layouts mark their HTML slots safe, so pages aren't escaped twice."""
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    for views in ('modern_blog/views', 'examples/web/test_auto_setup/views'):
+        engine = wf.TemplateEngine(os.path.join(root, views))
+        page = engine.render(
+            'layout.html', {'navigation': '<nav>menu</nav>', 'content': '<h1>Hi</h1>'}
+        )
+        assert '<nav>menu</nav>' in page and '<h1>Hi</h1>' in page
+
+
+def test_static_files_conditional_and_range_requests(tmp_path):
+    """Static mounts serve files with validators, 304s and byte ranges."""
+    write(tmp_path, 'css/site.css', 'body { color: red; }')
+    write(tmp_path, 'js/app.3f9a1c2e.js', 'console.log(1);')
+    app = wf.Web.create_application()
+    app.static('/css', str(tmp_path / 'css'))
+    app.static('/js', str(tmp_path / 'js'))
+    
+    with serve(app) as port:
+        status, response, body = fetch(port, '/css/site.css')
+        assert status == 200 and body == b'body { color: red; }'
+        assert response.getheader('Content-type') == 'text/css'
+        etag = response.getheader('ETag')
+        
+        status, _, body = fetch(port, '/css/site.css', headers={'If-None-Match': etag})
+        assert status == 304 and body == b''
+        
+        status, response, body = fetch(
+            port, '/css/site.css', headers={'Range': 'bytes=0-3'}
+        )
+        assert status == 206 and body == b'body'
+        assert response.getheader('Content-Range') == 'bytes 0-3/20'
+        
+        status, _, _ = fetch(port, '/css/site.css', headers={'Range': 'bytes=100-'})
+        assert status == 416
+        
+        _, response, _ = fetch(port, '/js/app.3f9a1c2e.js')
+        assert 'immutable' in response.getheader('Cache-Control')
+        
+        status, _, _ = fetch(port, '/css/../../etc/passwd')
+        assert status == 404
+
+
+def test_compression_negotiates_gzip_and_precompressed_siblings(tmp_path):
+    """Large text responses are gzipped; static files use .gz siblings."""
+    write(tmp_path, 'js/app.js', 'x' * 2000)
+    with open(os.path.join(str(tmp_path), 'js', 'app.js.gz'), 'wb') as f:
+        f.write(gzip.compress(b'x' * 2000))
+    app = wf.Web.create_application()
+    app.enable_compression(min_size=100)
+    app.static('/js', str(tmp_path / 'js'))
+    app.route('/big', lambda request: 'hello ' * 100)
+    app.route('/small', lambda request: 'hi')
+    
+    with serve(app) as port:
+        status, response, body = fetch(
+            port, '/big', headers={'Accept-Encoding': 'gzip'}
+        )
+        assert response.getheader('Content-Encoding') == 'gzip'
+        assert gzip.decompress(body) == b'hello ' * 100
+        
+        _, response, body = fetch(port, '/big', headers={'Accept-Encoding': 'gzip;q=0'})
+        assert (
+            response.getheader('Content-Encoding') is None and body == b'hello ' * 100
+        )
+        
+        _, response, body = fetch(port, '/small', headers={'Accept-Encoding': 'gzip'})
+        assert response.getheader('Content-Encoding') is None and body == b'hi'
+        
+        _, response, body = fetch(
+            port, '/js/app.js', headers={'Accept-Encoding': 'gzip'}
+        )
+        assert response.getheader('Content-Encoding') == 'gzip'
+        assert response.getheader('Content-type') == 'text/javascript'
+        assert gzip.decompress(body) == b'x' * 2000
+    
+    compressor = app.compressor
+    first = compressor.compress('gzip', {'Content-type': 'text/html'}, b'a' * 1000)
+    assert (
+        compressor.compress('gzip', {'Content-type': 'text/html'}, b'a' * 1000) is first
+    )
+    
+    headers = {'Content-type': 'text/html', 'Vary': 'Cookie'}
+    compressor.compress('gzip', headers, b'a' * 1000)
+    compressor.compress('gzip', headers, b'a' * 1000)
+    assert headers['Vary'] == 'Cookie, Accept-Encoding'
+
+
+def test_response_cache_ttl_vary_and_invalidation():
+    """Cached routes run their handler once per key until invalidated."""
+    app = wf.Web.create_application()
+    calls = []
+    
+    @app.route('/listing')
+    @app.cache(ttl=60, vary=['Accept-Language'])
+    def listing(request):
+        calls.append(request.path)
+        return f"listing {len(calls)}"
+    
+    with serve(app) as port:
+        assert fetch(port, '/listing')[2] == b'listing 1'
+        assert fetch(port, '/listing')[2] == b'listing 1'
+        assert fetch(port, '/listing?page=2')[2] == b'listing 2'
+        assert (
+            fetch(port, '/listing', headers={'Accept-Language': 'nl'})[2]
+            == b'listing 3'
+        )
+        
+        app.response_cache.invalidate('/listing')
+        assert fetch(port, '/listing')[2] == b'listing 4'
+    assert app.response_cache.hits == 1
+
+
+def test_response_cache_single_flight():
+    """Concurrent misses for one key share a single computation."""
+    cache = wf.ResponseCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'slow'
+    
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(cache.get_or_compute('k', 60, compute))
+        )
+        for _ in range(5)
+    ]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    
+    assert len(calls) == 1
+    assert [r.content for r in results] == ['slow'] * 5
+
+
+def test_response_cache_waiters_recompute_uncacheable_responses():
+    """When the shared result can't be cached, each waiter gets its own response."""
+    cache = wf.ResponseCache()
+    release = threading.Event()
+    
+    def compute():
+        release.wait(5)
+        return wf.Web.error(404, 'gone')
+    
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(cache.get_or_compute('k', 60, compute))
+        )
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for _ in range(500):
+        if cache.misses == 3:
+            break
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    
+    assert [r.status_code for r in results] == [404, 404, 404]
+
+
+def test_response_cache_evicts_least_recently_used():
+    """The cache stays within its memory budget."""
+    cache = wf.ResponseCache(max_bytes=400)
+    for key in 'abc':
+        cache.set(key, wf.LudwigResponse('x' * 100, 200, {}), 60)
+    cache.get('a')
+    cache.set('d', wf.LudwigResponse('x' * 100, 200, {}), 60)
+    
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('d') is not None
+
+
+def test_streaming_responses_are_chunked():
+    """Generators and file objects are streamed with chunked encoding."""
+    app = wf.Web.create_application()
+    app.route(
+        '/report',
+        lambda request: wf.Web.stream((f"row {i}\n" for i in range(1000)), 'text/csv'),
+    )
+    app.route('/raw', lambda request: iter([b'a', b'', b'b']))
+    app.route('/file', lambda request: wf.LudwigResponse(io.BytesIO(b'x' * 200000)))
+    
+    with serve(app) as port:
+        status, response, body = fetch(port, '/report')
+        assert status == 200
+        assert response.getheader('Transfer-Encoding') == 'chunked'
+        assert body == ''.join(f"row {i}\n" for i in range(1000)).encode()
+        
+        assert fetch(port, '/raw')[2] == b'ab'
+        assert fetch(port, '/file')[2] == b'x' * 200000
+        
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        conn.request('GET', '/raw')
+        assert conn.getresponse().read() == b'ab'
+        conn.request('GET', '/report')
+        assert len(conn.getresponse().read()) > 0
+        conn.close()
+
+
+def multipart_body(boundary, fields, files):
+    """Encode fields and (name, filename, data) files as multipart/form-data."""
+    parts = []
+    for name, value in fields.items():
+        disposition = f'Content-Disposition: form-data; name="{name}"'
+        parts.append(f'--{boundary}\r\n{disposition}\r\n\r\n{value}\r\n'.encode())
+    for name, filename, data in files:
+        disposition = (
+            f'Content-Disposition: form-data; name="{name}"; filename="{filename}"'
+        )
+        parts.append(
+            f'--{boundary}\r\n{disposition}\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + data + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts)
+
+
+def test_request_body_parsing_form_json_and_multipart():
+    """Bodies are parsed lazily by content type; uploads spool to disk."""
+    app = wf.Web.create_application(
+        {'upload_spool_size': 1024, 'max_body_size': 1024 * 1024}
+    )
+    seen = {}
+    
+    @app.route('/submit')
+    def submit(request):
+        seen['form'] = request.form_data
+        seen['json'] = request.json
+        upload = request.files.get('doc')
+        if upload:
+            head = upload.read()[:4]
+            seen['upload'] = (upload.filename, upload.size, head, upload.file._rolled)
+        return 'ok'
+    
+    with serve(app) as port:
+        fetch(
+            port,
+            '/submit',
+            'POST',
+            {'Content-Type': 'application/x-www-form-urlencoded'},
+            'name=Ada&tag=a&tag=b',
+        )
+        assert seen['form'] == {'name': 'Ada', 'tag': ['a', 'b']}
+        
+        fetch(
+            port, '/submit', 'POST', {'Content-Type': 'application/json'}, '{"id": 7}'
+        )
+        assert seen['json'] == {'id': 7}
+        
+        data = bytes(range(256)) * 40
+        body = multipart_body('XyZ', {'title': 'Report'}, [('doc', 'report.bin', data)])
+        status, _, _ = fetch(
+            port,
+            '/submit',
+            'POST',
+            {'Content-Type': 'multipart/form-data; boundary=XyZ'},
+            body,
+        )
+        assert status == 200
+        assert seen['form'] == {'title': 'Report'}
+        assert seen['upload'] == ('report.bin', len(data), bytes(range(4)), True)
+        
+        status, _, _ = fetch(
+            port, '/submit', 'POST', {'Content-Type': 'application/json'}, '{bad'
+        )
+        assert status == 400
+        
+        # Oversized bodies are rejected from the headers alone
+        with socket.create_connection(('127.0.0.1', port), timeout=5) as sock:
+            sock.sendall(
+                b'POST /submit HTTP/1.1\r\nHost: x\r\nContent-Length: 99999999\r\n\r\n'
+            )
+            assert sock.recv(64).startswith(b'HTTP/1.1 413')
+
+
+def test_multipart_parser_handles_boundaries_across_blocks():
+    """Delimiters split between read blocks are still found."""
+    data = b'a' * 100 + b'\r\n--not-the-boundary' + b'b' * 100
+    body = multipart_body('BOUNDARY', {}, [('f', 'x.txt', data)])
+    stream = wf.RequestBodyStream(io.BytesIO(body), len(body))
+    parser = wf.MultipartParser(stream, 'BOUNDARY')
+    parser.BLOCK_SIZE = 7
+    
+    fields, files = parser.parse()
+    assert fields == {} and files['f'].read() == data
+
+
+def test_request_parses_lazily_and_supports_dict_access():
+    """Query, cookies and body are parsed on demand; middleware can use dict access."""
+    headers = {'Cookie': 'session=abc; theme=dark', 'Authorization': 'Bearer t'}
+    request = wf.LudwigRequest('GET', '/items', 'page=2&tag=a&tag=b', headers,
+                               client_address=('10.0.0.1', 5000))
+    
+    assert not hasattr(request, '__dict__')
+    assert request._query_params is None
+    assert request.query_params == {'page': ['2'], 'tag': ['a', 'b']}
+    assert request.cookies == {'session': 'abc', 'theme': 'dark'}
+    assert request.remote_addr == '10.0.0.1'
+    
+    assert request.get('headers', {}).get('Authorization') == 'Bearer t'
+    assert request.get('cookies', {}).get('session') == 'abc'
+    request['user'] = {'id': 1}
+    assert request.user == {'id': 1} and request['user'] == {'id': 1}
+    assert not hasattr(request, 'response')
+    assert request.form_data == {} and request.json is None
+
+
+def test_middleware_pipeline_order_groups_and_short_circuit():
+    """Middleware wraps handlers onion-style and can be attached per route."""
+    app = wf.Web.create_application()
+    calls = []
+    
+    def timing(request, next_handler):
+        calls.append('timing:before')
+        response = next_handler(request)
+        calls.append('timing:after')
+        response.headers['X-Timed'] = '1'
+        return response
+    
+    class RequireToken:
+        def handle(self, request, next_handler):
+            if request.headers.get('Authorization') != 'Bearer ok':
+                return wf.LudwigResponse('denied', 401)
+            request['user'] = 'ada'
+            return next_handler(request)
+    
+    def legacy(request):
+        calls.append('legacy')
+        return request
+    
+    app.add_middleware(timing)
+    app.add_middleware(legacy)
+    app.register_middleware('token', RequireToken())
+    app.middleware_group('auth', ['token'])
+    app.route('/public', lambda request: 'public')
+    app.route(
+        '/dashboard', lambda request: f"hello {request.user}", middleware=['auth']
+    )
+    
+    with serve(app) as port:
+        status, response, body = fetch(port, '/public')
+        assert (status, body) == (200, b'public')
+        assert response.getheader('X-Timed') == '1'
+        assert calls == ['timing:before', 'legacy', 'timing:after']
+        
+        assert fetch(port, '/dashboard')[0] == 401
+        status, _, body = fetch(
+            port, '/dashboard', headers={'Authorization': 'Bearer ok'}
+        )
+        assert (status, body) == (200, b'hello ada')
+        
+        status, response, _ = fetch(port, '/missing')
+        assert status == 404 and response.getheader('X-Timed') == '1'
+
+
+def test_unknown_route_middleware_fails_at_compile_time():
+    """Typos in middleware names surface when the pipeline is built."""
+    app = wf.Web.create_application()
+    app.route('/x', lambda request: 'x', middleware=['nope'])
+    
+    try:
+        app.compile()
+    except ValueError as e:
+        assert 'nope' in str(e)
+    else:
+        raise AssertionError("expected ValueError")
+
+
+class FakeModel:
+    """Stand-in for an ORM model: data lives in `attributes`."""
+    
+    def __init__(self, **attributes):
+        self.attributes = attributes
+
+
+def test_json_backends_serialize_rich_types_to_bytes():
+    """Every available backend handles datetimes, Decimals and models."""
+    payload = {
+        'posts': [
+            FakeModel(id=1, title='Hi', created_at=datetime(2025, 6, 18, 12, 30))
+        ],
+        'total': Decimal('10.50'),
+    }
+    expected = {
+        'posts': [{'id': 1, 'title': 'Hi', 'created_at': '2025-06-18T12:30:00'}],
+        'total': '10.50',
+    }
+    
+    for name in ('orjson', 'ujson', 'stdlib'):
+        try:
+            backend = wf.JSONBackend(name)
+        except ImportError:
+            continue
+        body = backend.dumps(payload)
+        assert isinstance(body, bytes)
+        assert json.loads(body) == expected
+        chunks = backend.iter_array(iter(range(5000)), chunk_size=100)
+        assert json.loads(b''.join(chunks)) == list(range(5000))
+
+
+def test_json_response_streams_large_arrays():
+    """Web.json_stream sends a valid JSON array in chunks."""
+    app = wf.Web.create_application()
+    app.route(
+        '/export', lambda request: wf.Web.json_stream({'n': i} for i in range(20000))
+    )
+    
+    with serve(app) as port:
+        status, response, body = fetch(port, '/export')
+    assert response.getheader('Transfer-Encoding') == 'chunked'
+    assert json.loads(body)[-1] == {'n': 19999}
+
+
+def test_metrics_record_routes_and_export_prometheus_text():
+    """Requests are counted per route and exposed on /metrics."""
+    app = wf.Web.create_application()
+    app.enable_metrics()
+    app.route('/', lambda request: 'home')
+    
+    with serve(app) as port:
+        fetch(port, '/')
+        fetch(port, '/')
+        fetch(port, '/nope')
+        status, _, body = fetch(port, '/metrics')
+    
+    snapshot = app.metrics.snapshot()
+    assert snapshot['requests'][('/', 'GET', 200)] == 2
+    assert snapshot['requests'][('unmatched', 'GET', 404)] == 1
+    assert snapshot['bytes_sent']['/'] == 8
+    assert snapshot['latency']['/']['count'] == 2
+    assert snapshot['in_flight'] == 0
+    
+    text = body.decode()
+    assert status == 200
+    assert 'ludwig_http_requests_total{route="/",method="GET",status="200"} 2' in text
+    assert 'ludwig_http_request_duration_seconds_bucket{route="/",le="+Inf"} 2' in text
+
+
+def test_metrics_shards_merge_across_threads():
+    """Counts from many worker threads add up, including exited threads."""
+    metrics = wf.RequestMetrics()
+    
+    def work():
+        for _ in range(100):
+            metrics.request_started()
+            metrics.request_finished('/x', 'GET', 200, 0.002, 10)
+    
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    snapshot = metrics.snapshot()
+    assert snapshot['requests'][('/x', 'GET', 200)] == 800
+    assert snapshot['bytes_sent']['/x'] == 8000
+    assert snapshot['latency']['/x']['buckets'][0.005] == 800
+
+
+def test_load_shedding_returns_503_but_admits_critical_routes():
+    """Excess requests fail fast while critical routes still get through."""
+    app = wf.Web.create_application()
+    app.enable_load_shedding(max_concurrency=1, max_queue=0, retry_after=2)
+    entered = threading.Event()
+    release = threading.Event()
+    
+    def slow(request):
+        entered.set()
+        release.wait(5)
+        return 'done'
+    
+    app.route('/slow', slow)
+    app.route('/health', lambda request: 'ok', priority='critical')
+    
+    with serve(app) as port:
+        results = []
+        worker = threading.Thread(
+            target=lambda: results.append(fetch(port, '/slow')[0])
+        )
+        worker.start()
+        entered.wait(5)
+        
+        status, response, _ = fetch(port, '/slow')
+        assert status == 503 and response.getheader('Retry-After') == '2'
+        assert fetch(port, '/health')[0] == 200
+        
+        release.set()
+        worker.join(5)
+    
+    assert results == [200]
+    stats = app.admission.stats()
+    assert stats['shed'] == {'normal': 1} and stats['in_flight'] == 0
+
+
+def test_admission_queue_waits_for_a_free_slot():
+    """Queued requests are admitted when a slot frees up in time."""
+    controller = wf.AdmissionController(max_concurrency=1, max_queue=1, queue_timeout=5)
+    assert controller.acquire()
+    assert not controller.acquire('low')
+    
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(controller.acquire()))
+    waiter.start()
+    while controller.stats()['queued'] == 0:
+        time.sleep(0.001)
+    controller.release()
+    waiter.join(5)
+    assert admitted == [True]
+
+
+def test_access_log_writes_batches_in_background(tmp_path):
+    """Requests are logged asynchronously in JSON or combined format."""
+    app = wf.Web.create_application()
+    log_path = str(tmp_path / 'access.log')
+    app.configure_access_log(log_path, fmt='json')
+    app.route('/', lambda request: 'home')
+    
+    with serve(app) as port:
+        fetch(port, '/', headers={'User-Agent': 'tester'})
+        fetch(port, '/missing')
+    app.access_log.close()
+    
+    with open(log_path) as f:
+        # Each request is logged by its own handler thread, so order may vary
+        entries = sorted((json.loads(line) for line in f), key=lambda e: e['request'])
+    assert [(e['request'], e['status']) for e in entries] == [
+        ('GET / HTTP/1.1', 200),
+        ('GET /missing HTTP/1.1', 404),
+    ]
+    assert entries[0]['bytes'] == 4 and entries[0]['user_agent'] == 'tester'
+
+
+def test_access_log_rotates_and_drops_on_overflow(tmp_path, monkeypatch):
+    """Files rotate by size, and a full queue drops lines instead of blocking."""
+    path = str(tmp_path / 'access.log')
+    writer = wf.AccessLogWriter(path, max_bytes=200, backup_count=2)
+    for _ in range(10):
+        writer.log('127.0.0.1', 'GET / HTTP/1.1', 200, 10, None, None, 0.001)
+        writer.flush()
+    writer.close()
+    assert os.path.exists(path + '.1') and os.path.exists(path + '.2')
+    assert not os.path.exists(path + '.3')
+    assert writer.written == 10
+    
+    blocked = wf.AccessLogWriter(path, queue_size=2)
+    monkeypatch.setattr(blocked, '_start', lambda: None)
+    for _ in range(5):
+        blocked.log('127.0.0.1', 'GET / HTTP/1.1', 200, 10, None, None, 0.001)
+    assert blocked.dropped == 3
+
+
+def test_sessions_persist_flash_and_reject_tampering(tmp_path):
+    """Sessions round-trip via a signed cookie; flashes survive one redirect."""
+    app = wf.LudwigWebFramework({'sessions': {'secret': 's3cret'}})
+    app.configure_access_log(False)
+    loads = []
+    original_load = app.sessions.store.load
+    app.sessions.store.load = lambda sid: loads.append(sid) or original_load(sid)
+    
+    def login(request):
+        request.session['user_id'] = 7
+        return wf.Web.redirect_with_success('/', 'Welcome back')
+    
+    def home(request):
+        return {
+            'user': request.session.get('user_id'),
+            'flashes': request.session.pop_flashes(),
+        }
+    
+    app.route('/login', login)
+    app.route('/', home)
+    app.route('/plain', lambda request: 'no session')
+    
+    with serve(app) as port:
+        status, response, _ = fetch(port, '/login')
+        assert status == 302
+        cookie = response.getheader('Set-Cookie')
+        assert cookie.startswith('ludwig_session=') and 'HttpOnly' in cookie
+        value = cookie.split(';')[0]
+        
+        _, _, body = fetch(port, '/', headers={'Cookie': value})
+        assert json.loads(body) == {'user': 7, 'flashes': [['success', 'Welcome back']]}
+        _, response, body = fetch(port, '/', headers={'Cookie': value})
+        assert json.loads(body) == {'user': 7, 'flashes': []}
+        assert response.getheader('Set-Cookie') is None
+        
+        loads.clear()
+        fetch(port, '/plain', headers={'Cookie': value})
+        assert loads == []
+        
+        tampered = value[:-2] + ('AA' if not value.endswith('AA') else 'BB')
+        _, _, body = fetch(port, '/', headers={'Cookie': tampered})
+        assert json.loads(body)['user'] is None
+        assert loads == []
+
+
+def test_session_cookie_does_not_leak_through_shared_headers():
+    """Each client gets only its own cookie, even when handlers reuse a headers dict."""
+    app = wf.LudwigWebFramework({'sessions': {'secret': 's3cret'}})
+    app.configure_access_log(False)
+    shared_headers = {'Content-type': 'text/plain', 'Set-Cookie': 'theme=dark'}
+    
+    def login(request):
+        request.session['user'] = request.query_params['user'][0]
+        return wf.LudwigResponse('ok', 200, shared_headers)
+    
+    def guest_only(request, next_handler):
+        return {'guest': True}  # middleware short-circuiting with plain data
+    
+    app.route('/login', login)
+    app.route('/guest', lambda request: 'unreachable', middleware=[guest_only])
+    
+    with serve(app) as port:
+        fetch(port, '/login?user=alice')
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        conn.request('GET', '/login?user=bob')
+        response = conn.getresponse()
+        cookies = response.msg.get_all('Set-Cookie')
+        conn.close()
+        assert len(cookies) == 2 and cookies[0] == 'theme=dark'
+        assert shared_headers == {
+            'Content-type': 'text/plain',
+            'Set-Cookie': 'theme=dark',
+        }
+        
+        status, _, body = fetch(port, '/guest')
+        assert status == 200 and json.loads(body) == {'guest': True}
+
+
+def test_sqlite_session_store_expires_and_sweeps(tmp_path):
+    """The SQLite store is shared across connections and drops expired rows."""
+    path = str(tmp_path / 'sessions.db')
+    store = wf.SQLiteSessionStore(path, sweep_interval=0)
+    store.save('live', {'cart': [1, 2]}, ttl=60)
+    store.save('stale', {'cart': []}, ttl=-1)
+    
+    other = wf.SQLiteSessionStore(path)
+    assert other.load('live') == {'cart': [1, 2]}
+    assert other.load('stale') is None
+    assert other._connection().execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    
+    store.save('another', {}, ttl=60)
+    count = other._connection().execute("SELECT COUNT(*) FROM ludwig_sessions")
+    assert count.fetchone()[0] == 2
+    store.delete('live')
+    assert other.load('live') is None
+
+
+def test_broadcast_hub_evicts_slow_consumers():
+    """Publishing never blocks; a subscriber whose buffer fills is evicted."""
+    hub = wf.BroadcastHub(buffer_size=2)
+    fast = hub.subscribe('pos')
+    slow = hub.subscribe('pos', 'sensors')
+    
+    assert hub.publish('pos', {'total': 1}) == 2
+    assert fast.get(0).text == '{"total":1}'
+    hub.publish('pos', 2)
+    hub.publish('pos', 3)
+    
+    assert slow.evicted and slow.closed and hub.evicted == 1
+    assert slow.get(0) is None and list(slow) == []
+    assert hub.subscribers('sensors') == 0 and hub.subscribers('pos') == 1
+    assert [fast.get(0).data, fast.get(0).data] == [2, 3]
+
+
+def test_sse_route_pushes_hub_messages():
+    """An SSE route streams hub messages as they are published."""
+    app = wf.Web.create_application()
+    app.configure_access_log(False)
+    app.sse('/events', topics=['sensors'], heartbeat=0.05)
+    with pytest.raises(TypeError, match='topics'):
+        @app.sse('/other', topics=['sensors'])
+        def other(request):
+            pass
+    
+    with serve(app) as port:
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        conn.request('GET', '/events')
+        response = conn.getresponse()
+        assert response.getheader('Content-type') == 'text/event-stream'
+        assert response.readline() == b': connected\n'
+        
+        for _ in range(100):
+            if app.hub.subscribers('sensors'):
+                break
+            time.sleep(0.01)
+        app.hub.publish('sensors', {'temp': 21.5}, event='reading', id=1)
+        
+        received = b''
+        while b'data:' not in received:
+            received += response.readline()
+        assert b'event: reading\nid: 1\ndata: {"temp":21.5}\n' in received
+        conn.close()
+    
+    for _ in range(100):
+        if not app.hub.subscribers('sensors'):
+            break
+        time.sleep(0.02)
+    assert app.hub.subscribers('sensors') == 0
+
+
+def websocket_frame(payload, opcode=0x1):
+    """Build a masked client frame."""
+    mask = b'\x01\x02\x03\x04'
+    masked = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return bytes((0x80 | opcode, 0x80 | len(payload))) + mask + masked
+
+
+def test_websocket_route_echoes_and_forwards():
+    """WebSocket handshake, echo of client messages, and hub forwarding."""
+    app = wf.Web.create_application()
+    app.configure_access_log(False)
+    
+    @app.websocket('/ws')
+    def echo(ws):
+        for message in ws:
+            if message == 'subscribe':
+                ws.forward(app.hub.subscribe('pos'), heartbeat=0.05)
+                return
+            ws.send('echo:' + message)
+    
+    with serve(app) as port:
+        status, _, _ = fetch(port, '/ws')
+        assert status == 426
+        
+        sock = socket.create_connection(('127.0.0.1', port), timeout=5)
+        sock.sendall(
+            b'GET /ws HTTP/1.1\r\nHost: x\r\n'
+            b'Upgrade: websocket\r\nConnection: Upgrade\r\n'
+            b'Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n'
+            b'Sec-WebSocket-Version: 13\r\n\r\n'
+        )
+        stream = sock.makefile('rb')
+        assert stream.readline().startswith(b'HTTP/1.1 101')
+        headers = b''
+        while not headers.endswith(b'\r\n\r\n'):
+            headers += stream.readline()
+        assert b'Sec-WebSocket-Accept: s3pPLMBiTxaQ9kYGzzhZRbK+xOo=' in headers
+        
+        sock.sendall(websocket_frame(b'hi'))
+        assert stream.read(2) == b'\x81\x07' and stream.read(7) == b'echo:hi'
+        
+        sock.sendall(websocket_frame(b'subscribe'))
+        for _ in range(100):
+            if app.hub.subscribers('pos'):
+                break
+            time.sleep(0.01)
+        app.hub.publish('pos', 'sale')
+        frame = stream.read(2)
+        while frame == b'\x89\x00':  # heartbeat pings
+            frame = stream.read(2)
+        assert frame == b'\x81\x04' and stream.read(4) == b'sale'
+        
+        sock.sendall(websocket_frame(b'\x03\xe8', opcode=0x8))
+        data = stream.read(2)
+        while data == b'\x89\x00':
+            data = stream.read(2)
+        assert data[0] == 0x88
+        sock.close()
+
+
+def adapter_app(tmp_path):
+    """App exercising routing, middleware, bodies, streaming and files."""
+    write(tmp_path, 'static/app.css', 'body{}' * 100)
+    app = wf.Web.create_application()
+    app.static('/static', str(tmp_path / 'static'))
+    
+    def tag(request, next_handler):
+        response = next_handler(request)
+        response.headers['X-Via'] = 'middleware'
+        return response
+    
+    app.use(tag)
+    app.route('/items', lambda request: {'method': request.method, 'json': request.json,
+                                         'q': request.query_params.get('q')})
+    app.route('/stream', lambda request: (str(i) for i in range(3)))
+    return app
+
+
+def test_wsgi_adapter_under_wsgiref(tmp_path):
+    """`app.wsgi_app` serves routes, middleware, bodies and files via wsgiref."""
+    from wsgiref.simple_server import WSGIRequestHandler, make_server
+    
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+    
+    app = adapter_app(tmp_path)
+    server = make_server('127.0.0.1', 0, app.wsgi_app, handler_class=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    try:
+        status, response, body = fetch(
+            port,
+            '/items?q=x',
+            'POST',
+            {'Content-Type': 'application/json'},
+            b'{"a": 1}',
+        )
+        assert status == 200 and response.getheader('X-Via') == 'middleware'
+        assert json.loads(body) == {'method': 'POST', 'json': {'a': 1}, 'q': ['x']}
+        
+        assert fetch(port, '/stream')[2] == b'012'
+        status, response, body = fetch(
+            port, '/static/app.css', headers={'Range': 'bytes=0-5'}
+        )
+        assert status == 206 and body == b'body{}'
+        assert fetch(port, '/static/app.css')[2] == b'body{}' * 100
+        assert fetch(port, '/missing')[0] == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+    
+    # Mounted under a prefix: routes match PATH_INFO, SCRIPT_NAME is kept for URLs
+    from wsgiref.util import setup_testing_defaults
+    app.route('/where', lambda request: request.root_path + request.path)
+    environ = {'SCRIPT_NAME': '/app', 'PATH_INFO': '/where'}
+    setup_testing_defaults(environ)
+    replies = []
+    body = b''.join(
+        app.wsgi_app(environ, lambda status, headers: replies.append(status))
+    )
+    assert replies == ['200 OK'] and body == b'/app/where'
+
+
+def asgi_call(
+    app, method, path, body=b'', headers=(), chunks=1, extensions=None, root_path=''
+):
+    """Minimal in-process ASGI client: returns (status, headers, body)."""
+    import asyncio
+    
+    path, _, query = path.partition('?')
+    size = max(1, -(-len(body) // chunks))
+    messages = [
+        {
+            'type': 'http.request',
+            'body': body[i : i + size],
+            'more_body': i + size < len(body),
+        }
+        for i in range(0, len(body), size)
+    ] or [{'type': 'http.request', 'body': b''}]
+    sent = []
+    
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+    
+    async def send(message):
+        sent.append(message)
+    
+    scope = {'type': 'http', 'method': method, 'path': path, 'raw_path': path.encode(),
+             'query_string': query.encode(), 'client': ('127.0.0.1', 5000),
+             'headers': [(k.lower().encode(), v.encode()) for k, v in headers],
+             'extensions': extensions or {}, 'root_path': root_path}
+    asyncio.run(app.asgi_app(scope, receive, send))
+    start = sent[0]
+    body = b''.join(message.get('body', b'') for message in sent[1:])
+    return (
+        start['status'],
+        {k.decode(): v.decode() for k, v in start['headers']},
+        body,
+        sent,
+    )
+
+
+def test_asgi_adapter_in_process(tmp_path):
+    """`app.asgi_app` streams request bodies in and response chunks out."""
+    app = adapter_app(tmp_path)
+    
+    status, headers, body, _ = asgi_call(
+        app,
+        'POST',
+        '/items?q=y',
+        b'{"big": "' + b'x' * 5000 + b'"}',
+        [('Content-Type', 'application/json')],
+        chunks=4,
+    )
+    assert status == 200 and headers['X-Via'] == 'middleware'
+    assert json.loads(body)['json'] == {'big': 'x' * 5000}
+    
+    status, headers, body, sent = asgi_call(app, 'GET', '/stream')
+    assert (
+        body == b'012'
+        and all(m.get('more_body') for m in sent[1:-1])
+        and len(sent) == 5
+    )
+    
+    status, _, body, _ = asgi_call(
+        app, 'GET', '/static/app.css', headers=[('Range', 'bytes=6-11')]
+    )
+    assert status == 206 and body == b'body{}'
+    status, _, body, _ = asgi_call(app, 'HEAD', '/items')
+    assert status == 200 and body == b''
+    
+    app.config['max_body_size'] = 10
+    assert (
+        asgi_call(app, 'POST', '/items', b'x' * 50, [('Content-Length', '50')])[0]
+        == 413
+    )
+    
+    app.route('/where', lambda request: request.root_path + request.path)
+    for path in ('/app/where', '/where'):  # with and without root_path included in path
+        status, _, body, _ = asgi_call(app, 'GET', path, root_path='/app')
+        assert status == 200 and body == b'/app/where'
+
+
+def raw_exchange(port, data, delay=None, timeout=5):
+    """Send raw bytes (optionally one byte per `delay` seconds) and return the reply."""
+    sock = socket.create_connection(('127.0.0.1', port), timeout=timeout)
+    try:
+        if delay is None:
+            sock.sendall(data)
+        else:
+            for byte in data:
+                try:
+                    sock.sendall(bytes([byte]))
+                except OSError:
+                    break
+                time.sleep(delay)
+        reply = b''
+        while True:
+            try:
+                block = sock.recv(65536)
+            except OSError:
+                break
+            if not block:
+                break
+            reply += block
+        return reply
+    finally:
+        sock.close()
+
+
+def test_connection_limits_reject_slow_and_oversized_requests():
+    """Slow headers, long request lines, header floods and big bodies are rejected."""
+    app = wf.Web.create_application({
+        'read_timeout': 0.3, 'idle_timeout': 0.3, 'max_request_line': 100,
+        'max_header_count': 5, 'max_header_bytes': 300, 'max_body_size': 10})
+    app.configure_access_log(False)
+    app.route('/', lambda request: 'ok')
+    app.route('/upload', lambda request: str(len(request.body)))
+    
+    with serve(app) as port:
+        started = time.monotonic()
+        reply = raw_exchange(
+            port, b'GET / HTTP/1.1\r\nHost: x\r\nX-Slow: ' + b'a' * 100, delay=0.01
+        )
+        assert reply.startswith(b'HTTP/1.1 408') and time.monotonic() - started < 1.5
+        
+        long_line = b'GET /' + b'a' * 200 + b' HTTP/1.1\r\n\r\n'
+        assert raw_exchange(port, long_line).startswith(b'HTTP/1.1 414')
+        flood = b''.join(b'X-H%d: v\r\n' % i for i in range(10))
+        reply = raw_exchange(port, b'GET / HTTP/1.1\r\n' + flood + b'\r\n')
+        assert reply.startswith(b'HTTP/1.1 431')
+        big = b'X-Big: ' + b'v' * 400 + b'\r\n'
+        reply = raw_exchange(port, b'GET / HTTP/1.1\r\n' + big + b'\r\n')
+        assert reply.startswith(b'HTTP/1.1 431')
+        
+        chunked = (
+            b'POST /upload HTTP/1.1\r\nHost: x\r\nTransfer-Encoding: chunked\r\n\r\n'
+            b'14\r\n' + b'x' * 20 + b'\r\n0\r\n\r\n'
+        )
+        assert b' 413 ' in raw_exchange(port, chunked).split(b'\r\n')[0]
+        
+        # A kept-alive connection that goes quiet is closed after idle_timeout
+        reply = raw_exchange(port, b'GET / HTTP/1.1\r\nHost: x\r\n\r\n')
+        assert reply.startswith(b'HTTP/1.1 200') and reply.endswith(b'ok')
+    
+    assert app.limits.stats() == {
+        'idle_timeout': 1, 'read_timeout': 1, 'write_timeout': 0,
+        'request_line_too_long': 1, 'header_too_large': 1, 'too_many_headers': 1,
+        'body_too_large': 1}
+
+
+def test_file_watchers_report_changes(tmp_path):
+    """Both watchers report created, modified and deleted files."""
+    write(tmp_path, 'views/page.html', 'v1')
+    main = write(tmp_path, 'main.py', 'app = 1')
+    write(tmp_path, 'other.txt', 'ignored')
+    factories = [lambda paths: wf.PollingWatcher(paths, interval=0.01)]
+    if wf.InotifyWatcher.available():
+        factories.append(wf.InotifyWatcher)
+    
+    for factory in factories:
+        watcher = factory([str(tmp_path / 'views'), main])
+        time.sleep(0.02)
+        write(tmp_path, 'views/page.html', 'v2 longer')
+        assert watcher.wait(2) == {str(tmp_path / 'views' / 'page.html')}
+        write(tmp_path, 'views/partials/nav.html', 'nav')
+        changed = watcher.wait(2)
+        changed |= watcher.wait(0.1)
+        assert str(tmp_path / 'views' / 'partials' / 'nav.html') in changed
+        write(tmp_path, 'other.txt', 'still ignored')
+        os.remove(main)
+        assert watcher.wait(2) == {main}
+        write(tmp_path, 'main.py', 'app = 2')
+        watcher.wait(2)
+        watcher.close()
+
+
+def test_dev_server_hot_reloads_modules_and_templates(tmp_path):
+    """Controller, template and app file edits apply without rebinding the socket."""
+    write(tmp_path, 'controllers/greeting.py', 'def greet(request):\n    return "v1"\n')
+    write(tmp_path, 'views/page.html', 'page {{ n }}')
+    app_file = write(
+        tmp_path,
+        'main.ludwig',
+        'from web_framework import Web\n'
+        'from controllers.greeting import greet\n'
+        'app = Web.create_application({"idle_timeout": 5})\n'
+        'app.configure_access_log(False)\n'
+        'app.route("/", greet)\n'
+        'app.route("/page", lambda request: Web.render("page.html", {"n": 1}))\n',
+    )
+    original_templates = wf.LudwigWeb.templates
+    wf.LudwigWeb.templates = wf.TemplateEngine(str(tmp_path / 'views'))
+    logs = []
+    server = wf.DevServer(app_file, '127.0.0.1', 0, poll_interval=0.02, log=logs.append)
+    try:
+        port = server.start()[1]
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        
+        def get(path):
+            conn.request('GET', path)
+            return conn.getresponse().read()
+        
+        def eventually(path, expected):
+            for _ in range(150):
+                if get(path) == expected:
+                    return True
+                time.sleep(0.02)
+            return False
+        
+        assert get('/') == b'v1' and get('/page') == b'page 1'
+        time.sleep(0.05)
+        write(
+            tmp_path,
+            'controllers/greeting.py',
+            'def greet(request):\n    return "version two"\n',
+        )
+        assert eventually('/', b'version two'), logs
+        assert any('controllers.greeting' in line for line in logs)
+        
+        write(tmp_path, 'views/page.html', 'edited {{ n }}')
+        assert eventually('/page', b'edited 1')
+        
+        write(tmp_path, 'controllers/greeting.py', 'def greet(request) oops\n')
+        assert eventually('/', b'version two') and any(
+            'Reload failed' in line for line in logs
+        )
+        with open(app_file, 'a') as f:
+            f.write('app.route("/new", lambda request: "added")\n')
+        write(
+            tmp_path,
+            'controllers/greeting.py',
+            'def greet(request):\n    return "fixed"\n',
+        )
+        assert eventually('/', b'fixed') and get('/new') == b'added'
+        assert server.server.server_address[1] == port
+        conn.close()
+    finally:
+        server.stop()
+        wf.LudwigWeb.templates = original_templates
+        for name in [name for name in sys.modules if name.startswith('controllers')]:
+            del sys.modules[name]
+        if str(tmp_path) in sys.path:
+            sys.path.remove(str(tmp_path))
+
+
+def test_etag_middleware_and_version_keys():
+    """Dynamic bodies get ETags, If-None-Match gets 304; version keys skip rendering."""
+    app = wf.Web.create_application({'etags': True, 'compression': True})
+    app.configure_access_log(False)
+    renders = []
+    post = {'updated_at': datetime(2024, 1, 1)}
+    
+    app.route('/page', lambda request: '<p>' + 'hello ' * 200 + '</p>')
+    
+    @app.route('/post')
+    @app.etag(lambda request: post['updated_at'])
+    def show(request):
+        renders.append(1)
+        return wf.Web.json_response(post)
+    
+    with serve(app) as port:
+        status, response, body = fetch(port, '/page')
+        etag = response.getheader('ETag')
+        assert status == 200 and etag.startswith('"')
+        status, response, body = fetch(port, '/page', headers={'If-None-Match': etag})
+        assert status == 304 and body == b'' and response.getheader('ETag') == etag
+        
+        _, response, _ = fetch(port, '/page', headers={'Accept-Encoding': 'gzip'})
+        weak = response.getheader('ETag')
+        assert weak == 'W/' + etag and response.getheader('Content-Encoding') == 'gzip'
+        headers = {'If-None-Match': weak, 'Accept-Encoding': 'gzip'}
+        assert fetch(port, '/page', headers=headers)[0] == 304
+        
+        status, response, _ = fetch(port, '/post')
+        version = response.getheader('ETag')
+        assert status == 200 and version.startswith('W/') and renders == [1]
+        assert fetch(port, '/post', headers={'If-None-Match': version})[0] == 304
+        assert renders == [1]
+        
+        post['updated_at'] = datetime(2024, 2, 1)
+        status, response, _ = fetch(port, '/post', headers={'If-None-Match': version})
+        assert status == 200 and response.getheader('ETag') != version
+        assert renders == [1, 1]
+
+
+def test_rate_limit_algorithms():
+    """Token buckets refill continuously; sliding windows weight the previous window."""
+    bucket = wf.TokenBucket(*wf.parse_rate('2/second'))
+    store = wf.MemoryRateLimitStore(shards=4)
+    allowed = [store.update('k', bucket, 100.0).allowed for _ in range(3)]
+    assert allowed == [True, True, False]
+    denied = store.update('k', bucket, 100.0)
+    assert denied.remaining == 0 and denied.retry_after == 0.5
+    assert store.update('k', bucket, 100.5).allowed
+    
+    window = wf.SlidingWindow(*wf.parse_rate('10/60s'))
+    state, now = None, 60.0
+    for _ in range(10):
+        result, state, _ = window.hit(state, now)
+    assert result.allowed and not window.hit(state, now)[0].allowed
+    # Half way into the next window half of the previous count still applies
+    result, state, _ = window.hit(state, 150.0)
+    assert result.allowed and result.remaining == 4
+    
+    with pytest.raises(ValueError):
+        wf.parse_rate('5/fortnight')
+
+
+def test_rate_limit_middleware_headers_and_sqlite_store(tmp_path):
+    """Limited routes send RateLimit-* headers and 429s; SQLite state is shared."""
+    app = wf.Web.create_application()
+    app.configure_access_log(False)
+    app.route('/login', lambda request: 'ok', middleware=[app.rate_limit('2/minute')])
+    app.route('/free', lambda request: 'ok')
+    
+    with serve(app) as port:
+        statuses = [fetch(port, '/login')[0] for _ in range(3)]
+        assert statuses == [200, 200, 429]
+        status, response, _ = fetch(port, '/login')
+        assert int(response.getheader('Retry-After')) == 30
+        assert response.getheader('RateLimit-Remaining') == '0'
+        assert response.getheader('RateLimit-Policy') == '2;w=60'
+        _, response, _ = fetch(port, '/free')
+        assert response.getheader('RateLimit-Limit') is None
+    
+    path = str(tmp_path / 'limits.db')
+    first, second = wf.SQLiteRateLimitStore(path), wf.SQLiteRateLimitStore(path)
+    policy = wf.SlidingWindow(2, 60)
+    assert (
+        first.update('ip', policy, 10.0).allowed
+        and second.update('ip', policy, 11.0).allowed
+    )
+    assert not first.update('ip', policy, 12.0).allowed
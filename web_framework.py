@@ -4,12 +4,61 @@ Ludwig Web Framework - Native HTTP Server
 No external dependencies required - pure Python implementation
 """
 
+import asyncio
+import base64
+import bisect
+import concurrent.futures
+import ctypes
+import ctypes.util
+import dataclasses
+import email.utils
+import functools
+import gzip
+import hashlib
+import hmac
+import html
+import http
+import http.cookies
 import http.server
-import socketserver
+import importlib
+import importlib.machinery
+import importlib.util
+import inspect
+import io
 import json
+import math
+import mimetypes
 import os
+import queue
+import re
+import secrets
+import select
+import shutil
+import socket
+import socketserver
+import sqlite3
+import struct
+import sys
+import tempfile
+import threading
+import time
+import traceback
 import urllib.parse
-from datetime import datetime
+import uuid
+from collections import OrderedDict, deque
+from collections.abc import Iterator, Mapping
+from datetime import date, datetime
+from datetime import time as dt_time
+from decimal import Decimal
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Where `artisan route:cache` writes the compiled route table
+ROUTE_CACHE_PATH = os.path.join('bootstrap', 'cache', 'routes.json')
 
 
 class LudwigWebFramework:
@@ -17,35 +66,708 @@ class LudwigWebFramework:
     
     def __init__(self, app_config=None):
         self.routes = {}
+        self.method_routes = {}
         self.static_routes = {}
         self.config = app_config or {}
+        self.static_files = StaticFiles(self.config.get('static_max_age', 0))
+        self.response_cache = ResponseCache(
+            self.config.get('cache_max_bytes', 32 * 1024 * 1024)
+        )
         self.middleware = []
+        self.named_middleware = {}
+        self.middleware_groups = {}
+        self.route_middleware = {}
+        self.route_priority = {}
+        self.compressor = None
+        self.etags = None
+        self.metrics = None
+        self.admission = None
+        self.rate_limit_store = None
+        self.sessions = None
+        self.hub = BroadcastHub(self.config.get('broadcast_buffer', 100))
+        self._metrics_middleware = None
+        self.access_log = AccessLogWriter(
+            self.config.get('access_log'),
+            fmt=self.config.get('access_log_format', 'combined'),
+        )
+        self._pipeline = None
+        self._route_chains = {}
+        self._asgi_executor = None
+        self.limits = ConnectionLimits(**{
+            key: self.config[key] for key in (
+                'read_timeout', 'idle_timeout', 'write_timeout', 'max_request_line',
+                'max_header_bytes', 'max_header_count') if key in self.config})
+        if self.config.get('compression'):
+            self.enable_compression()
+        if self.config.get('etags'):
+            self.enable_etags()
+        if self.config.get('metrics'):
+            self.enable_metrics()
+        if self.config.get('max_concurrency'):
+            self.enable_load_shedding(
+                self.config['max_concurrency'], self.config.get('max_queue', 0)
+            )
+        if self.config.get('sessions'):
+            self.enable_sessions(**self.config['sessions'])
+        
+    def route(
+        self, path, handler=None, middleware=None, priority='normal', methods=None
+    ):
+        """Register a route handler.
+        
+        `middleware` is an optional list of middleware callables, names
+        registered with `register_middleware`, or group names. `priority`
+        ('critical', 'normal' or 'low') controls load shedding; critical
+        routes such as health checks are always admitted. With `methods`
+        (e.g. ["GET"]) the handler only serves those methods and others
+        get 405. The handler may also be a string such as
+        "HomeController.index", resolved when the app is compiled.
+        """
+        def register(func):
+            if methods:
+                handlers = self.method_routes.setdefault(path, {})
+                for method in methods:
+                    handlers[method.upper()] = (func, list(middleware or []))
+            else:
+                self.routes[path] = func
+                self.route_middleware[path] = list(middleware or [])
+            self.route_priority[path] = priority
+            self._pipeline = None
+            return func
         
-    def route(self, path, handler=None):
-        """Register a route handler."""
         if handler:
-            self.routes[path] = handler
+            register(handler)
         else:
             # Decorator usage
-            def decorator(func):
-                self.routes[path] = func
-                return func
-            return decorator
+            return register
+    
+    def add_route(self, method, path, handler, middleware=None, priority='normal'):
+        """Register a handler for one HTTP method.
+        
+        e.g. `app.add_route("POST", "/login", "AuthController.login")`.
+        """
+        self.route(path, handler, middleware, priority, methods=[method])
+    
+    def load_routes(self, source='routes.py', cache_path=None):
+        """Register routes from a route file, or from the route cache when present.
+        
+        `source` is a Python routes file or a Ludwig file with
+        `route("GET", "/", "HomeController.index")` definitions. If the
+        compiled table written by `artisan route:cache` exists (by default
+        bootstrap/cache/routes.json, or the `route_cache` config key) it
+        is used instead, skipping parsing and controller lookup. Returns
+        the number of routes registered.
+        """
+        cache_path = cache_path or self.config.get('route_cache', ROUTE_CACHE_PATH)
+        if os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                table = json.load(f)
+            instances = {}
+            for entry in table['routes']:
+                handler = load_handler(
+                    entry['module'], entry['object'], entry['action'], instances
+                )
+                self.route(
+                    entry['path'],
+                    handler,
+                    entry['middleware'],
+                    entry['priority'],
+                    methods=None if entry['method'] == 'ANY' else [entry['method']],
+                )
+            return len(table['routes'])
+        
+        definitions, groups = read_route_definitions(source)
+        for name, members in groups.items():
+            self.middleware_group(name, members)
+        for method, path, handler, middleware, priority in definitions:
+            self.route(
+                path,
+                handler,
+                middleware,
+                priority,
+                methods=None if method == 'ANY' else [method],
+            )
+        return len(definitions)
+    
+    def resolve_handler(self, handler):
+        """Turn a string handler reference into the callable it names."""
+        if not isinstance(handler, str):
+            return handler
+        return load_handler(
+            *locate_handler(handler, self.config.get('controllers', 'controllers'))
+        )
+    
+    def cache(self, ttl=60, vary=None):
+        """Cache a route's responses for `ttl` seconds.
+        
+        Usage:
+            @app.route("/")
+            @app.cache(ttl=300, vary=["Accept-Language"])
+            def home(request): ...
+        
+        Only GET/HEAD requests are cached. Drop entries early with
+        `app.response_cache.invalidate(path)`.
+        """
+        vary = tuple(vary or ())
+        cache = self.response_cache
+        
+        def decorator(func):
+            @functools.wraps(func)
+            def cached_handler(request):
+                if request.method not in ('GET', 'HEAD'):
+                    return func(request)
+                key = cache.make_key(request, vary)
+                return cache.get_or_compute(key, ttl, lambda: func(request))
+            return cached_handler
+        return decorator
+    
+    def sse(self, path, handler=None, topics=None, heartbeat=15.0, retry=None,
+            middleware=None):
+        """Register a Server-Sent Events route.
+        
+        Either call `app.sse("/prices", topics=["prices"])` to stream
+        those `app.hub` topics to every client, or decorate a handler that
+        returns a Subscription (e.g. `app.hub.subscribe("sensors")`) or any
+        iterable of events:
+        
+            @app.sse("/events")
+            def events(request):
+                return app.hub.subscribe(*request.query_params.get("topic", ["all"]))
+        """
+        hub = self.hub
+        headers = {
+            'Content-type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        }
+        
+        def register(func):
+            def sse_endpoint(request):
+                source = func(request) if func else hub.subscribe(*topics)
+                if isinstance(source, LudwigResponse):
+                    return source
+                return LudwigResponse(
+                    sse_stream(source, heartbeat, retry), 200, dict(headers)
+                )
+            self.route(path, sse_endpoint, middleware=middleware)
+            return func
+        
+        if handler is not None:
+            register(handler)
+        elif topics:
+            register(None)
+            
+            def misused_as_decorator(func):
+                raise TypeError(
+                    f"app.sse({path!r}, topics=...) registers the route itself; "
+                    "drop topics= to decorate a handler"
+                )
+            return misused_as_decorator
+        else:
+            return register
+    
+    def websocket(
+        self, path, handler=None, middleware=None, max_message_size=1024 * 1024
+    ):
+        """Register a WebSocket route; the handler receives a WebSocket.
+        
+            @app.websocket("/ws/pos")
+            def pos_updates(ws):
+                ws.forward(app.hub.subscribe("pos"))
+        
+        WebSocket routes need the built-in server; they answer plain HTTP
+        requests with 426 Upgrade Required.
+        """
+        def register(func):
+            def websocket_endpoint(request):
+                headers = request.headers
+                if ('websocket' not in headers.get('Upgrade', '').lower()
+                        or 'upgrade' not in headers.get('Connection', '').lower()):
+                    upgrade = {'Content-type': 'text/plain', 'Upgrade': 'websocket',
+                               'Connection': 'Upgrade'}
+                    return LudwigResponse("WebSocket upgrade required", 426, upgrade)
+                key = headers.get('Sec-WebSocket-Key')
+                if not key or headers.get('Sec-WebSocket-Version') != '13':
+                    raise HTTPError(400, "Invalid WebSocket handshake")
+                if request.handler is None:
+                    raise HTTPError(501, "WebSockets require the built-in server")
+                return WebSocketResponse(
+                    request, func, WebSocket.accept_key(key), max_message_size
+                )
+            self.route(path, websocket_endpoint, middleware=middleware)
+            return func
+        
+        if handler:
+            register(handler)
+        else:
+            return register
+    
+    def etag(self, version):
+        """Validate a route with a version key instead of rendering it.
+        
+        Usage:
+            @app.route("/posts/<id>")
+            @app.etag(lambda request: Post.find(request.params["id"]).updated_at)
+            def show(request): ...
+        
+        When the client's If-None-Match matches the key's ETag the handler
+        is skipped and a 304 is returned; otherwise the response carries
+        that ETag. Returning None from `version` disables the check.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def versioned_handler(request):
+                if request.method not in ('GET', 'HEAD'):
+                    return func(request)
+                key = version(request)
+                if key is None:
+                    return func(request)
+                tag = version_etag(key)
+                if etag_matches(request.headers.get('If-None-Match'), tag):
+                    return not_modified_response(tag)
+                response = func(request)
+                if not isinstance(response, LudwigResponse):
+                    response = LudwigResponse.from_value(response)
+                if response.status_code == 200:
+                    response.headers = dict(response.headers)
+                    response.headers['ETag'] = tag
+                return response
+            return versioned_handler
+        return decorator
     
     def static(self, url_path, directory):
         """Register static file serving."""
         self.static_routes[url_path] = directory
+        self.static_files.mount(url_path, directory)
+    
+    def enable_compression(self, min_size=500, level=6):
+        """Compress text responses with gzip (or brotli when installed)."""
+        self.compressor = ResponseCompressor(min_size=min_size, level=level)
+        self._pipeline = None
+    
+    def enable_etags(self, min_size=0):
+        """Give dynamic GET/HEAD responses ETags and answer If-None-Match with 304."""
+        self.etags = ETagMiddleware(min_size)
+        self._pipeline = None
+        return self.etags
+    
+    def enable_metrics(self, path='/metrics', buckets=None):
+        """Record per-route request metrics.
+        
+        Metrics are exported in Prometheus text format at `path` (pass
+        None to skip the endpoint) and are available programmatically via
+        `app.metrics.snapshot()`.
+        """
+        self.metrics = RequestMetrics(buckets or RequestMetrics.DEFAULT_BUCKETS)
+        self._metrics_middleware = MetricsMiddleware(self, self.metrics)
+        if path:
+            metrics = self.metrics
+            limits = self.limits
+            
+            def metrics_endpoint(request):
+                return LudwigResponse(metrics.render_prometheus(limits.stats()), 200,
+                                      {'Content-type': 'text/plain; version=0.0.4'})
+            self.route(path, metrics_endpoint, priority='critical')
+        self._pipeline = None
+        return self.metrics
+    
+    def enable_load_shedding(
+        self, max_concurrency, max_queue=0, queue_timeout=1.0, retry_after=1
+    ):
+        """Limit concurrent requests and fail fast with 503 when overloaded.
+        
+        Up to `max_concurrency` requests run at once and up to `max_queue`
+        more wait (at most `queue_timeout` seconds) for a slot; anything
+        beyond that gets `503 Service Unavailable` with `Retry-After`.
+        Counters are available from `app.admission.stats()`.
+        """
+        self.admission = AdmissionController(
+            max_concurrency, max_queue, queue_timeout, retry_after
+        )
+        self._pipeline = None
+        return self.admission
+    
+    def enable_sessions(self, secret, store='memory', ttl=14 * 24 * 3600,
+                        cookie_name='ludwig_session', secure=False, samesite='Lax',
+                        path=None, max_entries=10000, sweep_interval=300):
+        """Give handlers a server-side `request.session`.
+        
+        `store` is 'memory' (LRU, single process), 'sqlite' (shared by
+        several processes via the database at `path`) or any object with
+        load/save/delete methods. The cookie carries only a signed random
+        ID. Sessions are loaded on first access, so requests that never
+        touch `request.session` do no store lookups.
+        """
+        if store == 'memory':
+            store = MemorySessionStore(max_entries)
+        elif store == 'sqlite':
+            store = SQLiteSessionStore(path or 'sessions.db', sweep_interval)
+        self.sessions = SessionManager(
+            store, secret, ttl, cookie_name, secure, samesite
+        )
+        self._pipeline = None
+        return self.sessions
+    
+    def rate_limit(
+        self, rate, key='ip', algorithm='token_bucket', name=None, cost=1, **options
+    ):
+        """Create rate-limit middleware, e.g. `middleware=[app.rate_limit("5/minute")]`.
+        
+        `key` is 'ip', 'user' (the `request['user']` id, falling back to
+        the IP) or a callable. `algorithm` is 'token_bucket' (pass
+        `burst=` to allow bursts) or 'sliding_window'. State lives in
+        memory, or in a SQLite database shared by several processes when
+        the app config sets `"rate_limit_store": "sqlite"` (and optionally
+        `"rate_limit_db"`).
+        """
+        if self.rate_limit_store is None:
+            if self.config.get('rate_limit_store') == 'sqlite':
+                self.rate_limit_store = SQLiteRateLimitStore(
+                    self.config.get('rate_limit_db', 'rate_limits.db')
+                )
+            else:
+                self.rate_limit_store = MemoryRateLimitStore()
+        return RateLimitMiddleware(
+            rate, self.rate_limit_store, key, algorithm, name, cost, **options
+        )
+    
+    def configure_access_log(
+        self, path=None, fmt='combined', max_bytes=10 * 1024 * 1024, backup_count=5
+    ):
+        """Write access logs to `path` (stderr when None) as 'combined' or 'json'.
+        
+        Lines are queued and written in batches by a background thread; if
+        the queue fills up, lines are dropped and counted rather than
+        blocking requests. Pass `path=False` to disable access logging.
+        """
+        if self.access_log is not None:
+            self.access_log.close()
+        if path is False:
+            self.access_log = None
+        else:
+            self.access_log = AccessLogWriter(
+                path, fmt=fmt, max_bytes=max_bytes, backup_count=backup_count
+            )
+        return self.access_log
+    
+    def builtin_middleware(self):
+        """Framework middleware, outermost first, wrapped around app middleware.
+        
+        Metrics come first so latency covers everything (including shed
+        requests), then admission control, then compression so it sees
+        the final response body, then ETags (hashed before compression),
+        then sessions so their cookies are set on that response.
+        """
+        middleware = []
+        if self._metrics_middleware:
+            middleware.append(self._metrics_middleware)
+        if self.admission:
+            middleware.append(AdmissionMiddleware(self, self.admission))
+        if self.compressor:
+            middleware.append(self.compressor)
+        if self.etags:
+            middleware.append(self.etags)
+        if self.sessions:
+            middleware.append(SessionMiddleware(self.sessions))
+        return middleware
     
     def add_middleware(self, middleware_func):
-        """Add middleware function."""
+        """Add middleware that runs for every request.
+        
+        Accepts onion-style `middleware(request, next_handler)` callables,
+        objects with a `handle(request, next_handler)` method, and the
+        original `middleware(request) -> request` functions.
+        """
         self.middleware.append(middleware_func)
+        self._pipeline = None
+    
+    use = add_middleware
+    
+    def register_middleware(self, name, middleware_func):
+        """Register middleware under a name for use in route middleware lists."""
+        self.named_middleware[name] = middleware_func
+        self._pipeline = None
+    
+    def middleware_group(self, name, middleware_list):
+        """Register a named group of middleware (names or callables)."""
+        self.middleware_groups[name] = list(middleware_list)
+        self._pipeline = None
+    
+    def resolve_middleware(self, items, seen=()):
+        """Expand middleware names and groups into adapted callables."""
+        resolved = []
+        for item in items:
+            if isinstance(item, str):
+                if item in seen:
+                    raise ValueError(f"Middleware group '{item}' includes itself")
+                if item in self.middleware_groups:
+                    group = self.middleware_groups[item]
+                    resolved.extend(self.resolve_middleware(group, seen + (item,)))
+                elif item in self.named_middleware:
+                    resolved.append(as_middleware(self.named_middleware[item]))
+                else:
+                    raise ValueError(f"Unknown middleware: {item}")
+            else:
+                resolved.append(as_middleware(item))
+        return resolved
+    
+    def compile(self):
+        """Compose global and per-route middleware into callables.
+        
+        Runs once (at server start or on the first request after a
+        change), so handling a request is a plain chain of function calls
+        with no per-request middleware lookup.
+        """
+        self._route_chains = {
+            path: compose_middleware(
+                self.resolve_middleware(self.route_middleware.get(path, [])),
+                endpoint(self.resolve_handler(handler)),
+            )
+            for path, handler in self.routes.items()
+        }
+        for path, handlers in self.method_routes.items():
+            chains = {
+                method: compose_middleware(
+                    self.resolve_middleware(middleware),
+                    endpoint(self.resolve_handler(handler)),
+                )
+                for method, (handler, middleware) in handlers.items()
+            }
+            self._route_chains[path] = method_dispatcher(
+                chains, self._route_chains.get(path)
+            )
+        pipeline_middleware = self.builtin_middleware()
+        pipeline_middleware += self.resolve_middleware(self.middleware)
+        self._pipeline = compose_middleware(pipeline_middleware, self._route)
+        return self._pipeline
+    
+    def dispatch(self, request):
+        """Run a request through the middleware pipeline and router."""
+        pipeline = self._pipeline or self.compile()
+        try:
+            response = pipeline(request)
+        except HTTPError as e:
+            return error_response(e)
+        if not isinstance(response, LudwigResponse):
+            response = LudwigResponse.from_value(response)
+        return response
+    
+    def wsgi_app(self, environ, start_response):
+        """WSGI entry point, e.g. `gunicorn "main:app.wsgi_app"`.
+        
+        Requests and responses run through the same middleware and router
+        as the built-in server; file bodies use the server's
+        `wsgi.file_wrapper` and streaming bodies are passed through as
+        iterators.
+        """
+        request = None
+        try:
+            content_length = environ.get('CONTENT_LENGTH')
+            # Routes match PATH_INFO; SCRIPT_NAME is the mount prefix
+            # (request.root_path)
+            request = LudwigRequest(
+                environ['REQUEST_METHOD'],
+                urllib.parse.quote(
+                    environ.get('PATH_INFO', ''), safe=_PATH_SAFE, encoding='latin-1'
+                )
+                or '/',
+                environ.get('QUERY_STRING', ''),
+                RequestHeaders.from_environ(environ),
+                None,
+                (environ.get('REMOTE_ADDR'), int(environ.get('REMOTE_PORT') or 0)),
+                max_body_size=self.config.get('max_body_size', 10 * 1024 * 1024),
+                spool_threshold=self.config.get('upload_spool_size', 1024 * 1024),
+            )
+            request.root_path = environ.get('SCRIPT_NAME', '')
+            if request.method in LudwigRequest.BODY_METHODS and (
+                content_length or environ.get('wsgi.input_terminated')
+            ):
+                request.body_stream = RequestBodyStream(
+                    environ['wsgi.input'],
+                    int(content_length) if content_length else None,
+                    False,
+                    self.config.get('max_body_size', 10 * 1024 * 1024),
+                )
+            response = self.dispatch(request)
+        except HTTPError as e:
+            response = error_response(e)
+        except Exception as e:
+            response = error_response(HTTPError(500, f"Internal server error: {e}"))
+        
+        start_response(
+            status_line(response.status_code),
+            list(header_items(response_headers(response))),
+        )
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            body = []
+        elif isinstance(response, FileResponse):
+            body = iter_file_range(response.path, response.offset, response.length)
+            if response.offset == 0 and 'wsgi.file_wrapper' in environ \
+                    and response.length == os.path.getsize(response.path):
+                body = environ['wsgi.file_wrapper'](
+                    open(response.path, 'rb'), 64 * 1024
+                )
+        elif response.is_streaming:
+            body = iter_content(response.content)
+        else:
+            content = response.content
+            body = [content if isinstance(content, bytes) else content.encode('utf-8')]
+        return ClosingIterator(body, request.close if request is not None else None)
+    
+    async def asgi_app(self, scope, receive, send):
+        """ASGI entry point, e.g. `uvicorn "main:app.asgi_app"`.
+        
+        Handlers stay synchronous: each request runs on a worker thread
+        (`asgi_threads`, default 64) that pulls the body from `receive`
+        incrementally, and streaming bodies are produced on that thread
+        chunk by chunk. Files use `http.response.zerocopysend` when the
+        server offers it.
+        """
+        if scope['type'] == 'lifespan':
+            while True:
+                message = await receive()
+                if message['type'] == 'lifespan.startup':
+                    self.compile()
+                    await send({'type': 'lifespan.startup.complete'})
+                elif message['type'] == 'lifespan.shutdown':
+                    if self.access_log is not None:
+                        self.access_log.flush()
+                    await send({'type': 'lifespan.shutdown.complete'})
+                    return
+        if scope['type'] != 'http':
+            if scope['type'] == 'websocket':
+                await send({'type': 'websocket.close', 'code': 1003})
+            return
+        
+        loop = asyncio.get_running_loop()
+        if self._asgi_executor is None:
+            self._asgi_executor = concurrent.futures.ThreadPoolExecutor(
+                self.config.get('asgi_threads', 64), thread_name_prefix='ludwig-asgi')
+        executor = self._asgi_executor
+        request = None
+        try:
+            headers = RequestHeaders((name.decode('latin-1'), value.decode('latin-1'))
+                                     for name, value in scope['headers'])
+            raw_path = scope.get('raw_path')
+            root_path = scope.get('root_path', '')
+            request = LudwigRequest(
+                scope['method'],
+                strip_root_path(
+                    raw_path.decode('latin-1') if raw_path else scope['path'],
+                    urllib.parse.quote(root_path, safe=_PATH_SAFE),
+                ),
+                scope.get('query_string', b'').decode('latin-1'),
+                headers,
+                None,
+                scope.get('client'),
+                max_body_size=self.config.get('max_body_size', 10 * 1024 * 1024),
+                spool_threshold=self.config.get('upload_spool_size', 1024 * 1024),
+            )
+            request.root_path = root_path
+            if request.method in LudwigRequest.BODY_METHODS:
+                content_length = headers.get('Content-Length')
+                request.body_stream = RequestBodyStream(
+                    ASGIBodyReader(receive, loop),
+                    int(content_length) if content_length else None,
+                    False,
+                    self.config.get('max_body_size', 10 * 1024 * 1024),
+                )
+            response = await loop.run_in_executor(executor, self.dispatch, request)
+        except HTTPError as e:
+            response = error_response(e)
+        except Exception as e:
+            response = error_response(HTTPError(500, f"Internal server error: {e}"))
+        
+        try:
+            await send(
+                {
+                    'type': 'http.response.start',
+                    'status': response.status_code,
+                    'headers': [
+                        (name.encode('latin-1'), str(value).encode('latin-1'))
+                        for name, value in header_items(response_headers(response))
+                    ],
+                }
+            )
+            if scope['method'] == 'HEAD':
+                await send({'type': 'http.response.body', 'body': b''})
+            elif isinstance(response, FileResponse):
+                if 'http.response.zerocopysend' in scope.get('extensions', {}):
+                    with open(response.path, 'rb') as f:
+                        await send(
+                            {
+                                'type': 'http.response.zerocopysend',
+                                'file': f.fileno(),
+                                'offset': response.offset,
+                                'count': response.length,
+                            }
+                        )
+                else:
+                    await self._asgi_send_iter(
+                        iter_file_range(
+                            response.path, response.offset, response.length
+                        ),
+                        send,
+                        loop,
+                        executor,
+                    )
+            elif response.is_streaming:
+                await self._asgi_send_iter(
+                    iter_content(response.content), send, loop, executor
+                )
+            else:
+                content = response.content
+                await send(
+                    {
+                        'type': 'http.response.body',
+                        'body': (
+                            content
+                            if isinstance(content, bytes)
+                            else content.encode('utf-8')
+                        ),
+                    }
+                )
+        finally:
+            if request is not None:
+                await loop.run_in_executor(
+                    executor, functools.partial(request.close, drain=False)
+                )
+    
+    @staticmethod
+    async def _asgi_send_iter(chunks, send, loop, executor):
+        """Send a blocking iterator as ASGI body messages, one chunk at a time."""
+        try:
+            while True:
+                chunk = await loop.run_in_executor(executor, next, chunks, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send(
+                        {'type': 'http.response.body', 'body': chunk, 'more_body': True}
+                    )
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            chunks.close()
+    
+    def _route(self, request):
+        """Innermost step of the pipeline: static files, then routes."""
+        path = request.path
+        if request.method in ('GET', 'HEAD') and self.static_files.handles(path):
+            return self.static_files.respond(path, request.headers)
+        chain = self._route_chains.get(path)
+        if chain is None:
+            return error_response(HTTPError(404, f"Route not found: {path}"))
+        return chain(request)
+    
+    def make_server(self, host="localhost", port=8000):
+        """Create the HTTP server for this application without starting it."""
+        self.compile()
+        return LudwigHTTPServer((host, port), self._create_handler())
     
     def run(self, host="localhost", port=8000, debug=False):
         """Start the Ludwig web server."""
-        handler = self._create_handler()
-        
         try:
-            with socketserver.TCPServer((host, port), handler) as httpd:
+            with self.make_server(host, port) as httpd:
                 print(f"🚀 Ludwig Web Server running at http://{host}:{port}")
                 print("📁 Serving Ludwig application")
                 if debug:
@@ -57,157 +779,4233 @@ class LudwigWebFramework:
             print("\n🛑 Server stopped")
         except Exception as e:
             print(f"❌ Server error: {e}")
+        finally:
+            if self.access_log is not None:
+                self.access_log.flush()
     
     def _create_handler(self):
         """Create HTTP request handler class."""
         framework = self
         
-        class LudwigHTTPHandler(http.server.SimpleHTTPRequestHandler):
+        class LudwigHTTPHandler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            response_status = None
+            bytes_sent = 0
+            request_started = None
+            
             def do_GET(self):
                 self.handle_request('GET')
             
+            def do_HEAD(self):
+                self.handle_request('HEAD')
+            
             def do_POST(self):
                 self.handle_request('POST')
             
+            def do_PATCH(self):
+                self.handle_request('PATCH')
+            
             def do_PUT(self):
                 self.handle_request('PUT')
             
             def do_DELETE(self):
                 self.handle_request('DELETE')
             
-            def handle_request(self, method):
-                """Handle HTTP requests using Ludwig routing."""
+            def handle_one_request(self):
+                """Read one request under the connection limits, then dispatch it.
+                
+                Unlike the stdlib version, the request line and headers must
+                arrive within `read_timeout` in total and within the size and
+                count limits; otherwise the request is rejected (and counted)
+                before any routing happens.
+                """
+                limits = framework.limits
+                sock = self.connection
                 try:
-                    # Parse URL
-                    parsed_url = urllib.parse.urlparse(self.path)
-                    path = parsed_url.path
-                    query_params = urllib.parse.parse_qs(parsed_url.query)
+                    sock.settimeout(limits.idle_timeout)
+                    try:
+                        waiting = self.rfile.peek(1)
+                    except socket.timeout:
+                        limits.reject('idle_timeout')
+                        self.close_connection = True
+                        return
+                    if not waiting:
+                        self.close_connection = True
+                        return
+                    if self.server.RequestHandlerClass is not type(self):
+                        # The app was hot-reloaded; serve this request with the new one
+                        self.__class__ = self.server.RequestHandlerClass
+                        return self.handle_one_request()
                     
-                    # Create request object
-                    request = LudwigRequest(method, path, query_params, self)
+                    deadline = None
+                    if limits.read_timeout:
+                        deadline = time.monotonic() + limits.read_timeout
+                    sock.settimeout(limits.read_timeout)
+                    try:
+                        self.raw_requestline = read_line_before(
+                            self.rfile, sock, deadline, limits.max_request_line + 1)
+                        if len(self.raw_requestline) > limits.max_request_line:
+                            return self.reject_request('request_line_too_long', 414)
+                        header_lines = []
+                        header_bytes = 0
+                        while True:
+                            line = read_line_before(
+                                self.rfile, sock, deadline, limits.max_header_bytes + 1
+                            )
+                            header_bytes += len(line)
+                            if header_bytes > limits.max_header_bytes:
+                                return self.reject_request('header_too_large', 431)
+                            header_lines.append(line)
+                            if line in (b'\r\n', b'\n', b''):
+                                break
+                            if len(header_lines) > limits.max_header_count:
+                                return self.reject_request('too_many_headers', 431)
+                    except socket.timeout:
+                        return self.reject_request('read_timeout', 408)
                     
-                    # Apply middleware
-                    for middleware in framework.middleware:
-                        request = middleware(request)
-                        if hasattr(request, 'response'):
-                            self.send_ludwig_response(request.response)
-                            return
-                    
-                    # Check for static files
-                    for static_path, static_dir in framework.static_routes.items():
-                        if path.startswith(static_path):
-                            return super().do_GET()
-                    
-                    # Find route handler
-                    handler = framework.routes.get(path)
-                    if handler:
-                        response = handler(request)
-                        self.send_ludwig_response(response)
-                    else:
-                        self.send_error(404, f"Route not found: {path}")
+                    sock.settimeout(limits.read_timeout)
+                    rfile = self.rfile
+                    self.rfile = io.BytesIO(b''.join(header_lines))
+                    try:
+                        parsed = self.parse_request()
+                    finally:
+                        self.rfile = rfile
+                    if not parsed:
+                        return
+                    method = getattr(self, 'do_' + self.command, None)
+                    if method is None:
+                        self.send_error(501, "Unsupported method (%r)" % self.command)
+                        return
+                    method()
+                    self.wfile.flush()
+                except socket.timeout as e:
+                    self.log_error("Request timed out: %r", e)
+                    self.close_connection = True
+            
+            def reject_request(self, kind, status):
+                """Count a rejected request, answer it with `status` and close."""
+                framework.limits.reject(kind)
+                self.requestline = (
+                    self.raw_requestline[:200].decode('iso-8859-1').rstrip('\r\n')
+                )
+                self.request_version = 'HTTP/1.1'
+                self.command = ''
+                self.close_connection = True
+                try:
+                    self.send_error(status)
+                except OSError:
+                    pass
+            
+            def handle_request(self, method):
+                """Handle HTTP requests using Ludwig routing."""
+                request = None
+                writing = False
+                self.response_status = None
+                self.bytes_sent = 0
+                self.request_started = time.time()
+                try:
+                    # Create request object (rejects oversized bodies up front)
+                    request = LudwigRequest.from_handler(
+                        self, method,
+                        framework.config.get('max_body_size', 10 * 1024 * 1024),
+                        framework.config.get('upload_spool_size', 1024 * 1024))
+                    response = framework.dispatch(request)
+                    body = request.body_stream
+                    if (
+                        body is not None
+                        and body.max_size is not None
+                        and body.bytes_read > body.max_size
+                    ):
+                        framework.limits.reject('body_too_large')
+                    writing = True
+                    self.connection.settimeout(framework.limits.write_timeout)
+                    self.send_ludwig_response(response)
                 
+                except socket.timeout:
+                    framework.limits.reject(
+                        'write_timeout' if writing else 'read_timeout'
+                    )
+                    self.close_connection = True
+                    if not writing:
+                        self.send_error(408)
+                except HTTPError as e:
+                    if e.status_code == 413:
+                        framework.limits.reject('body_too_large')
+                    self.send_error(e.status_code, e.message)
                 except Exception as e:
                     self.send_error(500, f"Internal server error: {e}")
+                finally:
+                    if request is not None:
+                        try:
+                            if not request.close(drain=not self.close_connection):
+                                self.close_connection = True
+                        except (HTTPError, OSError):
+                            self.close_connection = True
+                    self.write_access_log()
+            
+            def log_request(self, code='-', size='-'):
+                """Remember the status for the access log instead of printing it."""
+                self.response_status = getattr(code, 'value', code)
+                if self.request_started is None:
+                    # Error raised before routing (e.g. malformed request line)
+                    self.write_access_log()
+            
+            def write_access_log(self):
+                if framework.access_log is not None:
+                    headers = getattr(self, 'headers', None) or {}
+                    started = self.request_started or time.time()
+                    framework.access_log.log(
+                        self.client_address[0], self.requestline, self.response_status,
+                        self.bytes_sent, headers.get('Referer'),
+                        headers.get('User-Agent'), time.time() - started)
+                self.request_started = None
             
             def send_ludwig_response(self, response):
                 """Send Ludwig response object."""
-                if isinstance(response, LudwigResponse):
-                    self.send_response(response.status_code)
-                    for header, value in response.headers.items():
+                if not isinstance(response, LudwigResponse):
+                    response = LudwigResponse.from_value(response)
+                if isinstance(response, WebSocketResponse):
+                    self.send_response(101)
+                    for header, value in header_items(response.headers):
                         self.send_header(header, value)
                     self.end_headers()
-                    self.wfile.write(response.content.encode('utf-8'))
-                elif isinstance(response, str):
-                    # Simple string response
-                    self.send_response(200)
-                    self.send_header('Content-type', 'text/html')
+                    # The socket now belongs to the WebSocket until it closes;
+                    # it keeps itself alive with pings, so no socket timeout
+                    self.close_connection = True
+                    self.connection.settimeout(None)
+                    response.run(self.rfile, self.wfile)
+                elif isinstance(response, FileResponse):
+                    self.send_response(response.status_code)
+                    for header, value in header_items(response.headers):
+                        self.send_header(header, value)
                     self.end_headers()
-                    self.wfile.write(response.encode('utf-8'))
+                    if self.command != 'HEAD' and response.length:
+                        with open(response.path, 'rb') as f:
+                            self.bytes_sent = self.connection.sendfile(
+                                f, response.offset, response.length
+                            )
+                elif response.is_streaming:
+                    self.send_streaming_response(response)
                 else:
-                    # JSON response
-                    self.send_response(200)
-                    self.send_header('Content-type', 'application/json')
+                    content = response.content
+                    body = (
+                        content
+                        if isinstance(content, bytes)
+                        else content.encode('utf-8')
+                    )
+                    headers = response.headers
+                    self.send_response(response.status_code)
+                    for header, value in header_items(headers):
+                        self.send_header(header, value)
+                    if (
+                        'Content-Length' not in headers
+                        and response.status_code not in (204, 304)
+                    ):
+                        self.send_header('Content-Length', str(len(body)))
                     self.end_headers()
-                    self.wfile.write(json.dumps(response).encode('utf-8'))
+                    if self.command != 'HEAD':
+                        self.wfile.write(body)
+                        self.bytes_sent = len(body)
+            
+            def send_streaming_response(self, response):
+                """Stream an iterator or file body, chunked for HTTP/1.1 clients.
+                
+                Each chunk is written to the socket before the next one is
+                pulled from the body, so a slow client throttles the producer
+                instead of letting output pile up in memory.
+                """
+                chunks = iter_content(response.content)
+                chunked = (
+                    self.request_version == 'HTTP/1.1'
+                    and 'Content-Length' not in response.headers
+                )
+                self.send_response(response.status_code)
+                for header, value in header_items(response.headers):
+                    self.send_header(header, value)
+                if chunked:
+                    self.send_header('Transfer-Encoding', 'chunked')
+                elif 'Content-Length' not in response.headers:
+                    self.send_header('Connection', 'close')
+                    self.close_connection = True
+                self.end_headers()
+                
+                try:
+                    if self.command == 'HEAD':
+                        return
+                    for chunk in chunks:
+                        if not chunk:
+                            continue
+                        if chunked:
+                            self.wfile.write(b'%X\r\n%s\r\n' % (len(chunk), chunk))
+                        else:
+                            self.wfile.write(chunk)
+                        self.bytes_sent += len(chunk)
+                    if chunked:
+                        self.wfile.write(b'0\r\n\r\n')
+                except Exception as e:
+                    # Headers are already out; all we can do is drop the connection
+                    self.close_connection = True
+                    self.log_error("Streaming response aborted: %s", e)
+                finally:
+                    chunks.close()
         
         return LudwigHTTPHandler
 
 
-class LudwigRequest:
-    """Ludwig HTTP request object."""
+def as_middleware(middleware):
+    """Adapt any supported middleware style to `mw(request, next_handler)`."""
+    if hasattr(middleware, 'handle'):
+        return middleware.handle
+    try:
+        positional = [
+            p
+            for p in inspect.signature(middleware).parameters.values()
+            if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD, p.VAR_POSITIONAL)
+        ]
+    except (TypeError, ValueError):
+        positional = [None, None]
+    if len(positional) >= 2 or any(
+        p is not None and p.kind == p.VAR_POSITIONAL for p in positional
+    ):
+        return middleware
     
-    def __init__(self, method, path, query_params, handler):
-        self.method = method
-        self.path = path
-        self.query_params = query_params
-        self.handler = handler
-        self.params = {}  # URL parameters
-        self.form_data = {}  # Form data for POST requests
-        
-        # Parse form data for POST requests
-        if method == 'POST':
-            self._parse_form_data()
+    # Original style: middleware(request) returns the request, and sets
+    # request.response to short-circuit
+    @functools.wraps(middleware)
+    def legacy(request, next_handler):
+        result = middleware(request)
+        if result is None:
+            result = request
+        if hasattr(result, 'response'):
+            return result.response
+        return next_handler(result)
+    return legacy
+
+
+def compose_middleware(middleware, handler):
+    """Wrap `handler` in `middleware`, first item outermost."""
+    for mw in reversed(middleware):
+        handler = functools.partial(_call_middleware, mw, handler)
+    return handler
+
+
+def _call_middleware(middleware, next_handler, request):
+    return middleware(request, next_handler)
+
+
+def endpoint(handler):
+    """Wrap a route handler so it always returns a LudwigResponse."""
+    def call(request):
+        try:
+            response = handler(request)
+        except HTTPError as e:
+            return error_response(e)
+        if isinstance(response, LudwigResponse):
+            return response
+        return LudwigResponse.from_value(response)
+    return call
+
+
+def error_response(error):
+    """Turn an HTTPError into an error page response."""
+    return LudwigWeb.error(error.status_code, html.escape(error.message))
+
+
+def method_dispatcher(chains, fallback=None):
+    """Route chain that picks a per-method chain (HEAD falls back to GET), else 405."""
+    allow = ', '.join(sorted(set(chains) | ({'HEAD'} if 'GET' in chains else set())))
     
-    def _parse_form_data(self):
-        """Parse form data from POST request."""
+    def dispatch_method(request):
+        chain = chains.get(request.method)
+        if chain is None and request.method == 'HEAD':
+            chain = chains.get('GET')
+        if chain is None:
+            chain = fallback
+        if chain is None:
+            response = error_response(
+                HTTPError(405, f"Method not allowed: {request.method}")
+            )
+            response.headers['Allow'] = allow
+            return response
+        return chain(request)
+    return dispatch_method
+
+
+def locate_handler(ref, package='controllers'):
+    """Find where a string handler reference lives.
+    
+    Accepts "module.path:function", "module.path:Controller.action" and
+    Laravel-style "HomeController.index", which is looked up in
+    `package` as controllers/home_controller.py, controllers/home.py,
+    controllers/HomeController.py or the package itself. Returns
+    (module_name, object_name, action_or_None).
+    """
+    if ':' in ref:
+        module_name, _, attribute = ref.partition(':')
+        object_name, _, action = attribute.partition('.')
+        return module_name, object_name, action or None
+    controller, _, action = ref.rpartition('.')
+    if not controller or not action:
+        raise LookupError(
+            f"Handler reference must look like 'Controller.action': {ref}"
+        )
+    snake = re.sub(r'(?<!^)(?=[A-Z])', '_', controller).lower()
+    candidates = [
+        f"{package}.{snake}",
+        (
+            f"{package}.{snake[:-len('_controller')]}"
+            if snake.endswith('_controller')
+            else None
+        ),
+        f"{package}.{controller}",
+        package,
+    ]
+    for module_name in filter(None, candidates):
         try:
-            content_length = int(self.handler.headers.get('Content-Length', 0))
-            if content_length > 0:
-                post_data = self.handler.rfile.read(content_length).decode('utf-8')
-                self.form_data = urllib.parse.parse_qs(post_data)
-                # Convert single-item lists to values
-                for key, value in self.form_data.items():
-                    if len(value) == 1:
-                        self.form_data[key] = value[0]
-        except (ValueError, UnicodeDecodeError) as e:
-            # Ignore malformed form data
-            pass
+            module = importlib.import_module(module_name)
+        except ModuleNotFoundError as e:
+            if e.name and (
+                module_name == e.name or module_name.startswith(e.name + '.')
+            ):
+                continue
+            raise
+        if hasattr(module, controller):
+            return module_name, controller, action
+    raise LookupError(f"Cannot resolve handler reference: {ref}")
 
 
-class LudwigResponse:
-    """Ludwig HTTP response object."""
+def load_handler(module_name, object_name, action=None, instances=None):
+    """Import a located handler.
     
-    def __init__(self, content="", status_code=200, headers=None):
-        self.content = content
+    Controller classes are instantiated once per `instances` dict.
+    """
+    target = getattr(importlib.import_module(module_name), object_name)
+    if action is None:
+        return target
+    if inspect.isclass(target):
+        instances = {} if instances is None else instances
+        key = (module_name, object_name)
+        if key not in instances:
+            instances[key] = target()
+        target = instances[key]
+    return getattr(target, action)
+
+
+# route("GET", "/path", "Controller.action"[, ["middleware", ...]]) in Ludwig sources
+_LUDWIG_ROUTE_RE = re.compile(
+    r'\b(?:api_)?route\(\s*"([A-Za-z]+)"\s*,\s*"([^"]+)"\s*,\s*"([^"]+)"\s*'
+    r'(?:,\s*\[([^\]]*)\])?\s*\)'
+)
+
+
+def read_route_definitions(path):
+    """Read route definitions from a routes file.
+    
+    Returns ([(method, path, handler_ref, middleware, priority)], groups).
+    
+    A Python file defines `routes` (tuples of method, path, handler and
+    optionally middleware and priority) and optionally
+    `middleware_groups`; any other file (e.g. main.ludwig) is scanned for
+    `route("GET", "/", "HomeController.index", ["auth"])` calls.
+    """
+    if path.endswith('.py'):
+        loader = importlib.machinery.SourceFileLoader(
+            'ludwig_routes', os.path.abspath(path)
+        )
+        module = importlib.util.module_from_spec(
+            importlib.util.spec_from_loader('ludwig_routes', loader)
+        )
+        loader.exec_module(module)
+        definitions = []
+        for entry in getattr(module, 'routes', []):
+            method, route_path, handler = entry[:3]
+            middleware = list(entry[3]) if len(entry) > 3 and entry[3] else []
+            priority = entry[4] if len(entry) > 4 else 'normal'
+            definitions.append(
+                (method.upper(), route_path, handler, middleware, priority)
+            )
+        return definitions, dict(getattr(module, 'middleware_groups', {}))
+    
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    definitions = []
+    for method, route_path, handler, middleware in _LUDWIG_ROUTE_RE.findall(source):
+        names = [
+            name.strip().strip('"\'') for name in middleware.split(',') if name.strip()
+        ]
+        definitions.append((method.upper(), route_path, handler, names, 'normal'))
+    return definitions, {}
+
+
+def expand_middleware_groups(names, groups, seen=()):
+    """Flatten group names using `groups`; other names are kept for runtime lookup."""
+    expanded = []
+    for name in names:
+        if name in groups:
+            if name in seen:
+                raise ValueError(f"Middleware group '{name}' includes itself")
+            expanded.extend(
+                expand_middleware_groups(groups[name], groups, seen + (name,))
+            )
+        else:
+            expanded.append(name)
+    return expanded
+
+
+def compile_route_table(definitions, groups=None, package='controllers'):
+    """Resolve route definitions into a JSON-serializable route table.
+    
+    Controller references are located and middleware groups expanded once
+    here, so loading the table at startup only imports the target modules.
+    Every reference is imported now, so a handler that could not be found
+    at startup (e.g. a function defined in routes.py itself, or a lambda)
+    fails here with a LookupError instead.
+    """
+    routes = []
+    for method, path, handler, middleware, priority in definitions:
+        if not isinstance(handler, str):
+            handler = f"{handler.__module__}:{handler.__qualname__}"
+        module_name, object_name, action = locate_handler(handler, package)
+        try:
+            target = getattr(importlib.import_module(module_name), object_name)
+            if action is not None:
+                getattr(target, action)
+        except (ImportError, AttributeError) as e:
+            raise LookupError(
+                f"Route {method} {path}: handler {handler!r} cannot be imported "
+                f"at startup ({e}). Define it in an importable module and "
+                f"reference it as 'module:function' or 'Controller.action'"
+            ) from e
+        routes.append({
+            'method': method,
+            'path': path,
+            'module': module_name,
+            'object': object_name,
+            'action': action,
+            'middleware': expand_middleware_groups(middleware, groups or {}),
+            'priority': priority,
+        })
+    return {
+        'version': 1,
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'routes': routes,
+    }
+
+
+def write_route_cache(table, path):
+    """Atomically write a compiled route table."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(table, f, indent=1)
+    os.replace(temporary, path)
+
+
+class ConnectionLimits:
+    """Per-connection timeouts and request-size limits for the built-in server.
+    
+    `idle_timeout` bounds the wait for the next request on a connection,
+    `read_timeout` is a hard deadline for the request line and headers
+    (and the per-read timeout for the body), and `write_timeout` bounds
+    each write of the response. Rejections are counted by kind in
+    `rejected`.
+    """
+    
+    KINDS = ('idle_timeout', 'read_timeout', 'write_timeout', 'request_line_too_long',
+             'header_too_large', 'too_many_headers', 'body_too_large')
+    
+    def __init__(self, read_timeout=20.0, idle_timeout=30.0, write_timeout=60.0,
+                 max_request_line=8190, max_header_bytes=64 * 1024,
+                 max_header_count=100):
+        self.read_timeout = read_timeout
+        self.idle_timeout = idle_timeout
+        self.write_timeout = write_timeout
+        self.max_request_line = max_request_line
+        self.max_header_bytes = max_header_bytes
+        self.max_header_count = max_header_count
+        self.rejected = dict.fromkeys(self.KINDS, 0)
+        self._lock = threading.Lock()
+    
+    def reject(self, kind):
+        with self._lock:
+            self.rejected[kind] += 1
+    
+    def stats(self):
+        with self._lock:
+            return dict(self.rejected)
+
+
+def read_line_before(rfile, sock, deadline, limit):
+    """Read one line (at most `limit` bytes) from a buffered socket file by `deadline`.
+    
+    Each step performs at most one recv with the socket timeout set to
+    the time left, so a client trickling bytes cannot stretch the read
+    past the deadline. Raises socket.timeout when time runs out (an alias
+    of TimeoutError from Python 3.10).
+    """
+    line = b''
+    while len(line) < limit:
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout("Request header deadline exceeded")
+            sock.settimeout(remaining)
+        buffered = rfile.peek(1)
+        if not buffered:
+            break
+        end = buffered.find(b'\n', 0, limit - len(line))
+        line += rfile.read(
+            end + 1 if end >= 0 else min(len(buffered), limit - len(line))
+        )
+        if end >= 0:
+            break
+    return line
+
+
+class LudwigHTTPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """Threaded TCP server used to serve Ludwig applications.
+    
+    Each connection gets its own thread, so a keep-alive or streaming
+    client does not hold up other requests.
+    """
+    
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+_MISSING = object()
+
+
+class HTTPError(Exception):
+    """Error that maps directly to an HTTP status response."""
+    
+    def __init__(self, status_code, message=""):
+        super().__init__(message)
         self.status_code = status_code
-        self.headers = headers or {'Content-type': 'text/html'}
+        self.message = message
 
 
-class LudwigWeb:
-    """Ludwig Web utilities and helpers."""
+class RequestBodyStream:
+    """File-like reader over a request body.
     
-    @staticmethod
-    def create_application(config=None):
-        """Create a new Ludwig web application."""
-        return LudwigWebFramework(config)
+    Handles Content-Length, chunked and (with `content_length=None`)
+    read-until-EOF bodies, and raises a 413 HTTPError as soon as more
+    than `max_size` bytes would be read.
+    """
     
-    @staticmethod
-    def render(template_name, context=None):
-        """Render an HTML template with context."""
-        context = context or {}
+    def __init__(self, rfile, content_length=0, chunked=False, max_size=None):
+        self.rfile = rfile
+        self.chunked = chunked
+        self.max_size = max_size
+        self.remaining = (
+            0
+            if chunked
+            else (float('inf') if content_length is None else content_length)
+        )
+        self.bytes_read = 0
+        self.finished = not chunked and content_length == 0
+        self._chunk_left = 0
+        
+        if (
+            max_size is not None
+            and not chunked
+            and content_length is not None
+            and content_length > max_size
+        ):
+            raise HTTPError(413, f"Request body exceeds {max_size} bytes")
+    
+    def read(self, size=-1):
+        """Read up to `size` bytes (everything when size < 0)."""
+        if size is None or size < 0:
+            parts = []
+            while True:
+                block = self.read(64 * 1024)
+                if not block:
+                    return b''.join(parts)
+                parts.append(block)
+        if self.finished or size == 0:
+            return b''
+        data = self._read_chunked(size) if self.chunked else self._read_plain(size)
+        self.bytes_read += len(data)
+        if self.max_size is not None and self.bytes_read > self.max_size:
+            raise HTTPError(413, f"Request body exceeds {self.max_size} bytes")
+        return data
+    
+    def _read_plain(self, size):
+        data = self.rfile.read(min(size, self.remaining))
+        self.remaining -= len(data)
+        if not data or self.remaining <= 0:
+            self.finished = True
+        return data
+    
+    def _read_chunked(self, size):
+        if self._chunk_left == 0:
+            line = self.rfile.readline(1024)
+            try:
+                self._chunk_left = int(line.split(b';', 1)[0].strip(), 16)
+            except ValueError:
+                raise HTTPError(400, "Malformed chunked request body")
+            if self._chunk_left == 0:
+                # Skip trailers up to the blank line
+                while self.rfile.readline(1024) not in (b'\r\n', b'\n', b''):
+                    pass
+                self.finished = True
+                return b''
+        data = self.rfile.read(min(size, self._chunk_left))
+        if not data:
+            self.finished = True
+            return b''
+        self._chunk_left -= len(data)
+        if self._chunk_left == 0:
+            self.rfile.readline(1024)
+        return data
+    
+    def drain(self, limit=64 * 1024):
+        """Discard an unread body so the connection can be reused.
+        
+        Returns False if more than `limit` bytes remain, in which case the
+        caller should close the connection instead.
+        """
+        discarded = 0
+        while not self.finished:
+            block = self.read(min(64 * 1024, limit - discarded + 1))
+            discarded += len(block)
+            if discarded > limit:
+                return False
+        return True
+
+
+class UploadedFile:
+    """A file part from a multipart/form-data request.
+    
+    Small files stay in memory; anything above the spool threshold is
+    written to a temporary file as it arrives.
+    """
+    
+    def __init__(self, filename, content_type, spool_threshold):
+        self.filename = filename
+        self.content_type = content_type
+        self.size = 0
+        self.file = tempfile.SpooledTemporaryFile(max_size=spool_threshold)
+    
+    def write(self, data):
+        self.size += len(data)
+        self.file.write(data)
+    
+    def read(self):
+        """Return the full file contents."""
+        self.file.seek(0)
+        return self.file.read()
+    
+    def save(self, path):
+        """Copy the upload to `path`."""
+        self.file.seek(0)
+        with open(path, 'wb') as f:
+            shutil.copyfileobj(self.file, f)
+    
+    def close(self):
+        self.file.close()
+
+
+class MultipartParser:
+    """Incremental multipart/form-data parser.
+    
+    Reads the body in fixed-size blocks and never holds more than one
+    block plus a boundary's worth of data in memory; file parts are
+    streamed into UploadedFile objects.
+    """
+    
+    BLOCK_SIZE = 64 * 1024
+    MAX_HEADER_SIZE = 16 * 1024
+    
+    def __init__(self, stream, boundary, spool_threshold=1024 * 1024, encoding='utf-8'):
+        self.stream = stream
+        self.boundary = b'--' + boundary.encode('latin-1')
+        self.spool_threshold = spool_threshold
+        self.encoding = encoding
+        self.fields = {}
+        self.files = {}
+    
+    def parse(self):
+        """Parse the whole body, returning (fields, files)."""
+        buffer = b''
+        delimiter = b'\r\n' + self.boundary
         
-        # Look for template in views directory
-        template_path = os.path.join('views', template_name)
+        # Preamble: everything before the first boundary line
+        while True:
+            index = buffer.find(self.boundary)
+            if index >= 0:
+                buffer = buffer[index + len(self.boundary):]
+                break
+            buffer = buffer[-len(self.boundary):] + self._read_block(required=True)
         
-        if os.path.exists(template_path):
-            with open(template_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+        while True:
+            while len(buffer) < 2:
+                buffer += self._read_block(required=True)
+            if buffer.startswith(b'--'):
+                break
+            buffer = buffer[2:]  # CRLF after the boundary
             
-            # Simple template rendering - replace {{ variable }} with values
-            for key, value in context.items():
-                content = content.replace('{{ ' + key + ' }}', str(value))
-                content = content.replace('{{' + key + '}}', str(value))
+            while b'\r\n\r\n' not in buffer:
+                if len(buffer) > self.MAX_HEADER_SIZE:
+                    raise HTTPError(400, "Multipart part headers too large")
+                buffer += self._read_block(required=True)
+            raw_headers, buffer = buffer.split(b'\r\n\r\n', 1)
+            name, filename, content_type = self._parse_part_headers(raw_headers)
             
-            return LudwigResponse(content)
-        else:
-            return LudwigResponse(f"Template not found: {template_name}", 404)
+            if filename is not None:
+                target = UploadedFile(filename, content_type, self.spool_threshold)
+                write = target.write
+            else:
+                value_parts = []
+                write = value_parts.append
+            
+            while True:
+                index = buffer.find(delimiter)
+                if index >= 0:
+                    write(buffer[:index])
+                    buffer = buffer[index + len(delimiter):]
+                    break
+                # Keep a tail in case the delimiter straddles two blocks
+                keep = len(delimiter) - 1
+                if len(buffer) > keep:
+                    write(buffer[:-keep])
+                    buffer = buffer[-keep:]
+                buffer += self._read_block(required=True)
+            
+            if filename is not None:
+                target.file.seek(0)
+                self._add(self.files, name, target)
+            else:
+                self._add(
+                    self.fields,
+                    name,
+                    b''.join(value_parts).decode(self.encoding, 'replace'),
+                )
+        
+        return self.fields, self.files
+    
+    def _read_block(self, required=False):
+        block = self.stream.read(self.BLOCK_SIZE)
+        if required and not block:
+            raise HTTPError(400, "Unexpected end of multipart body")
+        return block
+    
+    def _parse_part_headers(self, raw_headers):
+        name = filename = None
+        content_type = 'application/octet-stream'
+        for line in raw_headers.decode(self.encoding, 'replace').split('\r\n'):
+            key, _, value = line.partition(':')
+            key = key.strip().lower()
+            if key == 'content-disposition':
+                for param in value.split(';')[1:]:
+                    param_name, _, param_value = param.strip().partition('=')
+                    param_value = param_value.strip().strip('"')
+                    if param_name.lower() == 'name':
+                        name = param_value
+                    elif param_name.lower() == 'filename':
+                        filename = os.path.basename(param_value.replace('\\', '/'))
+            elif key == 'content-type':
+                content_type = value.strip()
+        if name is None:
+            raise HTTPError(400, "Multipart part without a name")
+        return name, filename, content_type
     
     @staticmethod
-    def json_response(data, status_code=200):
-        """Return JSON response."""
-        headers = {'Content-type': 'application/json'}
-        content = json.dumps(data)
-        return LudwigResponse(content, status_code, headers)
+    def _add(target, name, value):
+        if name in target:
+            existing = target[name]
+            if isinstance(existing, list):
+                existing.append(value)
+            else:
+                target[name] = [existing, value]
+        else:
+            target[name] = value
+
+
+def parse_content_type(header):
+    """Split a Content-Type header into (mime type, params dict)."""
+    mime_type, *params = (header or '').split(';')
+    parsed = {}
+    for param in params:
+        key, _, value = param.strip().partition('=')
+        parsed[key.lower()] = value.strip().strip('"')
+    return mime_type.strip().lower(), parsed
+
+# Characters left unescaped when rebuilding a raw path from WSGI's PATH_INFO
+_PATH_SAFE = "/:@!$&'()*+,;=-._~"
+
+
+class RequestHeaders(Mapping):
+    """Case-insensitive, read-only request headers for the WSGI/ASGI adapters."""
+    
+    def __init__(self, pairs=()):
+        self._headers = {}
+        for name, value in pairs:
+            key = name.lower()
+            if key in self._headers:
+                separator = '; ' if key == 'cookie' else ', '
+                value = self._headers[key][1] + separator + value
+            self._headers[key] = (name.title(), value)
+    
+    @classmethod
+    def from_environ(cls, environ):
+        pairs = [
+            (key[5:].replace('_', '-'), value)
+            for key, value in environ.items()
+            if key.startswith('HTTP_')
+        ]
+        for key, name in (
+            ('CONTENT_TYPE', 'Content-Type'),
+            ('CONTENT_LENGTH', 'Content-Length'),
+        ):
+            if environ.get(key):
+                pairs.append((name, environ[key]))
+        return cls(pairs)
+    
+    def __getitem__(self, name):
+        return self._headers[name.lower()][1]
+    
+    def __contains__(self, name):
+        return isinstance(name, str) and name.lower() in self._headers
+    
+    def __iter__(self):
+        return (name for name, _ in self._headers.values())
+    
+    def __len__(self):
+        return len(self._headers)
+
+
+class ASGIBodyReader:
+    """Blocking file-like view of an ASGI request body for worker threads.
+    
+    Each `read` that runs out of buffered data asks the event loop for the
+    next `http.request` message, so bodies are consumed incrementally.
+    """
+    
+    def __init__(self, receive, loop):
+        self.receive = receive
+        self.loop = loop
+        self.buffer = b''
+        self.more = True
+    
+    def read(self, size=-1):
+        while self.more and (size < 0 or len(self.buffer) < size):
+            message = asyncio.run_coroutine_threadsafe(
+                self.receive(), self.loop
+            ).result()
+            if message['type'] == 'http.disconnect':
+                self.more = False
+                break
+            self.buffer += message.get('body', b'')
+            self.more = message.get('more_body', False)
+        if size < 0 or size >= len(self.buffer):
+            data, self.buffer = self.buffer, b''
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+class ClosingIterator:
+    """WSGI body that calls `on_close` (and closes the inner iterable) when done."""
+    
+    def __init__(self, iterable, on_close=None):
+        self.iterable = iterable
+        self.on_close = on_close
+    
+    def __iter__(self):
+        return iter(self.iterable)
+    
+    def close(self):
+        try:
+            close = getattr(self.iterable, 'close', None)
+            if close:
+                close()
+        finally:
+            if self.on_close:
+                self.on_close(drain=False)
+
+
+def strip_root_path(path, root_path):
+    """Remove an ASGI mount prefix from a request path ('/app/hello' -> '/hello').
+    
+    The ASGI spec has `path` include `root_path`, but not every server
+    follows it, so paths without the prefix are returned unchanged.
+    """
+    root_path = root_path.rstrip('/')
+    if root_path and (path == root_path or path.startswith(root_path + '/')):
+        return path[len(root_path):] or '/'
+    return path
+
+
+def status_line(status_code):
+    """'200 OK'-style status line for WSGI."""
+    try:
+        return f"{status_code} {http.HTTPStatus(status_code).phrase}"
+    except ValueError:
+        return f"{status_code} Unknown"
+
+
+def response_headers(response):
+    """Response headers plus the Content-Length the built-in server would add."""
+    headers = response.headers
+    if (
+        'Content-Length' not in headers
+        and not response.is_streaming
+        and response.status_code not in (204, 304)
+        and not isinstance(response, FileResponse)
+    ):
+        content = response.content
+        headers = dict(headers)
+        headers['Content-Length'] = str(
+            len(content if isinstance(content, bytes) else content.encode('utf-8'))
+        )
+    return headers
+
+
+def iter_file_range(path, offset, length, chunk_size=64 * 1024):
+    """Yield `length` bytes of a file starting at `offset`."""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        remaining = length
+        while remaining > 0:
+            block = f.read(min(chunk_size, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+class LudwigRequest:
+    """Ludwig HTTP request object.
+    
+    Everything beyond the request line is parsed on first use: query
+    parameters, cookies, form fields, uploads and JSON are computed once
+    and cached, so handlers that never look at them pay nothing. The
+    request also behaves like a dict (`request.get('headers')`,
+    `request['user'] = ...`) for middleware written against that style.
+    """
+    
+    __slots__ = (
+        'method', 'path', 'query_string', 'headers', 'handler', 'client_address',
+        'params', 'response', 'spool_threshold', 'body_stream', 'session_manager',
+        'root_path', '_query_params', '_cookies', '_body', '_form_data', '_files',
+        '_json', '_json_loaded', '_session', '_state',
+    )
+    
+    BODY_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+    _LAZY = ('query_params', 'cookies', 'remote_addr', 'content_type', 'body',
+             'form_data', 'files', 'json', 'session')
+    
+    def __init__(self, method, path, query_string='', headers=None, rfile=None,
+                 client_address=None, handler=None, max_body_size=None,
+                 spool_threshold=1024 * 1024):
+        self._state = {}
+        self.method = method
+        self.path = path
+        self.query_string = query_string
+        self.headers = headers if headers is not None else {}
+        self.handler = handler
+        self.client_address = client_address
+        self.params = {}  # URL parameters
+        self.spool_threshold = spool_threshold
+        self.body_stream = None
+        self.session_manager = None
+        # Mount prefix under WSGI/ASGI (SCRIPT_NAME / root_path), for building URLs
+        self.root_path = ''
+        self._query_params = None
+        self._cookies = None
+        self._body = None
+        self._form_data = None
+        self._files = None
+        self._json = None
+        self._json_loaded = False
+        self._session = None
+        
+        if method in self.BODY_METHODS and rfile is not None:
+            chunked = 'chunked' in self.headers.get('Transfer-Encoding', '').lower()
+            try:
+                content_length = int(self.headers.get('Content-Length') or 0)
+            except ValueError:
+                raise HTTPError(400, "Invalid Content-Length")
+            self.body_stream = RequestBodyStream(
+                rfile, content_length, chunked, max_body_size
+            )
+    
+    @classmethod
+    def from_handler(cls, handler, method, max_body_size=None,
+                     spool_threshold=1024 * 1024):
+        """Build a request from a BaseHTTPRequestHandler."""
+        path, _, query_string = handler.path.partition('?')
+        return cls(method, path, query_string, handler.headers, handler.rfile,
+                   handler.client_address, handler, max_body_size, spool_threshold)
+    
+    # Dict-style access for middleware ----------------------------------
+    
+    def get(self, key, default=None):
+        """Look up a request attribute or middleware-supplied value."""
+        if key in self._state:
+            return self._state[key]
+        if key in self.__slots__ or key in self._LAZY:
+            value = getattr(self, key, default)
+            return default if value is None else value
+        return default
+    
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+    
+    def __setitem__(self, key, value):
+        if key in self.__slots__ and not key.startswith('_'):
+            setattr(self, key, value)
+        else:
+            self._state[key] = value
+    
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+    
+    def __getattr__(self, name):
+        # Only reached for names that are not slots or properties
+        try:
+            return object.__getattribute__(self, '_state')[name]
+        except KeyError:
+            raise AttributeError(f"'LudwigRequest' object has no attribute '{name}'")
+    
+    # Lazily parsed parts -----------------------------------------------
+    
+    @property
+    def query_params(self):
+        """Query string parameters as {name: [values]}."""
+        if self._query_params is None:
+            self._query_params = (
+                urllib.parse.parse_qs(self.query_string) if self.query_string else {}
+            )
+        return self._query_params
+    
+    @property
+    def cookies(self):
+        """Request cookies as {name: value}."""
+        if self._cookies is None:
+            self._cookies = {}
+            header = self.headers.get('Cookie')
+            if header:
+                jar = http.cookies.SimpleCookie()
+                try:
+                    jar.load(header)
+                except http.cookies.CookieError:
+                    pass
+                self._cookies = {name: morsel.value for name, morsel in jar.items()}
+        return self._cookies
+    
+    @property
+    def remote_addr(self):
+        """Client IP address, if known."""
+        return self.client_address[0] if self.client_address else None
+    
+    @property
+    def content_type(self):
+        """Request MIME type without parameters."""
+        return parse_content_type(self.headers.get('Content-Type'))[0]
+    
+    @property
+    def body(self):
+        """Raw request body as bytes."""
+        if self._body is None:
+            self._body = self.body_stream.read() if self.body_stream else b''
+        return self._body
+    
+    @property
+    def form_data(self):
+        """Form fields from urlencoded or multipart bodies."""
+        if self._form_data is None:
+            self._parse_form_data()
+        return self._form_data
+    
+    @form_data.setter
+    def form_data(self, value):
+        self._form_data = value
+    
+    @property
+    def files(self):
+        """Uploaded files from a multipart body, as UploadedFile objects."""
+        if self._files is None:
+            self._parse_form_data()
+        return self._files
+    
+    @property
+    def json(self):
+        """Parsed JSON body, or None when the request has no JSON body."""
+        if not self._json_loaded:
+            self._json_loaded = True
+            content_type = self.content_type
+            if content_type == 'application/json' or content_type.endswith('+json'):
+                body = self.body
+                if body:
+                    try:
+                        self._json = json.loads(body)
+                    except ValueError:
+                        raise HTTPError(400, "Malformed JSON body")
+        return self._json
+    
+    @property
+    def session(self):
+        """The client's Session, loaded from the session store on first use.
+        
+        None when sessions are not enabled (see `app.enable_sessions`).
+        """
+        if self._session is None and self.session_manager is not None:
+            self._session = self.session_manager.load(self)
+        return self._session
+    
+    @property
+    def loaded_session(self):
+        """The Session if a handler has touched it, else None."""
+        return self._session
+    
+    def _parse_form_data(self):
+        """Parse form data from the request body."""
+        self._form_data = {}
+        self._files = {}
+        if self.body_stream is None:
+            return
+        
+        mime_type, params = parse_content_type(self.headers.get('Content-Type'))
+        if mime_type == 'multipart/form-data':
+            if 'boundary' not in params:
+                raise HTTPError(400, "Multipart body without boundary")
+            parser = MultipartParser(
+                self.body_stream, params['boundary'], self.spool_threshold
+            )
+            self._form_data, self._files = parser.parse()
+        elif mime_type in ('', 'application/x-www-form-urlencoded'):
+            try:
+                self._form_data = urllib.parse.parse_qs(self.body.decode('utf-8'))
+            except UnicodeDecodeError:
+                # Ignore malformed form data
+                return
+            # Convert single-item lists to values
+            for key, value in self._form_data.items():
+                if len(value) == 1:
+                    self._form_data[key] = value[0]
+    
+    def close(self, drain=True):
+        """Release uploads and (optionally) discard any unread body.
+        
+        Returns False if the unread body was too large to skip, meaning
+        the connection cannot be reused.
+        """
+        for upload in (self._files or {}).values():
+            for item in (upload if isinstance(upload, list) else [upload]):
+                item.close()
+        if drain and self.body_stream is not None:
+            return self.body_stream.drain()
+        return True
+
+
+class LudwigResponse:
+    """Ludwig HTTP response object."""
+    
+    # (category, message) pairs stored in the session by SessionMiddleware
+    flashes = ()
+    
+    def __init__(self, content="", status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {'Content-type': 'text/html'}
+    
+    @property
+    def is_streaming(self):
+        """True when the body is an iterator or file object rather than a string."""
+        return not isinstance(self.content, (str, bytes))
+    
+    @classmethod
+    def from_value(cls, value):
+        """Wrap a plain handler return value (HTML string, stream or JSON data)."""
+        if isinstance(value, str):
+            return cls(value)
+        if hasattr(value, 'read') or isinstance(value, Iterator):
+            return cls(value)
+        return cls(json_backend.dumps(value), 200, {'Content-type': 'application/json'})
+
+
+def iter_content(content, chunk_size=64 * 1024):
+    """Iterate a streaming body as bytes chunks.
+    
+    Accepts file-like objects (read in `chunk_size` blocks) and iterables
+    of str/bytes. The returned generator closes the source when closed.
+    """
+    if hasattr(content, 'read'):
+        try:
+            while True:
+                block = content.read(chunk_size)
+                if not block:
+                    break
+                yield block.encode('utf-8') if isinstance(block, str) else block
+        finally:
+            content.close()
+        return
+    try:
+        for chunk in content:
+            yield chunk.encode('utf-8') if isinstance(chunk, str) else bytes(chunk)
+    finally:
+        close = getattr(content, 'close', None)
+        if close:
+            close()
+
+
+def parse_accept_encoding(header):
+    """Parse an Accept-Encoding header into {coding: q}."""
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(header, available):
+    """Pick the first coding in `available` the client accepts."""
+    accepted = parse_accept_encoding(header)
+    for coding in available:
+        q = accepted.get(coding, accepted.get('*', 0.0))
+        if q > 0:
+            return coding
+    return None
+
+
+def add_vary(headers, field):
+    """Add `field` to the Vary header in `headers`, keeping any fields already set."""
+    existing = headers.get('Vary')
+    if not existing:
+        headers['Vary'] = field
+        return
+    fields = [name.strip().lower() for name in existing.split(',')]
+    if field.lower() not in fields and '*' not in fields:
+        headers['Vary'] = f"{existing}, {field}"
+
+
+class ResponseCompressor:
+    """gzip/brotli compression for dynamic responses.
+    
+    The encoding is negotiated from Accept-Encoding (brotli is preferred
+    when the `brotli` package is installed). Bodies smaller than
+    `min_size` or of non-text types are sent as-is. Compressed output is
+    kept in a small LRU cache keyed by the body, so repeated identical
+    responses are only compressed once.
+    """
+    
+    COMPRESSIBLE_TYPES = (
+        'text/', 'application/json', 'application/javascript',
+        'application/xml', 'image/svg+xml',
+    )
+    
+    def __init__(
+        self, min_size=500, level=6, cache_entries=256, cache_bytes=8 * 1024 * 1024
+    ):
+        self.min_size = min_size
+        self.level = level
+        self.encodings = ('br', 'gzip') if brotli else ('gzip',)
+        self.cache_entries = cache_entries
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()
+        self._cache_size = 0
+        self._lock = threading.Lock()
+    
+    def __call__(self, request, next_handler):
+        """Middleware entry point: compress the downstream response."""
+        response = next_handler(request)
+        if not isinstance(response, LudwigResponse):
+            response = LudwigResponse.from_value(response)
+        if response.is_streaming or isinstance(response, FileResponse):
+            return response
+        content = response.content
+        body = content if isinstance(content, bytes) else content.encode('utf-8')
+        headers = dict(response.headers)
+        response.content = self.compress(
+            request.headers.get('Accept-Encoding'), headers, body
+        )
+        response.headers = headers
+        return response
+    
+    def compressible(self, headers):
+        """Check whether a response with these headers may be compressed."""
+        if 'Content-Encoding' in headers:
+            return False
+        content_type = headers.get('Content-type', headers.get('Content-Type', ''))
+        return content_type.startswith(self.COMPRESSIBLE_TYPES)
+    
+    def compress(self, accept_encoding, headers, body):
+        """Compress `body` if possible, updating `headers` in place."""
+        if not self.compressible(headers):
+            return body
+        add_vary(headers, 'Accept-Encoding')
+        if len(body) < self.min_size:
+            return body
+        encoding = negotiate_encoding(accept_encoding, self.encodings)
+        if encoding is None:
+            return body
+        
+        compressed = self._cached(encoding, body)
+        headers['Content-Encoding'] = encoding
+        headers.pop('Content-Length', None)
+        etag = headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            # The encoded bytes differ, so the validator is only weakly equal
+            headers['ETag'] = 'W/' + etag
+        return compressed
+    
+    def _cached(self, encoding, body):
+        key = (encoding, body)
+        with self._lock:
+            compressed = self._cache.get(key)
+            if compressed is not None:
+                self._cache.move_to_end(key)
+                return compressed
+        
+        if encoding == 'br':
+            compressed = brotli.compress(body, quality=min(self.level, 11))
+        else:
+            compressed = gzip.compress(body, compresslevel=self.level, mtime=0)
+        
+        entry_size = len(body) + len(compressed)
+        if entry_size <= self.cache_bytes:
+            with self._lock:
+                if key not in self._cache:
+                    self._cache[key] = compressed
+                    self._cache_size += entry_size
+                while (
+                    len(self._cache) > self.cache_entries
+                    or self._cache_size > self.cache_bytes
+                ):
+                    (_, old_body), old = self._cache.popitem(last=False)
+                    self._cache_size -= len(old_body) + len(old)
+        return compressed
+
+
+class ResponseCache:
+    """In-memory cache of full responses for `@app.cache` routes.
+    
+    Entries are keyed by method, path, query and the request headers named
+    in `vary`, expire after their TTL and are evicted least-recently-used
+    once the cache holds more than `max_bytes` of content. Concurrent
+    misses for the same key are collapsed so that only one request runs
+    the handler while the others wait for its result.
+    """
+    
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(request, vary=()):
+        """Build the cache key for a request."""
+        method = 'GET' if request.method == 'HEAD' else request.method
+        headers = request.headers
+        return (
+            method,
+            request.path,
+            request.query_string,
+            tuple(headers.get(name, '') for name in vary),
+        )
+    
+    @staticmethod
+    def cacheable(response):
+        """Only successful responses without per-user state are cached."""
+        if response.status_code != 200:
+            return False
+        if not isinstance(response.content, (str, bytes)):
+            return False
+        if 'Set-Cookie' in response.headers:
+            return False
+        return 'no-store' not in response.headers.get('Cache-Control', '')
+    
+    def get(self, key):
+        """Return a copy of the cached response, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, response, _ = entry
+            if expires <= time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return LudwigResponse(
+            response.content, response.status_code, dict(response.headers)
+        )
+    
+    def set(self, key, response, ttl):
+        """Store a response for `ttl` seconds."""
+        size = len(response.content) + sum(
+            len(k) + len(str(v)) for k, v in response.headers.items()
+        )
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + ttl, response, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+    
+    def get_or_compute(self, key, ttl, compute):
+        """Return the cached response for `key`, running `compute` on a miss."""
+        response = self.get(key)
+        if response is not None:
+            return response
+        
+        with self._lock:
+            waiter = self._inflight.get(key)
+            if waiter is None:
+                done = self._inflight[key] = threading.Event()
+            self.misses += 1
+        
+        if waiter is not None:
+            # Another request is already computing this key
+            waiter.wait()
+            response = self.get(key)
+            if response is not None:
+                return response
+            # Its result was not cacheable, so compute our own
+            response = compute()
+            if not isinstance(response, LudwigResponse):
+                response = LudwigResponse.from_value(response)
+            return response
+        
+        try:
+            response = compute()
+            if not isinstance(response, LudwigResponse):
+                response = LudwigResponse.from_value(response)
+            if self.cacheable(response):
+                self.set(key, response, ttl)
+                return LudwigResponse(
+                    response.content, response.status_code, dict(response.headers)
+                )
+            return response
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            done.set()
+    
+    def invalidate(self, path, method=None):
+        """Drop every cached variant of `path` (optionally for one method)."""
+        self._invalidate_where(
+            lambda key: key[1] == path and (method is None or key[0] == method)
+        )
+    
+    def invalidate_prefix(self, prefix):
+        """Drop cached responses for all paths starting with `prefix`."""
+        self._invalidate_where(lambda key: key[1].startswith(prefix))
+    
+    def clear(self):
+        """Drop all cached responses."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+    
+    def _invalidate_where(self, predicate):
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._discard(key)
+    
+    def _discard(self, key):
+        # Caller holds the lock
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+
+# Headers a 304 keeps from the full response (RFC 9110 section 15.4.5)
+NOT_MODIFIED_HEADERS = ('ETag', 'Cache-Control', 'Content-Location', 'Date', 'Expires',
+                        'Vary', 'Set-Cookie')
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an ETag against an If-None-Match header."""
+    if not if_none_match or not etag:
+        return False
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or (tag[2:] if tag.startswith('W/') else tag) == opaque:
+            return True
+    return False
+
+
+def body_etag(body):
+    """Strong ETag for a response body."""
+    return '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def version_etag(version):
+    """Weak ETag derived from a handler-supplied version key (e.g. `updated_at`)."""
+    digest = hashlib.blake2b(repr(version).encode('utf-8'), digest_size=12)
+    return 'W/"%s"' % digest.hexdigest()
+
+
+def not_modified_response(etag, headers=None):
+    """Bodiless 304 carrying the validator and the headers a 304 must keep."""
+    kept = {
+        name: value
+        for name, value in (headers or {}).items()
+        if name in NOT_MODIFIED_HEADERS
+    }
+    kept['ETag'] = etag
+    return LudwigResponse("", 304, kept)
+
+
+class ETagMiddleware:
+    """Adds ETags to dynamic GET/HEAD responses and answers If-None-Match with 304.
+    
+    A handler-set ETag (e.g. from `@app.etag(...)`) is used as is;
+    otherwise the body is hashed. Streaming and file responses are left
+    alone (static files have their own validators).
+    """
+    
+    def __init__(self, min_size=0):
+        self.min_size = min_size
+        self.not_modified = 0
+    
+    def __call__(self, request, next_handler):
+        response = next_handler(request)
+        if request.method not in ('GET', 'HEAD'):
+            return response
+        if not isinstance(response, LudwigResponse):
+            response = LudwigResponse.from_value(response)
+        if (
+            response.status_code != 200
+            or response.is_streaming
+            or isinstance(response, FileResponse)
+        ):
+            return response
+        etag = response.headers.get('ETag')
+        if etag is None:
+            content = response.content
+            body = content if isinstance(content, bytes) else content.encode('utf-8')
+            if len(body) < self.min_size:
+                return response
+            etag = body_etag(body)
+            response.headers = dict(response.headers)
+            response.headers['ETag'] = etag
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            self.not_modified += 1
+            return not_modified_response(etag, response.headers)
+        return response
+
+
+def to_jsonable(value):
+    """Convert values the JSON libraries don't know into plain data.
+    
+    Handles datetimes/dates/times (ISO 8601), Decimals (as strings, so no
+    precision is lost), UUIDs, sets, dataclasses and ORM models (anything
+    with `to_dict()` or an `attributes` dict).
+    """
+    # Models first: they are by far the most common case in API payloads
+    attributes = getattr(value, 'attributes', None)
+    if isinstance(attributes, dict):
+        return attributes
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    to_dict = getattr(value, 'to_dict', None)
+    if to_dict is not None:
+        return to_dict()
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class _LudwigJSONEncoder(json.JSONEncoder):
+    def default(self, o):
+        return to_jsonable(o)
+
+
+class JSONBackend:
+    """JSON serializer producing bytes, using the fastest library available.
+    
+    Prefers orjson, then ujson, then the standard library. Datetimes,
+    Decimals and models serialize without callers passing `default=`.
+    
+    Usage:
+        backend = JSONBackend()            # best available
+        backend = JSONBackend('stdlib')    # force a specific library
+        body = backend.dumps({"posts": Post.all()})
+    """
+    
+    PREFERENCE = ('orjson', 'ujson', 'stdlib')
+    
+    def __init__(self, name=None):
+        for candidate in ([name] if name else self.PREFERENCE):
+            if candidate == 'stdlib':
+                self.name = 'stdlib'
+                self._encoder = _LudwigJSONEncoder(
+                    ensure_ascii=True, separators=(',', ':')
+                )
+                self.dumps = self._dumps_stdlib
+                return
+            try:
+                module = importlib.import_module(candidate)
+            except ImportError:
+                if name:
+                    raise
+                continue
+            self.name = candidate
+            self._module = module
+            self.dumps = (
+                self._dumps_orjson if candidate == 'orjson' else self._dumps_ujson
+            )
+            return
+        raise ValueError(f"Unknown JSON backend: {name}")
+    
+    def _dumps_orjson(self, data):
+        # orjson handles datetimes itself and returns bytes directly
+        return self._module.dumps(
+            data, default=to_jsonable, option=self._module.OPT_NON_STR_KEYS
+        )
+    
+    def _dumps_ujson(self, data):
+        text = self._module.dumps(data, default=to_jsonable, ensure_ascii=False)
+        return text.encode('utf-8')
+    
+    def _dumps_stdlib(self, data):
+        # ensure_ascii output is pure ASCII, so encoding is a straight copy
+        return self._encoder.encode(data).encode('ascii')
+    
+    def iter_array(self, items, chunk_size=64 * 1024):
+        """Stream an iterable as a JSON array in chunks of about `chunk_size` bytes."""
+        dumps = self.dumps
+        buffer = [b'[']
+        size = 1
+        first = True
+        for item in items:
+            encoded = dumps(item)
+            if not first:
+                buffer.append(b',')
+            first = False
+            buffer.append(encoded)
+            size += len(encoded) + 1
+            if size >= chunk_size:
+                yield b''.join(buffer)
+                buffer = []
+                size = 0
+        buffer.append(b']')
+        yield b''.join(buffer)
+
+
+json_backend = JSONBackend()
+
+
+def set_json_backend(name=None):
+    """Select the JSON library used for JSON responses ('orjson', 'ujson', 'stdlib')."""
+    global json_backend
+    json_backend = JSONBackend(name)
+    return json_backend
+
+
+class _MetricsShard:
+    """Counters owned by a single worker thread."""
+    
+    __slots__ = ('thread', 'requests', 'bytes_sent', 'latency', 'in_flight')
+    
+    def __init__(self, thread=None):
+        self.thread = thread
+        self.requests = {}
+        self.bytes_sent = {}
+        self.latency = {}
+        self.in_flight = 0
+    
+    def merge_into(self, target, bucket_count):
+        # list() copies each dict in one step, so the owning thread can
+        # keep writing while we read
+        for key, count in list(self.requests.items()):
+            target.requests[key] = target.requests.get(key, 0) + count
+        for route, sent in list(self.bytes_sent.items()):
+            target.bytes_sent[route] = target.bytes_sent.get(route, 0) + sent
+        for route, values in list(self.latency.items()):
+            merged = target.latency.setdefault(route, [0] * (bucket_count + 2))
+            for i, value in enumerate(list(values)):
+                merged[i] += value
+        target.in_flight += self.in_flight
+
+
+class RequestMetrics:
+    """Per-route request metrics with Prometheus text export.
+    
+    Records request counts by route/method/status, an in-flight gauge,
+    response bytes and latency histograms. Every worker thread writes to
+    its own shard, so recording never takes a lock; shards are only
+    summed when metrics are read.
+    """
+    
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='ludwig_http'):
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _MetricsShard()
+        self._lock = threading.Lock()
+    
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _MetricsShard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+                if len(self._shards) % 64 == 0:
+                    self._retire_dead_shards()
+        return shard
+    
+    def _retire_dead_shards(self):
+        # Caller holds the lock. Threads that have exited can't write any
+        # more, so their counts are folded into one retired shard.
+        alive = []
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                alive.append(shard)
+            else:
+                shard.merge_into(self._retired, len(self.buckets))
+        self._shards = alive
+    
+    def request_started(self):
+        """Mark a request as in flight."""
+        self._shard().in_flight += 1
+    
+    def request_finished(self, route, method, status, duration, bytes_sent=0):
+        """Record a completed request."""
+        shard = self._shard()
+        shard.in_flight -= 1
+        key = (route, method, status)
+        shard.requests[key] = shard.requests.get(key, 0) + 1
+        self.record_bytes(route, bytes_sent, shard)
+        values = shard.latency.get(route)
+        if values is None:
+            values = shard.latency[route] = [0] * (len(self.buckets) + 2)
+        values[bisect.bisect_left(self.buckets, duration)] += 1
+        values[-1] += duration
+    
+    def record_bytes(self, route, count, shard=None):
+        """Add response bytes for a route (used for streamed bodies too)."""
+        if count:
+            shard = shard or self._shard()
+            shard.bytes_sent[route] = shard.bytes_sent.get(route, 0) + count
+    
+    def snapshot(self):
+        """Aggregate all shards into plain dictionaries."""
+        total = _MetricsShard()
+        with self._lock:
+            self._retire_dead_shards()
+            shards = [self._retired] + list(self._shards)
+        for shard in shards:
+            shard.merge_into(total, len(self.buckets))
+        
+        latency = {}
+        for route, values in total.latency.items():
+            cumulative, running = [], 0
+            for count in values[:-1]:
+                running += count
+                cumulative.append(running)
+            latency[route] = {
+                'buckets': dict(zip(self.buckets + (float('inf'),), cumulative)),
+                'count': running,
+                'sum': values[-1],
+            }
+        return {
+            'requests': dict(total.requests),
+            'in_flight': total.in_flight,
+            'bytes_sent': dict(total.bytes_sent),
+            'latency': latency,
+        }
+    
+    def render_prometheus(self, rejected=None):
+        """Render metrics in the Prometheus text exposition format.
+        
+        `rejected` optionally adds connection-limit rejection counts by
+        reason (see ConnectionLimits).
+        """
+        data = self.snapshot()
+        p = self.prefix
+        lines = [
+            f'# HELP {p}_requests_total Total HTTP requests.',
+            f'# TYPE {p}_requests_total counter',
+        ]
+        for (route, method, status), count in sorted(data['requests'].items()):
+            labels = f'route="{_label(route)}",method="{method}",status="{status}"'
+            lines.append(f'{p}_requests_total{{{labels}}} {count}')
+        lines += [
+            f'# HELP {p}_requests_in_flight Requests currently being handled.',
+            f'# TYPE {p}_requests_in_flight gauge',
+            f'{p}_requests_in_flight {data["in_flight"]}',
+            f'# HELP {p}_response_bytes_total Response body bytes sent.',
+            f'# TYPE {p}_response_bytes_total counter',
+        ]
+        for route, sent in sorted(data['bytes_sent'].items()):
+            lines.append(f'{p}_response_bytes_total{{route="{_label(route)}"}} {sent}')
+        lines += [
+            f'# HELP {p}_request_duration_seconds Request latency.',
+            f'# TYPE {p}_request_duration_seconds histogram',
+        ]
+        name = f'{p}_request_duration_seconds'
+        for route, histogram in sorted(data['latency'].items()):
+            label = _label(route)
+            for bound, count in histogram['buckets'].items():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{name}_bucket{{route="{label}",le="{le}"}} {count}')
+            lines.append(f'{name}_sum{{route="{label}"}} {histogram["sum"]}')
+            lines.append(f'{name}_count{{route="{label}"}} {histogram["count"]}')
+        if rejected is not None:
+            lines += [
+                f'# HELP {p}_requests_rejected_total Requests rejected by '
+                f'connection limits.',
+                f'# TYPE {p}_requests_rejected_total counter',
+            ]
+            lines.extend(f'{p}_requests_rejected_total{{reason="{reason}"}} {count}'
+                         for reason, count in sorted(rejected.items()))
+        return '\n'.join(lines) + '\n'
+
+
+def _label(value):
+    """Escape a Prometheus label value."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsMiddleware:
+    """Middleware feeding RequestMetrics.
+    
+    Requests are labelled by their registered route (or 'static' /
+    'unmatched') so unknown URLs can't blow up the number of series.
+    Streamed bodies are counted as they are sent.
+    """
+    
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+    
+    def route_label(self, path):
+        if path in self.app.routes or path in self.app.method_routes:
+            return path
+        if self.app.static_files.handles(path):
+            return 'static'
+        return 'unmatched'
+    
+    def __call__(self, request, next_handler):
+        metrics = self.metrics
+        route = self.route_label(request.path)
+        metrics.request_started()
+        start = time.perf_counter()
+        status = 500
+        sent = 0
+        try:
+            response = next_handler(request)
+            if not isinstance(response, LudwigResponse):
+                response = LudwigResponse.from_value(response)
+            status = response.status_code
+            if isinstance(response, FileResponse):
+                sent = response.length or 0
+            elif response.is_streaming:
+                response.content = self._count_stream(route, response.content)
+            else:
+                content = response.content
+                if isinstance(content, str) and not content.isascii():
+                    content = content.encode('utf-8')
+                sent = len(content)
+            return response
+        finally:
+            metrics.request_finished(
+                route, request.method, status, time.perf_counter() - start, sent
+            )
+    
+    def _count_stream(self, route, content):
+        for chunk in iter_content(content):
+            self.metrics.record_bytes(route, len(chunk))
+            yield chunk
+
+
+class AdmissionController:
+    """Bounded concurrency with a bounded wait queue.
+    
+    Priority classes:
+        critical - always admitted (health checks, metrics)
+        normal   - admitted when a slot is free, otherwise queued
+        low      - admitted only when a slot is free right away
+    """
+    
+    def __init__(self, max_concurrency, max_queue=0, queue_timeout=1.0, retry_after=1):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed = {}
+        self._cond = threading.Condition()
+    
+    def acquire(self, priority='normal'):
+        """Try to admit a request; returns False if it should be shed."""
+        with self._cond:
+            if priority == 'critical' or self.in_flight < self.max_concurrency:
+                self.in_flight += 1
+                self.admitted += 1
+                return True
+            if priority == 'low' or self.queued >= self.max_queue:
+                self.shed[priority] = self.shed.get(priority, 0) + 1
+                return False
+            
+            self.queued += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.in_flight >= self.max_concurrency:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.shed[priority] = self.shed.get(priority, 0) + 1
+                        return False
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+                self.admitted += 1
+                return True
+            finally:
+                self.queued -= 1
+    
+    def release(self):
+        """Free the slot taken by an admitted request."""
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+    
+    def stats(self):
+        """Current gauges and counters."""
+        with self._cond:
+            return {
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'admitted': self.admitted,
+                'shed': dict(self.shed),
+                'shed_total': sum(self.shed.values()),
+            }
+
+
+class AdmissionMiddleware:
+    """Middleware that sheds load using an AdmissionController."""
+    
+    def __init__(self, app, controller):
+        self.app = app
+        self.controller = controller
+        self.retry_after = str(controller.retry_after)
+    
+    def __call__(self, request, next_handler):
+        priority = self.app.route_priority.get(request.path, 'normal')
+        if not self.controller.acquire(priority):
+            return LudwigResponse("Service Unavailable", 503, {
+                'Content-type': 'text/plain',
+                'Retry-After': self.retry_after,
+            })
+        try:
+            return next_handler(request)
+        finally:
+            self.controller.release()
+
+
+RATE_PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_rate(rate):
+    """Parse '5/minute', '100/hour', '20/30s' or a tuple into (limit, seconds)."""
+    if isinstance(rate, tuple):
+        return int(rate[0]), float(rate[1])
+    count, _, period = str(rate).partition('/')
+    period = period.strip().lower()
+    if period.endswith('s') and period[:-1].replace('.', '', 1).isdigit():
+        seconds = float(period[:-1])
+    else:
+        seconds = RATE_PERIODS.get(period.rstrip('s'))
+    if seconds is None or not count.strip().isdigit():
+        raise ValueError(f"Invalid rate: {rate!r}")
+    return int(count), seconds
+
+
+class RateLimitResult:
+    """Outcome of one rate-limit check."""
+    
+    __slots__ = ('allowed', 'limit', 'remaining', 'reset', 'retry_after')
+    
+    def __init__(self, allowed, limit, remaining, reset, retry_after=0.0):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset = reset
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Token bucket: `limit` tokens per `period`, bursting up to `burst`.
+    
+    State is (tokens, last_refill); a key whose bucket has refilled
+    completely can be forgotten.
+    """
+    
+    def __init__(self, limit, period, burst=None):
+        self.limit = limit
+        self.period = period
+        self.capacity = burst or limit
+        self.rate = limit / period
+    
+    def hit(self, state, now, cost=1):
+        """Return (result, new_state, expires_at)."""
+        tokens, last = state if state else (self.capacity, now)
+        tokens = min(self.capacity, tokens + (now - last) * self.rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        retry_after = 0.0 if allowed else (cost - tokens) / self.rate
+        until_full = (self.capacity - tokens) / self.rate
+        result = RateLimitResult(
+            allowed, self.capacity, int(tokens), until_full, retry_after
+        )
+        return result, (tokens, now), now + until_full
+
+
+class SlidingWindow:
+    """Sliding-window counter: at most `limit` hits in any `period`.
+    
+    Uses the two-counter approximation (current window plus the
+    overlapping share of the previous one), so state is O(1) per key.
+    """
+    
+    def __init__(self, limit, period):
+        self.limit = limit
+        self.period = period
+    
+    def hit(self, state, now, cost=1):
+        """Return (result, new_state, expires_at)."""
+        period = self.period
+        start = now - now % period
+        window, current, previous = state if state else (start, 0, 0)
+        if start != window:
+            previous = current if start - window == period else 0
+            current = 0
+            window = start
+        elapsed = now - window
+        estimate = previous * (1 - elapsed / period) + current
+        allowed = estimate + cost <= self.limit
+        if allowed:
+            current += cost
+            estimate += cost
+            retry_after = 0.0
+        elif current + cost > self.limit or not previous:
+            retry_after = period - elapsed
+        else:
+            retry_after = (
+                period * (1 - (self.limit - current - cost) / previous) - elapsed
+            )
+        remaining = max(0, int(self.limit - estimate))
+        result = RateLimitResult(allowed, self.limit, remaining, period - elapsed,
+                                 max(retry_after, 0.0))
+        return result, (window, current, previous), window + 2 * period
+
+
+class MemoryRateLimitStore:
+    """Sharded in-process rate-limit state.
+    
+    Keys hash to one of `shards` dicts, each with its own lock, so updates
+    are O(1) and threads rarely contend. Each shard drops expired keys at
+    most once per `cleanup_interval` seconds.
+    """
+    
+    def __init__(self, shards=16, cleanup_interval=60.0):
+        self.cleanup_interval = cleanup_interval
+        self._shards = [
+            ({}, threading.Lock(), [time.time() + cleanup_interval])
+            for _ in range(shards)
+        ]
+    
+    def update(self, key, policy, now, cost=1):
+        data, lock, next_cleanup = self._shards[hash(key) % len(self._shards)]
+        with lock:
+            entry = data.get(key)
+            result, state, expires = policy.hit(entry[0] if entry else None, now, cost)
+            data[key] = (state, expires)
+            if now >= next_cleanup[0]:
+                next_cleanup[0] = now + self.cleanup_interval
+                for expired in [k for k, (_, until) in data.items() if until <= now]:
+                    del data[expired]
+        return result
+    
+    def __len__(self):
+        return sum(len(data) for data, _, _ in self._shards)
+
+
+class SQLiteRateLimitStore:
+    """Rate-limit state in SQLite, shared by several server processes.
+    
+    Each check is one short `BEGIN IMMEDIATE` transaction in WAL mode;
+    expired keys are swept at most once per `cleanup_interval` seconds.
+    """
+    
+    def __init__(self, path, cleanup_interval=60.0, timeout=5.0):
+        self.path = path
+        self.cleanup_interval = cleanup_interval
+        self.timeout = timeout
+        self._local = threading.local()
+        self._next_cleanup = time.time() + cleanup_interval
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS ludwig_rate_limits ("
+            "key TEXT PRIMARY KEY, state TEXT NOT NULL, expires REAL NOT NULL)")
+    
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+    
+    def update(self, key, policy, now, cost=1):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute(
+                "SELECT state FROM ludwig_rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            state = tuple(json.loads(row[0])) if row else None
+            result, state, expires = policy.hit(state, now, cost)
+            connection.execute(
+                "INSERT OR REPLACE INTO ludwig_rate_limits (key, state, expires) "
+                "VALUES (?, ?, ?)", (key, json.dumps(state), expires))
+            if now >= self._next_cleanup:
+                self._next_cleanup = now + self.cleanup_interval
+                connection.execute(
+                    "DELETE FROM ludwig_rate_limits WHERE expires <= ?", (now,)
+                )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return result
+
+
+def rate_limit_key(kind):
+    """Turn 'ip', 'user' or a callable into a request -> key function."""
+    if callable(kind):
+        return kind
+    if kind == 'ip':
+        return lambda request: request.remote_addr
+    if kind == 'user':
+        def user_key(request):
+            user = request.get('user')
+            user_id = (
+                user.get('id') if isinstance(user, dict) else getattr(user, 'id', None)
+            )
+            return f"user:{user_id}" if user_id is not None else request.remote_addr
+        return user_key
+    raise ValueError(f"Unknown rate limit key: {kind!r}")
+
+
+class RateLimitMiddleware:
+    """Middleware that limits requests per client with a token bucket or sliding window.
+    
+    Every response carries `RateLimit-Limit`, `RateLimit-Remaining`,
+    `RateLimit-Reset` and `RateLimit-Policy` headers; rejected requests
+    get `429 Too Many Requests` with `Retry-After`. Buckets are per route
+    unless a shared `name` is given; a key function returning None skips
+    limiting for that request.
+    """
+    
+    ALGORITHMS = {'token_bucket': TokenBucket, 'sliding_window': SlidingWindow}
+    
+    def __init__(self, rate, store, key='ip', algorithm='token_bucket', name=None,
+                 cost=1, **options):
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+        limit, period = parse_rate(rate)
+        self.policy = self.ALGORITHMS[algorithm](limit, period, **options)
+        self.store = store
+        self.key = rate_limit_key(key)
+        self.name = name
+        self.cost = cost
+        self.rejected = 0
+        self.policy_header = f"{limit};w={int(period)}"
+    
+    def __call__(self, request, next_handler):
+        client = self.key(request)
+        if client is None:
+            return next_handler(request)
+        key = f"{self.name or request.path}|{client}"
+        result = self.store.update(key, self.policy, time.time(), self.cost)
+        if not result.allowed:
+            self.rejected += 1
+            response = LudwigResponse("Too Many Requests", 429, {
+                'Content-type': 'text/plain',
+                'Retry-After': str(max(1, math.ceil(result.retry_after))),
+            })
+        else:
+            response = next_handler(request)
+            if not isinstance(response, LudwigResponse):
+                response = LudwigResponse.from_value(response)
+            response.headers = dict(response.headers)
+        headers = response.headers
+        headers['RateLimit-Limit'] = str(result.limit)
+        headers['RateLimit-Remaining'] = str(result.remaining)
+        headers['RateLimit-Reset'] = str(math.ceil(result.reset))
+        headers['RateLimit-Policy'] = self.policy_header
+        return response
+
+
+class AccessLogWriter:
+    """Access log written by a background thread.
+    
+    Request threads only put a tuple on a bounded queue. The writer thread
+    formats lines ('combined' or 'json'), writes them in batches and
+    rotates the file once it grows past `max_bytes`. When the queue is
+    full, lines are dropped and counted in `dropped` instead of making
+    requests wait on disk I/O.
+    """
+    
+    def __init__(self, path=None, fmt='combined', max_bytes=10 * 1024 * 1024,
+                 backup_count=5, queue_size=10000, batch_size=256, flush_interval=0.5):
+        if fmt not in ('combined', 'json'):
+            raise ValueError(f"Unknown access log format: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stream = None
+        self._size = 0
+    
+    def log(self, client, request_line, status, size, referer, user_agent, duration):
+        """Queue one access log entry without blocking."""
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait((time.time(), client, request_line, status, size,
+                                    referer, user_agent, duration))
+        except queue.Full:
+            self.dropped += 1
+    
+    def flush(self, timeout=5):
+        """Wait until every queued entry has been written."""
+        if self._thread is not None:
+            done = threading.Event()
+            try:
+                self._queue.put(done, timeout=timeout)
+            except queue.Full:
+                return
+            done.wait(timeout)
+    
+    def close(self):
+        """Flush and stop the writer thread."""
+        if self._thread is not None:
+            self.flush()
+            self._queue.put(None)
+            self._thread.join(5)
+            self._thread = None
+    
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='ludwig-access-log', daemon=True
+                )
+                self._thread.start()
+    
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while (
+                len(batch) < self.batch_size
+                and not isinstance(batch[-1], threading.Event)
+                and batch[-1] is not None
+            ):
+                try:
+                    batch.append(
+                        self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    )
+                except queue.Empty:
+                    break
+            
+            entries = [item for item in batch if isinstance(item, tuple)]
+            if entries:
+                self._write(''.join(self.format(entry) for entry in entries))
+                self.written += len(entries)
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if batch[-1] is None:
+                if self._stream is not None and self.path:
+                    self._stream.close()
+                    self._stream = None
+                return
+    
+    def format(self, entry):
+        """Format one queued entry as a log line."""
+        timestamp, client, request_line, status, size = entry[:5]
+        referer, user_agent, duration = entry[5:]
+        local_time = datetime.fromtimestamp(timestamp).astimezone()
+        if self.fmt == 'json':
+            return json.dumps({
+                'time': local_time.isoformat(),
+                'client': client,
+                'request': request_line,
+                'status': status,
+                'bytes': size,
+                'referer': referer,
+                'user_agent': user_agent,
+                'duration_ms': round(duration * 1000, 3),
+            }) + '\n'
+        stamp = local_time.strftime('%d/%b/%Y:%H:%M:%S %z')
+        status = '-' if status is None else status
+        return (f'{client} - - [{stamp}] "{request_line}" {status} '
+                f'{size or "-"} "{referer or "-"}" "{user_agent or "-"}"\n')
+    
+    def _write(self, text):
+        if not self.path:
+            sys.stderr.write(text)
+            sys.stderr.flush()
+            return
+        if self._stream is None:
+            self._stream = open(self.path, 'a', encoding='utf-8')
+            self._size = self._stream.tell()
+        self._stream.write(text)
+        self._stream.flush()
+        self._size += len(text)
+        if self.max_bytes and self._size >= self.max_bytes:
+            self._rotate()
+    
+    def _rotate(self):
+        self._stream.close()
+        self._stream = None
+        if self.backup_count > 0:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+class Session(dict):
+    """Session data for one client, tracked for changes.
+    
+    Assigning, deleting or clearing keys marks the session as modified so
+    it is written back at the end of the request. Set `modified = True`
+    after mutating a nested value in place.
+    """
+    
+    def __init__(self, data=None, sid=None):
+        super().__init__(data or {})
+        self.sid = sid
+        self.new = sid is None
+        self.modified = False
+        self.invalidated = False
+        self.previous_sid = None
+    
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.modified = True
+    
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.modified = True
+    
+    def pop(self, key, *default):
+        had_key = key in self
+        value = super().pop(key, *default)
+        self.modified = self.modified or had_key
+        return value
+    
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+    
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.modified = True
+    
+    def clear(self):
+        super().clear()
+        self.modified = True
+    
+    def flash(self, message, category='info'):
+        """Queue a message for the next request that reads flashes."""
+        self.setdefault('_flashes', []).append([category, message])
+        self.modified = True
+    
+    def pop_flashes(self):
+        """Return and remove queued (category, message) pairs."""
+        return [tuple(item) for item in self.pop('_flashes', [])]
+    
+    def regenerate(self):
+        """Move the data to a new session ID (call after logging in)."""
+        if self.sid is not None:
+            self.previous_sid = self.previous_sid or self.sid
+        self.sid = None
+        self.new = True
+        self.modified = True
+    
+    def invalidate(self):
+        """Delete the session from the store and expire the cookie."""
+        super().clear()
+        self.invalidated = True
+
+
+class MemorySessionStore:
+    """In-process session store with LRU eviction and a TTL.
+    
+    Suitable for a single server process; sessions are lost on restart.
+    """
+    
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def load(self, sid):
+        """Return the session data for `sid`, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            expires, data = entry
+            if expires <= time.time():
+                del self._entries[sid]
+                return None
+            self._entries.move_to_end(sid)
+            return dict(data)
+    
+    def save(self, sid, data, ttl):
+        """Store a copy of `data` for `ttl` seconds."""
+        with self._lock:
+            self._entries[sid] = (time.time() + ttl, dict(data))
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def delete(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+    
+    def sweep(self):
+        """Drop expired sessions; returns how many were removed."""
+        now = time.time()
+        with self._lock:
+            expired = [
+                sid for sid, (expires, _) in self._entries.items() if expires <= now
+            ]
+            for sid in expired:
+                del self._entries[sid]
+        return len(expired)
+    
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteSessionStore:
+    """Session store in a SQLite database shared by several processes.
+    
+    The database runs in WAL mode so readers never block the writer, each
+    thread keeps its own connection, and expired rows are swept at most
+    once every `sweep_interval` seconds as part of a save.
+    """
+    
+    def __init__(self, path, sweep_interval=300, timeout=5.0):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self.timeout = timeout
+        self._local = threading.local()
+        self._sweep_lock = threading.Lock()
+        self._next_sweep = time.time() + sweep_interval
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS ludwig_sessions ("
+            "id TEXT PRIMARY KEY, data BLOB NOT NULL, expires REAL NOT NULL)")
+        self._connection().execute(
+            "CREATE INDEX IF NOT EXISTS ludwig_sessions_expires "
+            "ON ludwig_sessions (expires)")
+    
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+    
+    def load(self, sid):
+        row = self._connection().execute(
+            "SELECT data FROM ludwig_sessions WHERE id = ? AND expires > ?",
+            (sid, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def save(self, sid, data, ttl):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO ludwig_sessions (id, data, expires) "
+            "VALUES (?, ?, ?)", (sid, json_backend.dumps(data), time.time() + ttl))
+        if time.time() >= self._next_sweep and self._sweep_lock.acquire(blocking=False):
+            try:
+                self._next_sweep = time.time() + self.sweep_interval
+                self.sweep()
+            finally:
+                self._sweep_lock.release()
+    
+    def delete(self, sid):
+        self._connection().execute("DELETE FROM ludwig_sessions WHERE id = ?", (sid,))
+    
+    def sweep(self):
+        """Delete expired sessions; returns how many were removed."""
+        return self._connection().execute(
+            "DELETE FROM ludwig_sessions WHERE expires <= ?", (time.time(),)).rowcount
+    
+    def close(self):
+        """Close this thread's connection."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class SessionManager:
+    """Signs session cookies and moves session data to and from a store.
+    
+    The cookie holds only a random session ID and its HMAC-SHA256
+    signature, so forged or tampered IDs are rejected before the store is
+    consulted.
+    """
+    
+    def __init__(self, store, secret, ttl=14 * 24 * 3600, cookie_name='ludwig_session',
+                 secure=False, samesite='Lax', path='/'):
+        if not secret:
+            raise ValueError("Sessions require a secret key")
+        self.store = store
+        self.secret = secret.encode('utf-8') if isinstance(secret, str) else secret
+        self.ttl = ttl
+        self.cookie_name = cookie_name
+        self.secure = secure
+        self.samesite = samesite
+        self.path = path
+    
+    def sign(self, sid):
+        digest = hmac.new(self.secret, sid.encode('ascii'), hashlib.sha256).digest()
+        return f"{sid}.{base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')}"
+    
+    def unsign(self, value):
+        """Return the session ID from a signed cookie value, or None if invalid."""
+        sid, _, signature = value.rpartition('.')
+        if not sid or not signature:
+            return None
+        try:
+            expected = self.sign(sid)
+        except UnicodeEncodeError:
+            return None
+        return sid if hmac.compare_digest(expected, value) else None
+    
+    def load(self, request):
+        """Return the Session for a request (an empty new one if none is valid)."""
+        value = request.cookies.get(self.cookie_name)
+        sid = self.unsign(value) if value else None
+        data = self.store.load(sid) if sid else None
+        if data is None:
+            return Session()
+        return Session(data, sid)
+    
+    def save(self, session, response):
+        """Persist a changed session and attach its cookie to the response."""
+        if session.invalidated:
+            if session.sid is not None:
+                self.store.delete(session.sid)
+            add_header(response, 'Set-Cookie', self.cookie(''))
+            return
+        if not session.modified:
+            return
+        if session.previous_sid is not None:
+            self.store.delete(session.previous_sid)
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        self.store.save(session.sid, session, self.ttl)
+        if session.new or session.previous_sid is not None:
+            add_header(response, 'Set-Cookie', self.cookie(self.sign(session.sid)))
+    
+    def cookie(self, value):
+        """Build the Set-Cookie header value (an empty value expires the cookie)."""
+        parts = [f"{self.cookie_name}={value}", f"Path={self.path}", "HttpOnly",
+                 f"Max-Age={self.ttl if value else 0}"]
+        if self.samesite:
+            parts.append(f"SameSite={self.samesite}")
+        if self.secure:
+            parts.append("Secure")
+        return '; '.join(parts)
+
+
+class SessionMiddleware:
+    """Middleware that makes `request.session` available.
+    
+    Nothing is read until a handler touches `request.session`, and nothing
+    is written unless the session changed. Flash messages attached to a
+    response by `Web.redirect_with_success`/`redirect_with_error` are
+    stored in the session for the next request.
+    """
+    
+    def __init__(self, manager):
+        self.manager = manager
+    
+    def __call__(self, request, next_handler):
+        request.session_manager = self.manager
+        response = next_handler(request)
+        if not isinstance(response, LudwigResponse):
+            response = LudwigResponse.from_value(response)
+        if response.flashes:
+            for category, message in response.flashes:
+                request.session.flash(message, category)
+        session = request.loaded_session
+        if session is not None:
+            # Handlers may return a shared headers dict; the cookie is per client
+            response.headers = dict(response.headers)
+            self.manager.save(session, response)
+        return response
+
+
+def add_header(response, name, value):
+    """Add a header, keeping earlier values (e.g. several Set-Cookie lines)."""
+    existing = response.headers.get(name)
+    if existing is None:
+        response.headers[name] = value
+    elif isinstance(existing, list):
+        response.headers[name] = existing + [value]
+    else:
+        response.headers[name] = [existing, value]
+
+
+def header_items(headers):
+    """Yield (name, value) pairs, expanding headers that hold a list of values."""
+    for name, value in headers.items():
+        if isinstance(value, list):
+            for item in value:
+                yield name, item
+        else:
+            yield name, value
+
+
+class Message:
+    """A published message, encoded once and shared by every subscriber."""
+    
+    __slots__ = ('topic', 'data', 'event', 'id', '_text', '_sse')
+    
+    def __init__(self, topic, data, event=None, id=None):
+        self.topic = topic
+        self.data = data
+        self.event = event
+        self.id = id
+        self._text = None
+        self._sse = None
+    
+    @property
+    def text(self):
+        """The payload as a string (JSON for anything but str/bytes)."""
+        if self._text is None:
+            data = self.data
+            if isinstance(data, bytes):
+                data = data.decode('utf-8')
+            elif not isinstance(data, str):
+                data = json_backend.dumps(data).decode('utf-8')
+            self._text = data
+        return self._text
+    
+    @property
+    def sse(self):
+        """The message framed as a Server-Sent Events block."""
+        if self._sse is None:
+            self._sse = format_sse(self.text, self.event, self.id)
+        return self._sse
+
+
+def format_sse(data, event=None, id=None, retry=None):
+    """Frame one Server-Sent Event as bytes."""
+    lines = []
+    if event:
+        lines.append(f"event: {event}")
+    if id is not None:
+        lines.append(f"id: {id}")
+    if retry is not None:
+        lines.append(f"retry: {int(retry)}")
+    lines.extend(f"data: {line}" for line in str(data).split('\n'))
+    return ('\n'.join(lines) + '\n\n').encode('utf-8')
+
+
+class Subscription:
+    """A subscriber's bounded buffer of messages from a BroadcastHub.
+    
+    Iterate it (or call `get`) to receive messages. When the buffer is
+    full the hub evicts the subscriber instead of blocking publishers or
+    growing without bound; iteration then stops and `evicted` is True.
+    """
+    
+    def __init__(self, hub, topics, buffer_size):
+        self.hub = hub
+        self.topics = frozenset(topics)
+        self.buffer_size = buffer_size
+        self.closed = False
+        self.evicted = False
+        self._buffer = deque()
+        self._ready = threading.Condition(threading.Lock())
+    
+    def _offer(self, message):
+        """Called by the hub; returns False if the buffer is full."""
+        with self._ready:
+            if self.closed:
+                return True
+            if len(self._buffer) >= self.buffer_size:
+                return False
+            self._buffer.append(message)
+            self._ready.notify()
+            return True
+    
+    def get(self, timeout=None):
+        """Next Message, or None on timeout or once the subscription is closed."""
+        with self._ready:
+            if not self._buffer and not self.closed:
+                self._ready.wait(timeout)
+            if self._buffer and not self.evicted:
+                return self._buffer.popleft()
+            return None
+    
+    def __iter__(self):
+        while not self.closed:
+            message = self.get()
+            if message is not None:
+                yield message
+    
+    def close(self, evicted=False):
+        """Stop receiving messages and wake any waiting reader."""
+        with self._ready:
+            if self.closed:
+                return
+            self.closed = True
+            self.evicted = evicted
+            if evicted:
+                self._buffer.clear()
+            self._ready.notify_all()
+        self.hub._remove(self)
+
+
+class BroadcastHub:
+    """In-process publish/subscribe hub for SSE and WebSocket routes.
+    
+    `publish` never blocks: each subscriber has a buffer of at most
+    `buffer_size` messages, and a subscriber that falls that far behind
+    is evicted (its client reconnects and starts from fresh data) so one
+    slow consumer cannot hold back the rest.
+    """
+    
+    def __init__(self, buffer_size=100):
+        self.buffer_size = buffer_size
+        self.published = 0
+        self.evicted = 0
+        self._topics = {}
+        self._lock = threading.Lock()
+    
+    def subscribe(self, *topics, buffer_size=None):
+        """Subscribe to one or more topics and return the Subscription."""
+        subscription = Subscription(self, topics, buffer_size or self.buffer_size)
+        with self._lock:
+            for topic in subscription.topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+    
+    def publish(self, topic, data, event=None, id=None):
+        """Deliver data to every subscriber of `topic`; returns how many received it."""
+        message = Message(topic, data, event, id)
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        delivered = 0
+        for subscription in subscribers:
+            if subscription._offer(message):
+                delivered += 1
+            else:
+                self.evicted += 1
+                subscription.close(evicted=True)
+        self.published += 1
+        return delivered
+    
+    def subscribers(self, topic=None):
+        """Number of subscriptions to `topic` (or in total)."""
+        with self._lock:
+            if topic is not None:
+                return len(self._topics.get(topic, ()))
+            return len({sub for subs in self._topics.values() for sub in subs})
+    
+    def _remove(self, subscription):
+        with self._lock:
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+
+
+def sse_stream(events, heartbeat=15.0, retry=None):
+    """Encode an event source as a Server-Sent Events body.
+    
+    `events` is a Subscription (heartbeat comments are sent while it is
+    idle, which also detects clients that went away) or any iterable of
+    Messages, strings, bytes or JSON-able values.
+    """
+    if retry is not None:
+        yield f"retry: {int(retry)}\n\n".encode('ascii')
+    else:
+        yield b': connected\n\n'
+    if isinstance(events, Subscription):
+        try:
+            while not events.closed:
+                message = events.get(heartbeat)
+                yield message.sse if message is not None else b': keepalive\n\n'
+        finally:
+            events.close()
+        return
+    try:
+        for event in events:
+            if isinstance(event, Message):
+                yield event.sse
+            elif isinstance(event, bytes):
+                yield event
+            else:
+                yield Message(None, event).sse
+    finally:
+        close = getattr(events, 'close', None)
+        if close:
+            close()
+
+
+class WebSocketError(Exception):
+    """Protocol violation on a WebSocket connection."""
+    
+    def __init__(self, code, message=''):
+        super().__init__(message)
+        self.code = code
+
+
+class WebSocket:
+    """Server side of an RFC 6455 WebSocket connection.
+    
+    Handlers call `receive()` for the next text (str) or binary (bytes)
+    message and `send()` to reply; pings are answered automatically.
+    `forward(subscription)` pushes hub messages to the client until either
+    side closes.
+    """
+    
+    GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+    
+    def __init__(self, request, rfile, wfile, max_message_size=1024 * 1024):
+        self.request = request
+        self.rfile = rfile
+        self.wfile = wfile
+        self.max_message_size = max_message_size
+        self.closed = False
+        self.close_code = None
+        self._write_lock = threading.RLock()
+    
+    @classmethod
+    def accept_key(cls, key):
+        digest = hashlib.sha1(key.encode('ascii') + cls.GUID).digest()
+        return base64.b64encode(digest).decode('ascii')
+    
+    def send(self, data):
+        """Send a str as a text frame or bytes as a binary frame."""
+        if isinstance(data, Message):
+            data = data.text
+        if isinstance(data, str):
+            self._send_frame(0x1, data.encode('utf-8'))
+        elif isinstance(data, (bytes, bytearray, memoryview)):
+            self._send_frame(0x2, bytes(data))
+        else:
+            self._send_frame(0x1, json_backend.dumps(data))
+    
+    def ping(self, payload=b''):
+        self._send_frame(0x9, payload)
+    
+    def close(self, code=1000, reason=''):
+        """Send a close frame (once) and mark the connection closed."""
+        # Held across the write so nobody tears the socket down mid-frame
+        with self._write_lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.close_code = self.close_code or code
+            try:
+                self._send_frame(
+                    0x8, code.to_bytes(2, 'big') + reason.encode('utf-8')[:123]
+                )
+            except (OSError, ValueError):
+                pass
+    
+    def receive(self):
+        """Next message as str or bytes, or None once the connection is closed."""
+        fragments = []
+        message_opcode = None
+        size = 0
+        while not self.closed:
+            try:
+                fin, opcode, payload = self._read_frame()
+            except WebSocketError as e:
+                self.close(e.code, str(e))
+                return None
+            except (OSError, ValueError):
+                self.closed = True
+                return None
+            if opcode == 0x8:
+                self.close_code = (
+                    int.from_bytes(payload[:2], 'big') if len(payload) >= 2 else 1005
+                )
+                self.close(1000 if self.close_code == 1005 else self.close_code)
+                return None
+            if opcode == 0x9:
+                self._send_frame(0xA, payload)
+                continue
+            if opcode == 0xA:
+                continue
+            if opcode in (0x1, 0x2):
+                if message_opcode is not None:
+                    self.close(1002, "Expected continuation frame")
+                    return None
+                message_opcode = opcode
+            elif opcode != 0x0 or message_opcode is None:
+                self.close(1002, "Unexpected opcode")
+                return None
+            size += len(payload)
+            if size > self.max_message_size:
+                self.close(1009, "Message too big")
+                return None
+            fragments.append(payload)
+            if fin:
+                data = b''.join(fragments)
+                if message_opcode == 0x2:
+                    return data
+                try:
+                    return data.decode('utf-8')
+                except UnicodeDecodeError:
+                    self.close(1007, "Invalid UTF-8")
+                    return None
+        return None
+    
+    def __iter__(self):
+        while True:
+            message = self.receive()
+            if message is None:
+                return
+            yield message
+    
+    def forward(self, subscription, heartbeat=15.0, on_message=None):
+        """Send hub messages to the client until it disconnects or is evicted.
+        
+        Incoming frames are read on a helper thread so a closed or dead
+        client ends the loop promptly; text/binary messages go to
+        `on_message` if given.
+        """
+        def read_loop():
+            for message in self:
+                if on_message is not None:
+                    on_message(message)
+            subscription.close()
+        
+        reader = threading.Thread(
+            target=read_loop, name='ludwig-websocket-reader', daemon=True
+        )
+        reader.start()
+        try:
+            while not subscription.closed and not self.closed:
+                message = subscription.get(heartbeat)
+                if message is not None:
+                    self.send(message)
+                elif not subscription.closed:
+                    self.ping()
+        except OSError:
+            self.closed = True
+        finally:
+            subscription.close()
+            self.close(1008 if subscription.evicted else 1000,
+                       "Consumer too slow" if subscription.evicted else '')
+    
+    def _read_exact(self, count):
+        data = self.rfile.read(count)
+        if len(data) < count:
+            raise ValueError("Connection closed")
+        return data
+    
+    def _read_frame(self):
+        first, second = self._read_exact(2)
+        if first & 0x70:
+            raise WebSocketError(1002, "Reserved bits set")
+        if not second & 0x80:
+            raise WebSocketError(1002, "Client frames must be masked")
+        length = second & 0x7F
+        if length == 126:
+            length = int.from_bytes(self._read_exact(2), 'big')
+        elif length == 127:
+            length = int.from_bytes(self._read_exact(8), 'big')
+        if length > self.max_message_size:
+            raise WebSocketError(1009, "Message too big")
+        mask = self._read_exact(4)
+        payload = self._read_exact(length) if length else b''
+        if payload:
+            # XOR the whole payload at once instead of byte by byte
+            key = (mask * (length // 4 + 1))[:length]
+            masked = int.from_bytes(payload, 'big') ^ int.from_bytes(key, 'big')
+            payload = masked.to_bytes(length, 'big')
+        return bool(first & 0x80), first & 0x0F, payload
+    
+    def _send_frame(self, opcode, payload):
+        length = len(payload)
+        if length < 126:
+            header = bytes((0x80 | opcode, length))
+        elif length < 65536:
+            header = bytes((0x80 | opcode, 126)) + length.to_bytes(2, 'big')
+        else:
+            header = bytes((0x80 | opcode, 127)) + length.to_bytes(8, 'big')
+        with self._write_lock:
+            if self.closed and opcode != 0x8:
+                return
+            self.wfile.write(header + payload)
+            self.wfile.flush()
+
+
+class WebSocketResponse(LudwigResponse):
+    """101 response that hands the connection to a WebSocket handler."""
+    
+    def __init__(self, request, handler, accept, max_message_size=1024 * 1024):
+        super().__init__("", 101, {
+            'Upgrade': 'websocket',
+            'Connection': 'Upgrade',
+            'Sec-WebSocket-Accept': accept,
+        })
+        self.request = request
+        self.handler = handler
+        self.max_message_size = max_message_size
+    
+    def run(self, rfile, wfile):
+        """Run the handler on the upgraded connection, then close it."""
+        websocket = WebSocket(self.request, rfile, wfile, self.max_message_size)
+        try:
+            self.handler(websocket)
+        finally:
+            websocket.close()
+        return websocket
+
+
+class FileResponse(LudwigResponse):
+    """Response whose body is (a byte range of) a file on disk.
+    
+    The handler sends the body with `socket.sendfile`, so file contents go
+    from the page cache to the socket without passing through Python.
+    """
+    
+    def __init__(self, path, status_code=200, headers=None, offset=0, length=None):
+        super().__init__("", status_code, headers)
+        self.path = path
+        self.offset = offset
+        self.length = length
+
+
+class StaticFiles:
+    """Static file serving for URL prefixes registered with `app.static`.
+    
+    Responses carry strong ETags and Last-Modified headers, answer
+    conditional requests with 304, support single byte ranges and mark
+    fingerprinted assets (e.g. `app.3f9a1c2e.js`) as immutable.
+    """
+    
+    FINGERPRINT_RE = re.compile(r'[.-][0-9a-fA-F]{8,}\.[A-Za-z0-9]+$')
+    IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+    PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+    
+    def __init__(self, max_age=0, precompressed=True):
+        self.max_age = max_age
+        self.precompressed = precompressed
+        self.mounts = []
+    
+    def mount(self, url_path, directory):
+        """Serve files from `directory` under the `url_path` prefix."""
+        prefix = '/' + url_path.strip('/')
+        self.mounts.append((prefix.rstrip('/'), os.path.realpath(directory)))
+        # Longest prefix wins
+        self.mounts.sort(key=lambda mount: len(mount[0]), reverse=True)
+    
+    def resolve(self, path):
+        """Map a URL path to a file path, or None if no mount matches."""
+        path = urllib.parse.unquote(path)
+        if '\x00' in path:
+            return None
+        for prefix, directory in self.mounts:
+            if path == prefix or path.startswith(prefix + '/'):
+                relative = path[len(prefix):].lstrip('/')
+                full_path = os.path.realpath(os.path.join(directory, relative))
+                if full_path == directory or full_path.startswith(directory + os.sep):
+                    return full_path
+                return None
+        return None
+    
+    def handles(self, path):
+        """Check whether `path` falls under a static mount."""
+        return self.resolve(path) is not None
+    
+    def respond(self, path, headers):
+        """Build the response for a static file request."""
+        full_path = self.resolve(path)
+        try:
+            stat = os.stat(full_path) if full_path else None
+        except OSError:
+            stat = None
+        if stat is None or not os.path.isfile(full_path):
+            return LudwigResponse("File not found", 404, {'Content-type': 'text/plain'})
+        
+        content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        cache_control = self.cache_control(full_path)
+        encoding = None
+        if self.precompressed:
+            variant = self.precompressed_variant(
+                full_path, headers.get('Accept-Encoding')
+            )
+            if variant:
+                encoding, full_path, stat = variant
+        
+        size = stat.st_size
+        etag = f'"{stat.st_mtime_ns:x}-{size:x}{"-" + encoding if encoding else ""}"'
+        response_headers = {
+            'Content-type': content_type,
+            'ETag': etag,
+            'Last-Modified': email.utils.formatdate(stat.st_mtime, usegmt=True),
+            'Accept-Ranges': 'bytes',
+            'Cache-Control': cache_control,
+        }
+        if self.precompressed:
+            add_vary(response_headers, 'Accept-Encoding')
+        if encoding:
+            response_headers['Content-Encoding'] = encoding
+        
+        if self.not_modified(headers, etag, stat.st_mtime):
+            keep = ('ETag', 'Last-Modified', 'Cache-Control', 'Vary')
+            return LudwigResponse(
+                "", 304, {k: v for k, v in response_headers.items() if k in keep}
+            )
+        
+        range_header = headers.get('Range')
+        if range_header and self.if_range_matches(
+            headers.get('If-Range'), etag, stat.st_mtime
+        ):
+            byte_range = self.parse_range(range_header, size)
+            if byte_range == 'unsatisfiable':
+                return LudwigResponse("", 416, {'Content-Range': f'bytes */{size}'})
+            if byte_range:
+                start, end = byte_range
+                response_headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+                response_headers['Content-Length'] = str(end - start + 1)
+                return FileResponse(
+                    full_path, 206, response_headers, start, end - start + 1
+                )
+        
+        response_headers['Content-Length'] = str(size)
+        return FileResponse(full_path, 200, response_headers, 0, size)
+    
+    def precompressed_variant(self, full_path, accept_encoding):
+        """Find a build-time `.br`/`.gz` sibling the client accepts."""
+        if not accept_encoding:
+            return None
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding, suffix in self.PRECOMPRESSED:
+            if accepted.get(encoding, accepted.get('*', 0.0)) <= 0:
+                continue
+            try:
+                stat = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            return encoding, full_path + suffix, stat
+        return None
+    
+    def cache_control(self, full_path):
+        """Cache-Control value for a file."""
+        if self.FINGERPRINT_RE.search(os.path.basename(full_path)):
+            return self.IMMUTABLE_CACHE
+        if self.max_age:
+            return f'public, max-age={self.max_age}'
+        return 'no-cache'
+    
+    @staticmethod
+    def not_modified(headers, etag, mtime):
+        """Evaluate If-None-Match / If-Modified-Since."""
+        if_none_match = headers.get('If-None-Match')
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or etag in tags or f'W/{etag}' in tags
+        if_modified_since = headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return int(mtime) <= since
+        return False
+    
+    @staticmethod
+    def if_range_matches(if_range, etag, mtime):
+        """A Range is only honoured if If-Range (when sent) still matches."""
+        if not if_range:
+            return True
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            return if_range == etag
+        try:
+            return int(mtime) <= email.utils.parsedate_to_datetime(if_range).timestamp()
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+    
+    @staticmethod
+    def parse_range(header, size):
+        """Parse a single `bytes=` range into (start, end), inclusive.
+        
+        Returns None when the header should be ignored (malformed or
+        multiple ranges) and 'unsatisfiable' when it cannot be served.
+        """
+        unit, _, spec = header.partition('=')
+        if unit.strip() != 'bytes' or ',' in spec:
+            return None
+        start, sep, end = spec.strip().partition('-')
+        if not sep:
+            return None
+        try:
+            if start:
+                start = int(start)
+                if end:
+                    end = int(end)
+                    if start > end:
+                        return None
+                else:
+                    end = size - 1
+            else:
+                suffix = int(end)
+                if suffix == 0:
+                    return 'unsatisfiable'
+                start = max(size - suffix, 0)
+                end = size - 1
+        except ValueError:
+            return None
+        if start >= size:
+            return 'unsatisfiable'
+        return start, min(end, size - 1)
+
+
+class TemplateError(Exception):
+    """Raised when a template cannot be compiled; `template` and `line` locate it."""
+    
+    def __init__(self, message, template=None, line=None):
+        super().__init__(message)
+        self.template = template
+        self.line = line
+
+
+class TemplateNotFound(TemplateError):
+    """Raised when a template file does not exist."""
+
+
+class Markup(str):
+    """String that is already safe HTML and must not be escaped again."""
+    
+    def __html__(self):
+        return self
+
+
+def escape(value):
+    """HTML-escape a value for output, leaving Markup untouched."""
+    if value is None:
+        return ''
+    if hasattr(value, '__html__'):
+        return value.__html__()
+    return html.escape(str(value), quote=True)
+
+
+def _to_str(value):
+    """Convert a value for output without escaping."""
+    return '' if value is None else str(value)
+
+
+def _attr(obj, name):
+    """Resolve `obj.name` the way templates expect: keys first, then attributes."""
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    try:
+        return getattr(obj, name)
+    except AttributeError:
+        try:
+            return obj[name]
+        except (TypeError, KeyError, IndexError):
+            return None
+
+
+class _LoopState:
+    """`loop` variable exposed inside {% for %} bodies."""
+    
+    __slots__ = ('index0', 'length')
+    
+    def __init__(self, length):
+        self.index0 = 0
+        self.length = length
+    
+    @property
+    def index(self):
+        return self.index0 + 1
+    
+    @property
+    def first(self):
+        return self.index0 == 0
+    
+    @property
+    def last(self):
+        return self.index0 == self.length - 1
+
+
+class _TemplateCompiler:
+    """Turns template source into Python render functions.
+    
+    Templates are split once into literal segments and placeholder slots,
+    which are emitted as straight-line code appending to an output list.
+    Loop variables become Python locals, so lookups inside loops never
+    touch the context dictionary.
+    """
+    
+    TOKEN_RE = re.compile(r'(\{\{.*?\}\}|\{%.*?%\}|\{#.*?#\})', re.S)
+    PATH_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z0-9_]+)*$')
+    NAME_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+    FILTERS = {
+        'upper': '_to_str({}).upper()',
+        'lower': '_to_str({}).lower()',
+        'title': '_to_str({}).title()',
+        'trim': '_to_str({}).strip()',
+        'length': 'len({} or ())',
+    }
+    
+    def __init__(self, name, source, autoescape=True):
+        self.name = name
+        self.autoescape = autoescape
+        self.tokens = self.TOKEN_RE.split(source)
+        self.pos = 0
+        self.line = 1  # source line of the token being parsed or compiled
+        self.lines = []
+        self.indent = 0
+        self.scope = []
+        self.counter = 0
+        self.blocks = {}
+        self.parent = None
+    
+    def compile(self):
+        """Compile the template and return (render, blocks, parent)."""
+        nodes = self._parse(())
+        self._function('_render', nodes)
+        for block_name, body in self.blocks.items():
+            self._function(f'_block_{block_name}', body)
+        
+        namespace = {
+            '_esc': escape, '_to_str': _to_str, '_attr': _attr,
+            '_Loop': _LoopState, '_Markup': Markup,
+        }
+        code = compile('\n'.join(self.lines), f'<template {self.name}>', 'exec')
+        exec(code, namespace)
+        blocks = {name: namespace[f'_block_{name}'] for name in self.blocks}
+        return namespace['_render'], blocks, self.parent
+    
+    # Parsing -----------------------------------------------------------
+    
+    def _error(self, message):
+        return TemplateError(
+            f"{self.name}, line {self.line}: {message}", self.name, self.line
+        )
+    
+    def _parse(self, end_tags):
+        """Parse tokens until one of `end_tags` is reached."""
+        nodes = []
+        while self.pos < len(self.tokens):
+            token = self.tokens[self.pos]
+            self.pos += 1
+            line = self.line
+            self.line += token.count('\n')
+            if token.startswith('{{') and token.endswith('}}'):
+                nodes.append(('var', token[2:-2].strip(), line))
+            elif token.startswith('{#') and token.endswith('#}'):
+                continue
+            elif token.startswith('{%') and token.endswith('%}'):
+                parts = token[2:-2].split(None, 1)
+                if not parts:
+                    raise self._error("empty tag")
+                tag = parts[0]
+                arg = parts[1].strip() if len(parts) > 1 else ''
+                if tag in end_tags:
+                    return nodes, tag, arg
+                nodes.append(self._parse_tag(tag, arg, line))
+            elif token:
+                nodes.append(('text', token))
+        if end_tags:
+            raise self._error(f"missing {{% {end_tags[0]} %}}")
+        return nodes
+    
+    def _parse_tag(self, tag, arg, line):
+        if tag == 'for':
+            match = re.match(r'^([A-Za-z_][A-Za-z0-9_]*)\s+in\s+(.+)$', arg)
+            if not match:
+                self.line = line
+                raise self._error(f"invalid for tag: {arg}")
+            body, end, _ = self._parse(('endfor', 'else'))
+            else_body = []
+            if end == 'else':
+                else_body, _, _ = self._parse(('endfor',))
+            target, iterable = match.group(1), match.group(2).strip()
+            return ('for', target, iterable, body, else_body, line)
+        if tag == 'if':
+            branches = []
+            cond = arg
+            while True:
+                body, end, next_arg = self._parse(('endif', 'elif', 'else'))
+                branches.append((cond, body))
+                if end == 'elif':
+                    cond = next_arg
+                    continue
+                else_body = []
+                if end == 'else':
+                    else_body, _, _ = self._parse(('endif',))
+                return ('if', branches, else_body, line)
+        if tag == 'block':
+            if not self.NAME_RE.match(arg):
+                raise self._error(f"invalid block name: {arg}")
+            body, _, _ = self._parse(('endblock',))
+            self.blocks[arg] = body
+            return ('block', arg)
+        if tag == 'include':
+            return ('include', self._string_literal(arg))
+        if tag == 'extends':
+            self.parent = self._string_literal(arg)
+            return ('text', '')
+        self.line = line
+        raise self._error(f"unknown tag: {tag}")
+    
+    def _string_literal(self, arg):
+        if len(arg) >= 2 and arg[0] == arg[-1] and arg[0] in '"\'':
+            return arg[1:-1]
+        raise self._error(f"expected quoted template name, got: {arg}")
+    
+    # Code generation ---------------------------------------------------
+    
+    def _emit(self, line):
+        self.lines.append('    ' * self.indent + line)
+    
+    def _function(self, name, nodes):
+        self._emit(f'def {name}(ctx, _blocks, _w, _env):')
+        self.indent += 1
+        self._emit('pass')
+        self._nodes(nodes)
+        self.indent -= 1
+    
+    def _nodes(self, nodes):
+        for node in nodes:
+            kind = node[0]
+            if kind == 'text':
+                if node[1]:
+                    self._emit(f'_w({node[1]!r})')
+            elif kind == 'var':
+                self.line = node[2]
+                self._emit(f'_w({self._output(node[1])})')
+            elif kind == 'for':
+                self.line = node[-1]
+                self._for(*node[1:-1])
+            elif kind == 'if':
+                self.line = node[-1]
+                self._if(*node[1:-1])
+            elif kind == 'block':
+                self._emit(
+                    f'_blocks[{node[1]!r}]({self._local_ctx()}, _blocks, _w, _env)'
+                )
+            elif kind == 'include':
+                template = f'_env.get_template({node[1]!r})'
+                self._emit(f'{template}.render_to({self._local_ctx()}, {{}}, _w)')
+    
+    def _local(self, name):
+        for scope_name, local in reversed(self.scope):
+            if scope_name == name:
+                return local
+        return None
+    
+    def _local_ctx(self):
+        """Expression for the context seen by blocks and includes."""
+        if not self.scope:
+            return 'ctx'
+        visible = {}
+        for name, local in self.scope:
+            visible[name] = local
+        items = ', '.join(f'{name!r}: {local}' for name, local in visible.items())
+        return f'{{**ctx, {items}}}'
+    
+    def _path(self, path):
+        if not self.PATH_RE.match(path):
+            raise self._error(f"invalid expression: {path}")
+        root, *attrs = path.split('.')
+        expr = self._local(root) or f'ctx.get({root!r})'
+        for attr in attrs:
+            expr = f'_attr({expr}, {attr!r})'
+        return expr
+    
+    def _expression(self, source):
+        """Compile `path|filter|filter` and report whether it is marked safe."""
+        path, *filters = [part.strip() for part in source.split('|')]
+        expr = self._path(path)
+        safe = False
+        for name in filters:
+            if name == 'safe':
+                safe = True
+            elif name == 'escape':
+                expr = f'_Markup(_esc({expr}))'
+            elif name in self.FILTERS:
+                expr = self.FILTERS[name].format(expr)
+            else:
+                raise self._error(f"unknown filter: {name}")
+        return expr, safe
+    
+    def _output(self, source):
+        expr, safe = self._expression(source)
+        if safe or not self.autoescape:
+            return f'_to_str({expr})'
+        return f'_esc({expr})'
+    
+    def _condition(self, source):
+        negate = False
+        if source.startswith('not '):
+            negate = True
+            source = source[4:].strip()
+        expr, _ = self._expression(source)
+        return f'not ({expr})' if negate else f'({expr})'
+    
+    def _for(self, var, iterable, body, else_body):
+        self.counter += 1
+        items = f'_items{self.counter}'
+        local = f'l_{var}_{self.counter}'
+        loop = f'l_loop_{self.counter}'
+        self._emit(f'{items} = list({self._expression(iterable)[0]} or ())')
+        self._emit(f'{loop} = _Loop(len({items}))')
+        self._emit(f'for {loop}.index0, {local} in enumerate({items}):')
+        self.indent += 1
+        self.scope.append((var, local))
+        self.scope.append(('loop', loop))
+        self._emit('pass')
+        self._nodes(body)
+        self.scope.pop()
+        self.scope.pop()
+        self.indent -= 1
+        if else_body:
+            self._emit(f'if not {items}:')
+            self.indent += 1
+            self._emit('pass')
+            self._nodes(else_body)
+            self.indent -= 1
+    
+    def _if(self, branches, else_body):
+        for index, (cond, body) in enumerate(branches):
+            keyword = 'if' if index == 0 else 'elif'
+            self._emit(f'{keyword} {self._condition(cond)}:')
+            self.indent += 1
+            self._emit('pass')
+            self._nodes(body)
+            self.indent -= 1
+        if else_body:
+            self._emit('else:')
+            self.indent += 1
+            self._emit('pass')
+            self._nodes(else_body)
+            self.indent -= 1
+
+
+class Template:
+    """A compiled template."""
+    
+    def __init__(self, name, source, engine):
+        self.name = name
+        self.engine = engine
+        compiler = _TemplateCompiler(name, source, engine.autoescape)
+        self._render, self.blocks, self.parent = compiler.compile()
+    
+    def render_to(self, context, blocks, write):
+        """Render into `write`, with `blocks` overriding this template's blocks."""
+        merged = dict(self.blocks)
+        merged.update(blocks)
+        if self.parent:
+            self.engine.get_template(self.parent).render_to(context, merged, write)
+        else:
+            self._render(context, merged, write, self.engine)
+    
+    def render(self, context=None):
+        """Render the template to a string."""
+        out = []
+        self.render_to(context or {}, {}, out.append)
+        return ''.join(out)
+
+
+class TemplateEngine:
+    """Loads templates from a views directory and caches them compiled.
+    
+    Each template is read and compiled once; later renders reuse the
+    compiled function. With `auto_reload` enabled the file's mtime is
+    checked on lookup so edits are picked up without a restart.
+    
+    Supported syntax:
+        {{ user.name }}                    escaped output
+        {{ body|safe }}                    unescaped output
+        {% for post in posts %}...{% else %}...{% endfor %}
+        {% if user %}...{% elif guest %}...{% else %}...{% endif %}
+        {% include "partials/nav.html" %}
+        {% extends "layout.html" %} with {% block content %}...{% endblock %}
+    """
+    
+    def __init__(self, directory='views', autoescape=True, auto_reload=True):
+        self.directory = directory
+        self.autoescape = autoescape
+        self.auto_reload = auto_reload
+        self._cache = {}
+        self._lock = threading.Lock()
+    
+    def get_template(self, name):
+        """Return the compiled template for `name`, compiling it if needed."""
+        cached = self._cache.get(name)
+        if cached is not None and not self.auto_reload:
+            return cached[1]
+        
+        path = os.path.join(self.directory, name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            raise TemplateNotFound(f"Template not found: {name}")
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+            with open(path, 'r', encoding='utf-8') as f:
+                source = f.read()
+            template = Template(name, source, self)
+            self._cache[name] = (mtime, template)
+            return template
+    
+    def render(self, name, context=None):
+        """Render template `name` with `context`."""
+        return self.get_template(name).render(context)
+    
+    def clear(self):
+        """Drop all compiled templates."""
+        with self._lock:
+            self._cache.clear()
+    
+    def invalidate(self, name):
+        """Drop one compiled template so it is recompiled on next use."""
+        with self._lock:
+            self._cache.pop(name, None)
+
+
+def load_app(path, attribute=None, module_name='ludwig_app'):
+    """Execute an app file and return its LudwigWebFramework instance.
+    
+    The file (any extension, e.g. main.ludwig) is imported as
+    `module_name` rather than `__main__`, so its `app.run()` guard does
+    not fire. `attribute` names the app variable; by default `app` or the
+    first LudwigWebFramework found in the module is used.
+    """
+    path = os.path.abspath(path)
+    directory = os.path.dirname(path)
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    loader = importlib.machinery.SourceFileLoader(module_name, path)
+    spec = importlib.util.spec_from_loader(module_name, loader)
+    module = importlib.util.module_from_spec(spec)
+    module.__file__ = path
+    sys.modules[module_name] = module
+    loader.exec_module(module)
+    
+    if attribute:
+        app = getattr(module, attribute, None)
+    else:
+        app = getattr(module, 'app', None)
+        if not isinstance(app, LudwigWebFramework):
+            app = next(
+                (
+                    value
+                    for value in vars(module).values()
+                    if isinstance(value, LudwigWebFramework)
+                ),
+                None,
+            )
+    if not isinstance(app, LudwigWebFramework):
+        raise ValueError(f"No Ludwig web application found in '{path}'")
+    return app
+
+
+def _snapshot_files(paths):
+    """Map every file under `paths` (files or directories) to (mtime_ns, size)."""
+    snapshot = {}
+    stack = list(paths)
+    while stack:
+        path = stack.pop()
+        try:
+            if os.path.isdir(path):
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if (
+                                not entry.name.startswith('.')
+                                and entry.name != '__pycache__'
+                            ):
+                                stack.append(entry.path)
+                        elif not entry.name.endswith(('.pyc', '~', '.swp')):
+                            stat = entry.stat()
+                            snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+            else:
+                stat = os.stat(path)
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            continue
+    return snapshot
+
+
+class PollingWatcher:
+    """Detects file changes by comparing mtimes and sizes every `interval` seconds."""
+    
+    def __init__(self, paths, interval=0.1):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.interval = interval
+        self._snapshot = _snapshot_files(self.paths)
+        self.closed = False
+    
+    def wait(self, timeout=None):
+        """Block until something changes; return changed paths (empty on timeout)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.closed:
+            current = _snapshot_files(self.paths)
+            if current != self._snapshot:
+                changed = {path for path in current.keys() | self._snapshot.keys()
+                           if current.get(path) != self._snapshot.get(path)}
+                self._snapshot = current
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            time.sleep(self.interval)
+        return set()
+    
+    def close(self):
+        self.closed = True
+
+
+class InotifyWatcher:
+    """Linux inotify watcher driven through ctypes (no polling, no dependencies).
+    
+    Directories are watched recursively, including ones created later;
+    plain files are watched through their parent directory.
+    """
+    
+    IN_ATTRIB = 0x4
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+    MASK = (
+        IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    )
+    
+    def __init__(self, paths, settle=0.02):
+        self.settle = settle
+        self._libc = ctypes.CDLL(
+            ctypes.util.find_library('c') or 'libc.so.6', use_errno=True
+        )
+        self._fd = self._libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs = {}
+        self._trees = set()
+        self._files = set()
+        for path in paths:
+            path = os.path.abspath(path)
+            if os.path.isdir(path):
+                self._watch_tree(path)
+            elif os.path.exists(path):
+                self._files.add(path)
+                self._watch(os.path.dirname(path))
+    
+    @classmethod
+    def available(cls):
+        return sys.platform.startswith('linux')
+    
+    @property
+    def closed(self):
+        return self._fd is None
+    
+    def _watch(self, directory, tree=False):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK)
+        if wd >= 0:
+            self._dirs[wd] = directory
+            if tree:
+                self._trees.add(directory)
+        return wd
+    
+    def _watch_tree(self, root):
+        self._watch(root, tree=True)
+        for directory, subdirs, _ in os.walk(root):
+            subdirs[:] = [
+                d for d in subdirs if not d.startswith('.') and d != '__pycache__'
+            ]
+            for name in subdirs:
+                self._watch(os.path.join(directory, name), tree=True)
+    
+    def _read_events(self):
+        changed = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset + 16 <= len(data):
+            wd, mask, _, length = struct.unpack_from('iIII', data, offset)
+            name = data[offset + 16:offset + 16 + length].rstrip(b'\0')
+            offset += 16 + length
+            if mask & self.IN_Q_OVERFLOW:
+                changed.update(self._dirs.values())
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & self.IN_ISDIR:
+                if (
+                    mask & (self.IN_CREATE | self.IN_MOVED_TO)
+                    and directory in self._trees
+                ):
+                    self._watch_tree(path)
+                continue
+            if directory not in self._trees and path not in self._files:
+                # Sibling of a single watched file
+                continue
+            if path.endswith(('.pyc', '~', '.swp')):
+                continue
+            changed.add(path)
+        return changed
+    
+    def wait(self, timeout=None):
+        """Block until something changes; return changed paths (empty on timeout)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._fd is not None:
+            remaining = (
+                None if deadline is None else max(0, deadline - time.monotonic())
+            )
+            if not select.select([self._fd], [], [], remaining)[0]:
+                return set()
+            changed = self._read_events()
+            # Editors often write in several steps; gather them into one batch
+            while select.select([self._fd], [], [], self.settle)[0]:
+                changed |= self._read_events()
+            if changed:
+                return changed
+        return set()
+    
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+def watch_files(paths, poll_interval=0.1, use_inotify=None):
+    """Return an InotifyWatcher where available, else a PollingWatcher."""
+    if use_inotify is not False and InotifyWatcher.available():
+        try:
+            return InotifyWatcher(paths)
+        except (OSError, AttributeError):
+            if use_inotify:
+                raise
+    return PollingWatcher(paths, poll_interval)
+
+
+def reload_project_modules(paths, roots, exclude=()):
+    """Reload the modules loaded from `paths` and the project modules that use them.
+    
+    Only modules whose files live under `roots` (and not in `exclude`)
+    are considered, so the framework and third-party libraries stay warm.
+    Returns the reloaded module names in reload order.
+    """
+    roots = [os.path.abspath(root) + os.sep for root in roots]
+    paths = {os.path.abspath(path) for path in paths}
+    exclude = {os.path.abspath(path) for path in exclude}
+    project = {}
+    for name, module in list(sys.modules.items()):
+        filename = getattr(module, '__file__', None)
+        if filename and os.path.abspath(filename) not in exclude \
+                and any(os.path.abspath(filename).startswith(root) for root in roots):
+            project[name] = module
+    
+    order = [
+        name
+        for name, module in project.items()
+        if os.path.abspath(module.__file__) in paths
+    ]
+    pending = set(order)
+    while True:
+        dependents = [
+            name
+            for name, module in project.items()
+            if name not in pending
+            and any(
+                (inspect.ismodule(value) and value.__name__ in pending)
+                or (
+                    (inspect.isclass(value) or inspect.isfunction(value))
+                    and value.__module__ in pending
+                )
+                for value in list(vars(module).values())
+            )
+        ]
+        if not dependents:
+            break
+        order.extend(dependents)
+        pending.update(dependents)
+    
+    reloaded = []
+    for name in order:
+        module = sys.modules.get(name)
+        if module is None:
+            continue
+        if not os.path.exists(module.__file__):
+            del sys.modules[name]
+            continue
+        importlib.reload(module)
+        reloaded.append(name)
+    return reloaded
+
+
+class DevServer:
+    """Development server that hot-reloads code, templates and assets.
+    
+    The listening socket stays open the whole time. When files change,
+    templates are invalidated individually, changed Python modules (and
+    the project modules that import from them) are reloaded in this warm
+    process, and the app file is re-executed so the new routes take over
+    for the next connection. A failed reload keeps the previous app
+    serving and prints the error.
+    """
+    
+    WATCH = ('controllers', 'models', 'views', 'public')
+    
+    def __init__(
+        self,
+        app_path,
+        host='localhost',
+        port=3000,
+        watch=WATCH,
+        attribute=None,
+        poll_interval=0.1,
+        use_inotify=None,
+        log=print,
+    ):
+        self.app_path = os.path.abspath(app_path)
+        self.root = os.path.dirname(self.app_path)
+        self.host = host
+        self.port = port
+        self.attribute = attribute
+        self.log = log
+        self.watch_paths = [
+            os.path.join(self.root, path)
+            for path in watch
+            if os.path.exists(os.path.join(self.root, path))
+        ] + [self.app_path]
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.app = None
+        self.server = None
+        self.watcher = None
+        self.reloads = 0
+        self._stopping = False
+        self._threads = []
+    
+    def start(self):
+        """Load the app, bind the socket, then serve and watch in the background."""
+        self.app = load_app(self.app_path, self.attribute)
+        LudwigWeb.templates.auto_reload = False
+        self.server = self.app.make_server(self.host, self.port)
+        self.watcher = watch_files(
+            self.watch_paths, self.poll_interval, self.use_inotify
+        )
+        for target, name in (
+            (self.server.serve_forever, 'ludwig-dev-server'),
+            (self._watch, 'ludwig-dev-watcher'),
+        ):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self.server.server_address
+    
+    def serve_forever(self):
+        """Start and block until Ctrl+C."""
+        self.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+    
+    def stop(self):
+        self._stopping = True
+        if self.watcher is not None:
+            # Let the watcher thread finish its current wait before closing the watcher
+            for thread in self._threads:
+                if thread.name == 'ludwig-dev-watcher':
+                    thread.join(2)
+            self.watcher.close()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+    
+    def _watch(self):
+        while not self._stopping:
+            changed = self.watcher.wait(0.5)
+            if changed:
+                self.reload(changed)
+    
+    def reload(self, changed):
+        """Apply a batch of file changes; returns True if the app was swapped."""
+        started = time.perf_counter()
+        templates = LudwigWeb.templates
+        views = os.path.abspath(templates.directory) + os.sep
+        public = os.path.join(self.root, 'public') + os.sep
+        code = set()
+        for path in changed:
+            if path.startswith(views):
+                templates.invalidate(
+                    os.path.relpath(path, views[:-1]).replace(os.sep, '/')
+                )
+            elif not path.startswith(public):
+                code.add(path)
+        
+        swapped = False
+        if code:
+            try:
+                # The app file itself is re-executed below rather than reloaded
+                reloaded = reload_project_modules(
+                    code, [self.root], exclude=[self.app_path]
+                )
+                app = load_app(self.app_path, self.attribute)
+                app.compile()
+            except Exception:
+                self.log(
+                    "❌ Reload failed, still serving the previous version:\n"
+                    + traceback.format_exc()
+                )
+                return False
+            old, self.app = self.app, app
+            # New connections use the new app; open keep-alive ones switch on
+            # their next request
+            self.server.RequestHandlerClass = app._create_handler()
+            if old.access_log is not None:
+                old.access_log.close()
+            swapped = True
+            self.log(
+                f"🔥 Reloaded {', '.join(reloaded) or os.path.basename(self.app_path)} "
+                f"in {(time.perf_counter() - started) * 1000:.0f}ms"
+            )
+        else:
+            self.log(f"🔥 Refreshed {len(changed)} file(s)")
+        self.app.response_cache.clear()
+        self.reloads += 1
+        return swapped
+
+
+class LudwigWeb:
+    """Ludwig Web utilities and helpers."""
+    
+    # Shared template engine used by render()
+    templates = TemplateEngine('views')
+    
+    @staticmethod
+    def create_application(config=None):
+        """Create a new Ludwig web application."""
+        return LudwigWebFramework(config)
+    
+    @staticmethod
+    def render(template_name, context=None):
+        """Render an HTML template from views/ with context."""
+        try:
+            content = LudwigWeb.templates.render(template_name, context or {})
+        except TemplateNotFound:
+            return LudwigResponse(f"Template not found: {template_name}", 404)
+        except TemplateError as e:
+            return LudwigWeb.error(500, html.escape(f"Template error in {e}"))
+        return LudwigResponse(content)
+    
+    @staticmethod
+    def json_response(data, status_code=200):
+        """Return JSON response."""
+        headers = {'Content-type': 'application/json'}
+        content = json_backend.dumps(data)
+        return LudwigResponse(content, status_code, headers)
+    
+    @staticmethod
+    def json_stream(items, status_code=200):
+        """Stream an iterable (e.g. a large query result) as a JSON array."""
+        headers = {'Content-type': 'application/json'}
+        return LudwigResponse(json_backend.iter_array(items), status_code, headers)
+    
+    @staticmethod
+    def stream(chunks, content_type='text/plain', status_code=200, headers=None):
+        """Return a streamed response from an iterator/generator or file object.
+        
+        The body is sent with chunked transfer encoding as it is produced,
+        so large exports never have to be held in memory.
+        """
+        response_headers = {'Content-type': content_type}
+        response_headers.update(headers or {})
+        return LudwigResponse(chunks, status_code, response_headers)
     
     @staticmethod
     def redirect(url, status_code=302):
@@ -233,14 +5031,16 @@ class LudwigWeb:
     @staticmethod
     def redirect_with_success(url, message):
         """Redirect with success message (stored in session)."""
-        # For now, just redirect - session handling can be added later
-        return LudwigWeb.redirect(url)
+        response = LudwigWeb.redirect(url)
+        response.flashes = [('success', message)]
+        return response
     
     @staticmethod
     def redirect_with_error(url, message):
         """Redirect with error message (stored in session)."""
-        # For now, just redirect - session handling can be added later
-        return LudwigWeb.redirect(url)
+        response = LudwigWeb.redirect(url)
+        response.flashes = [('error', message)]
+        return response
 
 
 # Alias for compatibility